@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+价格预警引擎
+预警按代码索引、目标价有序保存，每轮只用行情快照检查被穿越的部分；
+触发结果进入非模态通知队列（托盘气泡），同一预警只提示一次
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import deque
+from PyQt5.QtCore import Qt, QObject, QTimer
+from PyQt5.QtWidgets import QApplication, QMessageBox, QSystemTrayIcon
+
+
+class AlertIndex:
+    """预警索引 {代码: {'above': ([目标价], [预警]), 'below': ([目标价], [预警])}}
+
+    高于预警在价格 >= 目标价时触发，即有序表的前缀；
+    低于预警在价格 <= 目标价时触发，即有序表的后缀。
+    用二分查找定位，检查开销只和被穿越的预警数有关
+    """
+
+    def __init__(self, alerts=None):
+        self._index = {}
+        self.rebuild(alerts or [])
+
+    def rebuild(self, alerts):
+        """按预警列表重建索引（已触发的不入索引）"""
+        self._index = {}
+        for alert in alerts:
+            if not alert.get('triggered'):
+                self.add(alert)
+
+    def add(self, alert):
+        book = self._index.setdefault(alert['code'], {'above': ([], []), 'below': ([], [])})
+        targets, items = book['above' if alert['direction'] == 'above' else 'below']
+        pos = bisect_right(targets, alert['target'])
+        targets.insert(pos, alert['target'])
+        items.insert(pos, alert)
+
+    def codes(self) -> list:
+        """有待触发预警的代码"""
+        return list(self._index)
+
+    def check(self, quotes: dict) -> list:
+        """用行情快照检查预警，返回 [(预警, 当前价)]，触发的预警标记后移出索引"""
+        hits = []
+        if len(quotes) < len(self._index):
+            codes = [c for c in quotes if c in self._index]
+        else:
+            codes = [c for c in self._index if c in quotes]
+        for code in codes:
+            price = quotes[code].price
+            book = self._index[code]
+
+            targets, items = book['above']
+            n = bisect_right(targets, price)
+            if n:
+                hits.extend((a, price) for a in items[:n])
+                del targets[:n], items[:n]
+
+            targets, items = book['below']
+            n = bisect_left(targets, price)
+            if n < len(targets):
+                hits.extend((a, price) for a in items[n:])
+                del targets[n:], items[n:]
+
+            if not book['above'][0] and not book['below'][0]:
+                del self._index[code]
+
+        for alert, _ in hits:
+            alert['triggered'] = True
+        return hits
+
+
+class AlertNotifier(QObject):
+    """非模态预警通知队列
+
+    逐条以托盘气泡提示，相同 (代码, 方向, 目标价) 的预警排队期间只保留一条；
+    系统不支持托盘消息时退化为非模态消息框
+    """
+
+    INTERVAL = 4000  # 两条提示之间的间隔（毫秒）
+
+    def __init__(self, tray_icon=None, parent=None):
+        super().__init__(parent)
+        self.tray_icon = tray_icon
+        self._queue = deque()
+        self._pending = set()  # 排队中及正在提示的预警
+        self._current = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._show_next)
+
+    def push(self, alert, price):
+        key = (alert['code'], alert['direction'], alert['target'])
+        if key in self._pending:
+            return
+        self._pending.add(key)
+        self._queue.append((key, alert, price))
+        if not self._timer.isActive():
+            self._show_next()
+
+    def _show_next(self):
+        # 上一条提示结束后才允许同一预警再次入队
+        self._pending.discard(self._current)
+        self._current = None
+        if not self._queue:
+            return
+        key, alert, price = self._queue.popleft()
+        self._current = key
+        sign = '高于' if alert['direction'] == 'above' else '低于'
+        title = '价格预警'
+        text = (f'{alert.get("name", alert["code"])} ({alert["code"]})\n'
+                f'当前价: {price:.2f}\n'
+                f'已{sign}目标价: {alert["target"]:.2f}')
+        if self.tray_icon is not None and QSystemTrayIcon.supportsMessages():
+            self.tray_icon.showMessage(title, text, QSystemTrayIcon.Warning, self.INTERVAL)
+        else:
+            box = QMessageBox(QMessageBox.Warning, title, text, QMessageBox.Ok, self.parent())
+            box.setAttribute(Qt.WA_DeleteOnClose)
+            box.setModal(False)
+            box.show()
+        # 蜂鸣声
+        QApplication.beep()
+        self._timer.start(self.INTERVAL)
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+蜡烛图渲染
+影线、实体、成交量柱各用一个集合对象绘制（而不是每根K线一个图元），
+支持整体替换数据和原地修改最后一根；
+K线过密时按多级合并金字塔（2x、4x、8x…）降低细节；
+只把可见区间（前后各留一段余量）交给图元，纵轴范围用稀疏表 O(1) 查询
+"""
+
+import numpy as np
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba
+from matplotlib.path import Path
+
+BODY_WIDTH = 0.7
+WICK_WIDTH = 0.8
+VOL_ALPHA = 0.55
+MIN_BAR_PX = 2.0   # 每根K线至少占的像素宽度，不足时改用合并后的层级
+MIN_LEVEL_LEN = 16  # 金字塔最高层至少保留的K线数
+MIN_MARGIN = 16     # 可见区间两侧至少多画的K线数
+
+
+def wick_segments(x, highs, lows):
+    """影线线段 (n, 2, 2)"""
+    segs = np.empty((len(x), 2, 2))
+    segs[:, :, 0] = np.asarray(x, dtype=np.float64)[:, None]
+    segs[:, 0, 1] = lows
+    segs[:, 1, 1] = highs
+    return segs
+
+
+def rect_verts(x, bottoms, tops, width=BODY_WIDTH):
+    """以 x 为中心的矩形顶点 (n, 4, 2)"""
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    verts = np.empty((n, 4, 2))
+    left, right = x - np.asarray(width) / 2, x + np.asarray(width) / 2
+    verts[:, 0, 0] = verts[:, 1, 0] = left
+    verts[:, 2, 0] = verts[:, 3, 0] = right
+    verts[:, 0, 1] = verts[:, 3, 1] = np.broadcast_to(bottoms, n)
+    verts[:, 1, 1] = verts[:, 2, 1] = np.broadcast_to(tops, n)
+    return verts
+
+
+def build_pyramid(x, opens, highs, lows, closes, volumes, min_len: int = MIN_LEVEL_LEN):
+    """逐级两两合并K线，返回 [(x中心, 开, 高, 低, 收, 量合计, 包含的原始K线数)]，第0级为原始数据"""
+    x = np.asarray(x, dtype=np.float64)
+    levels = [(x, opens, highs, lows, closes, volumes, np.ones(len(x)))]
+    while len(levels[-1][0]) > min_len:
+        px, po, ph, pl, pc, pv, pn = levels[-1]
+        starts = np.arange(0, len(px), 2)
+        ends = np.minimum(starts + 1, len(px) - 1)
+        counts = np.add.reduceat(pn, starts)
+        levels.append((np.add.reduceat(px * pn, starts) / counts, po[starts],
+                       np.maximum.reduceat(ph, starts), np.minimum.reduceat(pl, starts),
+                       pc[ends], np.add.reduceat(pv, starts), counts))
+    return levels
+
+
+def pick_level(levels, px_per_bar: float, min_px: float = MIN_BAR_PX) -> int:
+    """选择使每根（合并后的）K线不窄于 min_px 像素的最低层级"""
+    level = 0
+    while level < len(levels) - 1 and px_per_bar * 2 ** level < min_px:
+        level += 1
+    return level
+
+
+class SparseTable:
+    """区间最值稀疏表：O(n log n) 预处理，query(lo, hi) O(1)
+
+    第 k 层第 i 项为 [i, i+2^k) 的最值，查询时用两个可重叠的 2^k 区间覆盖 [lo, hi]；
+    update_last() 只重算覆盖最后一项的 log n 个格子，供实时行情修改最后一根
+    """
+
+    def __init__(self, values, op=np.maximum):
+        self.op = op
+        table = [np.array(values, dtype=np.float64)]
+        span = 1
+        while span * 2 <= len(table[0]):
+            prev = table[-1]
+            table.append(op(prev[:-span], prev[span:]))
+            span *= 2
+        self._table = table
+
+    def __len__(self):
+        return len(self._table[0])
+
+    def query(self, lo: int, hi: int) -> float:
+        """[lo, hi]（含两端）的最值"""
+        lo, hi = int(lo), int(hi)
+        k = (hi - lo + 1).bit_length() - 1
+        row = self._table[k]
+        return float(self.op(row[lo], row[hi - (1 << k) + 1]))
+
+    def update_last(self, value):
+        table = self._table
+        n = len(table[0])
+        table[0][-1] = value
+        for k in range(1, len(table)):
+            half = 1 << (k - 1)
+            i = n - (1 << k)
+            table[k][i] = self.op(table[k - 1][i], table[k - 1][i + half])
+
+
+class CandleRenderer:
+    """蜡烛图渲染器
+
+    draw() 在（clear 之后的）坐标轴上新建三个集合；set_data() 原地替换全部数据；
+    update_last() 只改最后一根的路径和颜色，供实时行情使用；
+    set_view() 按当前每根K线的像素宽度切换细节层级（合并层的量柱显示平均量，
+    与原始层共用纵轴），并只绘制可见区间两侧各加半屏余量的部分（window，原始K线下标），
+    平移不超出余量时不改动图元
+    """
+
+    def __init__(self, up_color: str, down_color: str):
+        self.up_rgba = to_rgba(up_color)
+        self.down_rgba = to_rgba(down_color)
+        self.wicks = None
+        self.bodies = None
+        self.vol_bars = None
+        self._min_body = 0.0
+        self._colors_arr = None
+        self._vol_colors = None
+        self._data = None     # 原始数据 (x, 开, 高, 低, 收, 量)
+        self._levels = None   # 细节金字塔，用到时才建
+        self.level = 0
+        self.window = None    # 当前交给图元的原始K线下标范围 [a, b]
+
+    def _colors(self, opens, closes):
+        up = np.asarray(closes) >= np.asarray(opens)
+        return np.where(up[:, None], self.up_rgba, self.down_rgba)
+
+    def _body_range(self, opens, closes):
+        # 十字星给一个最小高度，避免实体消失
+        bottoms = np.minimum(opens, closes)
+        heights = np.maximum(np.abs(np.asarray(closes) - np.asarray(opens)), self._min_body)
+        return bottoms, bottoms + heights
+
+    def _store(self, x, opens, highs, lows, closes, volumes):
+        self._data = tuple(np.array(a, dtype=np.float64)
+                           for a in (x, opens, highs, lows, closes, volumes))
+        self._levels = None
+        highs, lows = self._data[2], self._data[3]
+        self._min_body = (highs.max() - lows.min()) * 0.001 if len(highs) else 0.0
+
+    def _geometry(self, x, opens, highs, lows, closes, volumes, counts=None):
+        width = BODY_WIDTH if counts is None else BODY_WIDTH * counts
+        if counts is not None:
+            volumes = volumes / counts
+        bottoms, tops = self._body_range(opens, closes)
+        return (wick_segments(x, highs, lows), rect_verts(x, bottoms, tops, width),
+                rect_verts(x, 0.0, volumes, width), self._colors(opens, closes))
+
+    def _level_data(self, level):
+        if level == 0:
+            return self._data + (None,)
+        if self._levels is None:
+            self._levels = build_pyramid(*self._data)
+        return self._levels[min(level, len(self._levels) - 1)]
+
+    def _window_data(self, level, window):
+        """取某层级落在 window 内的部分（合并层按中心位置截取，两端各多取一根）"""
+        data = self._level_data(level)
+        a, b = window
+        if level == 0:
+            return tuple(None if col is None else col[a:b + 1] for col in data)
+        x = data[0]
+        i0 = max(0, int(np.searchsorted(x, a)) - 1)
+        i1 = int(np.searchsorted(x, b, side='right')) + 1
+        return tuple(col[i0:i1] for col in data)
+
+    def draw(self, ax_main, ax_vol, x, opens, highs, lows, closes, volumes):
+        self._store(x, opens, highs, lows, closes, volumes)
+        self.level = 0
+        self.window = (0, len(self._data[0]) - 1)
+        wicks, bodies, vols, colors = self._geometry(*self._level_data(0))
+        self.wicks = LineCollection(wicks, linewidths=WICK_WIDTH)
+        self.bodies = PolyCollection(bodies, linewidths=0.3)
+        self.vol_bars = PolyCollection(vols, edgecolors='none')
+        self._set_colors(colors)
+        ax_main.add_collection(self.wicks)
+        ax_main.add_collection(self.bodies)
+        ax_vol.add_collection(self.vol_bars)
+        ax_main.autoscale_view()
+        ax_vol.autoscale_view(scaley=False)
+        vmax = float(np.max(volumes)) if len(volumes) else 0.0
+        ax_vol.set_ylim(0, vmax * 1.05 if vmax > 0 else 1)
+
+    def set_data(self, x, opens, highs, lows, closes, volumes):
+        """原地替换全部数据（不新建图元），保持当前细节层级和可见区间"""
+        self._store(x, opens, highs, lows, closes, volumes)
+        n = len(self._data[0])
+        a, b = self.window or (0, n - 1)
+        self._show_level(self.level, (min(a, n - 1), min(b, n - 1)))
+
+    def _show_level(self, level, window):
+        wicks, bodies, vols, colors = self._geometry(*self._window_data(level, window))
+        self.level = level
+        self.window = window
+        self.wicks.set_segments(wicks)
+        self.bodies.set_verts(bodies)
+        self.vol_bars.set_verts(vols)
+        self._set_colors(colors)
+
+    def set_view(self, px_per_bar: float, lo: int = None, hi: int = None) -> bool:
+        """按每根原始K线的像素宽度选择细节层级，按可见下标 [lo, hi] 截取绘制范围；
+        图元有改动时返回 True"""
+        if self._data is None or self.bodies is None or not len(self._data[0]):
+            return False
+        n = len(self._data[0])
+        lo = 0 if lo is None else max(0, lo)
+        hi = n - 1 if hi is None else min(n - 1, hi)
+        if px_per_bar >= MIN_BAR_PX:
+            level = 0
+        else:
+            if self._levels is None:
+                self._levels = build_pyramid(*self._data)
+            level = pick_level(self._levels, px_per_bar)
+        a, b = self.window
+        if level == self.level and a <= lo and hi <= b:
+            return False
+        margin = max((hi - lo + 1) // 2, MIN_MARGIN)
+        self._show_level(level, (max(0, lo - margin), min(n - 1, hi + margin)))
+        return True
+
+    def update_last(self, x, o, h, l, c, v):
+        """只更新最后一根K线（合并层级下重建金字塔）"""
+        if self.bodies is None or not len(self.bodies.get_paths()):
+            return
+        for col, val in zip(self._data, (x, o, h, l, c, v)):
+            col[-1] = val
+        if self.level:
+            self._levels = None
+            self._show_level(self.level, self.window)
+            return
+        if self.window[1] != len(self._data[0]) - 1:
+            return   # 最后一根不在绘制范围内
+        bottom, top = self._body_range(np.array([o]), np.array([c]))
+        self.wicks.get_paths()[-1] = Path(wick_segments([x], [h], [l])[0])
+        self.bodies.get_paths()[-1] = Path(rect_verts([x], bottom, top)[0], closed=False)
+        self.vol_bars.get_paths()[-1] = Path(rect_verts([x], 0.0, [v])[0], closed=False)
+        self._colors_arr[-1] = self.up_rgba if c >= o else self.down_rgba
+        self._vol_colors[-1, :3] = self._colors_arr[-1, :3]
+        self._apply_colors()
+
+    def _set_colors(self, colors):
+        self._colors_arr = colors
+        self._vol_colors = colors.copy()
+        self._vol_colors[:, 3] = VOL_ALPHA
+        self._apply_colors()
+
+    def _apply_colors(self):
+        self.wicks.set_color(self._colors_arr)
+        self.bodies.set_facecolor(self._colors_arr)
+        self.bodies.set_edgecolor(self._colors_arr)
+        self.vol_bars.set_facecolor(self._vol_colors)
+
+
+def _draw_vlines_loop(ax_main, ax_vol, x, o, h, l, c, v):
+    """旧的逐根绘制方式，仅用于性能对比"""
+    up = c >= o
+    for i in range(len(x)):
+        ax_main.vlines(x[i], l[i], h[i], color='#ef5350' if up[i] else '#26a69a', linewidth=0.8)
+    bh = np.abs(c - o)
+    bh = np.where(bh < (h.max() - l.min()) * 0.001, (h.max() - l.min()) * 0.001, bh)
+    bc = np.where(up, '#ef5350', '#26a69a')
+    ax_main.bar(x, bh, bottom=np.minimum(o, c), width=0.7, color=bc, edgecolor=bc, linewidth=0.3)
+    ax_vol.bar(x, v, width=0.7, color=bc, alpha=0.55, edgecolor='none')
+
+
+def benchmark(sizes=(120, 250, 1000, 5000), repeat=3):
+    """对比逐根绘制与集合绘制的耗时（创建图元 + 一次完整渲染），返回 {条数: (旧, 新)} 毫秒"""
+    import time
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    rng = np.random.default_rng(0)
+    results = {}
+    for n in sizes:
+        c = 100 + np.cumsum(rng.normal(0, 1, n))
+        o = c + rng.normal(0, 0.5, n)
+        h = np.maximum(o, c) + rng.random(n)
+        l = np.minimum(o, c) - rng.random(n)
+        v = rng.integers(1000, 100000, n).astype(float)
+        x = np.arange(n)
+        timings = []
+        for mode in ('old', 'new'):
+            best = float('inf')
+            for _ in range(repeat):
+                fig = Figure(figsize=(10, 6), dpi=100)
+                canvas = FigureCanvasAgg(fig)
+                ax_main, ax_vol = fig.add_subplot(211), fig.add_subplot(212)
+                t0 = time.perf_counter()
+                if mode == 'old':
+                    _draw_vlines_loop(ax_main, ax_vol, x, o, h, l, c, v)
+                else:
+                    CandleRenderer('#ef5350', '#26a69a').draw(ax_main, ax_vol, x, o, h, l, c, v)
+                canvas.draw()
+                best = min(best, time.perf_counter() - t0)
+            timings.append(best * 1000)
+        results[n] = tuple(timings)
+    return results
+
+
+def benchmark_lod(sizes=(1000, 5000, 20000), repeat=3):
+    """全部缩小显示时，原始层与自动细节层级的单次重绘耗时，返回 {条数: (原始, 分级, 层级)} 毫秒"""
+    import time
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    rng = np.random.default_rng(0)
+    results = {}
+    for n in sizes:
+        c = 100 + np.cumsum(rng.normal(0, 1, n))
+        o = c + rng.normal(0, 0.5, n)
+        h = np.maximum(o, c) + rng.random(n)
+        l = np.minimum(o, c) - rng.random(n)
+        v = rng.integers(1000, 100000, n).astype(float)
+        fig = Figure(figsize=(8.8, 5.6), dpi=100)
+        canvas = FigureCanvasAgg(fig)
+        ax_main, ax_vol = fig.add_subplot(211), fig.add_subplot(212)
+        renderer = CandleRenderer('#ef5350', '#26a69a')
+        renderer.draw(ax_main, ax_vol, np.arange(n), o, h, l, c, v)
+        timings = []
+        for lod in (False, True):
+            if lod:
+                x0, x1 = ax_main.get_xlim()
+                renderer.set_view(ax_main.bbox.width / (x1 - x0))
+            best = float('inf')
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                canvas.draw()
+                best = min(best, time.perf_counter() - t0)
+            timings.append(best * 1000)
+        results[n] = (*timings, renderer.level)
+    return results
+
+
+if __name__ == '__main__':
+    for n, (old, new) in benchmark().items():
+        print(f'{n:>5} 根  逐根绘制 {old:8.1f} ms  集合绘制 {new:7.1f} ms  {old / new:5.1f}x')
+    for n, (full, lod, level) in benchmark_lod().items():
+        print(f'{n:>5} 根  全部显示 {full:7.1f} ms  细节层级{level} {lod:7.1f} ms')
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+图表数据缓存
+按字节预算做LRU淘汰，过期时间用单调时钟计算，盘中和休市使用不同的有效期
+"""
+
+import sys
+import time
+import datetime
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import market_clock
+
+
+def sizeof(value) -> int:
+    """估算缓存值占用的字节数（numpy 数组按数据区计算，列表/元组逐项累加）"""
+    if isinstance(value, np.ndarray):
+        # 切片视图会让整个底层数组常驻内存，按底层数组计算
+        while isinstance(value.base, np.ndarray):
+            value = value.base
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class ChartCache:
+    """有界LRU缓存
+
+    条目为 {键: (过期时间, 字节数, 值)}，按最近使用顺序排列；
+    总字节数超过 max_bytes 时从最久未用的一端淘汰。
+    未指定有效期时，开市期间用 live_ttl，休市时用 closed_ttl（数据不会再变，但不跨过下次开盘）。
+    clock 为计算过期的单调时钟，now 返回当前时间用于判断交易时段，测试时可替换
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024,
+                 live_ttl: float = 300, closed_ttl: float = 3600,
+                 clock=time.monotonic, now=datetime.datetime.now):
+        self.max_bytes = max_bytes
+        self.live_ttl = live_ttl
+        self.closed_ttl = closed_ttl
+        self._clock = clock
+        self._now = now
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        """是否有未过期的条目（不算一次使用，不改变淘汰顺序）"""
+        with self._lock:
+            return self._live_entry(key) is not None
+
+    def ttl(self, live_ttl: float = None, closed_ttl: float = None) -> float:
+        """按当前交易时段取有效期；休市时不超过下次开盘，盘前写入的数据开盘即过期"""
+        now = self._now()
+        if market_clock.market_phase(now) == market_clock.PHASE_CLOSED:
+            ttl = self.closed_ttl if closed_ttl is None else closed_ttl
+            return min(ttl, (market_clock.next_open(now) - now).total_seconds())
+        return self.live_ttl if live_ttl is None else live_ttl
+
+    def _live_entry(self, key):
+        """取未过期的条目，已过期的顺便删除（调用方持有锁）"""
+        entry = self._entries.get(key)
+        if entry is not None and self._clock() >= entry[0]:
+            self._remove(key)
+            entry = None
+        return entry
+
+    def get(self, key, count: bool = True):
+        """读取未过期的值并标记为最近使用，不存在或已过期返回 None"""
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, live_ttl: float = None, closed_ttl: float = None):
+        """写入一项，超出预算时淘汰最久未用的条目（单项超过预算时不缓存）"""
+        nbytes = sizeof(value)
+        expires = self._clock() + self.ttl(live_ttl, closed_ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (expires, nbytes, value)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                old_key = next(iter(self._entries))
+                self._remove(old_key)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, nbytes, _ = self._entries.pop(key)
+        self._bytes -= nbytes
+
+    def stats(self) -> dict:
+        """命中/未命中/淘汰计数及当前占用"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'bytes': self._bytes,
+                    'max_bytes': self.max_bytes}
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+图表数据获取
+K线、分时、昨收等网络请求和本地K线存储读取，不依赖 matplotlib，可在线程池中运行；
+ChartLoadTask 在后台加载一个 (代码, 周期) 的图表数据，结果通过信号送回主线程。
+图表缓存和K线存储在这里创建，K线窗口和预取共用
+"""
+
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThread, pyqtSignal
+
+import http_client
+import intraday
+import kline_store
+from chart_cache import ChartCache
+
+TYPE_INTRADAY = '分时'
+TYPE_ALL_KLINES = '全部K线'  # 预取用：一次加载日K/周K/月K
+QUOTE_URL = 'http://qt.gtimg.cn/q={}'
+KLINE_COUNT = 250  # K线按最大显示条数获取一次，不同条数共用
+FS_TTL = 120       # 分时缓存盘中有效期（秒）
+
+# 共用的图表数据缓存：K线盘中5分钟、休市1小时，分时盘中2分钟
+CACHE = ChartCache(max_bytes=32 * 1024 * 1024, live_ttl=300, closed_ttl=3600)
+STORE = kline_store.KLineStore()
+
+
+def cache_key(stock_code: str, chart_type: str) -> str:
+    if chart_type == TYPE_INTRADAY:
+        return f'fs_{stock_code}'
+    return f'kline_{chart_type}_{stock_code}'
+
+
+def cache_series(stock_code: str, series, cache: ChartCache = CACHE):
+    """缓存分时序列的快照，取出时用 intraday.MinuteSeries.from_snapshot 还原"""
+    cache.put(cache_key(stock_code, TYPE_INTRADAY), series.snapshot(), live_ttl=FS_TTL)
+
+
+def cache_result(stock_code: str, chart_type: str, result, cache: ChartCache = CACHE):
+    """把 load_chart 的结果写入缓存（模拟数据不缓存）；
+    返回K线、{周期: K线} 或构造好的 intraday.MinuteSeries，没有真实数据时返回 None"""
+    kind, payload = result if result is not None else (None, None)
+    if kind == 'bars':
+        cache.put(cache_key(stock_code, chart_type), payload)
+        return payload
+    if kind == 'periods':
+        for chart_type, bars in payload.items():
+            cache.put(cache_key(stock_code, chart_type), bars)
+        return payload
+    if kind == 'minutes':
+        day, times, prices, vols, prev_close = payload
+        series = intraday.MinuteSeries(day, prev_close, times, prices, vols)
+        cache_series(stock_code, series, cache)
+        return series
+    return None
+
+
+def _fetch_quote_fields(code: str):
+    """单只股票的 ~ 分隔行情字段，失败返回 None"""
+    r = http_client.get(QUOTE_URL.format(code), timeout=10)
+    if r.status_code != 200:
+        return None
+    return r.content.decode('gbk').strip().split('~')
+
+
+def fetch_prev_close(code: str):
+    """获取昨收价"""
+    try:
+        parts = _fetch_quote_fields(code)
+        if parts and len(parts) > 4:
+            return float(parts[4])
+    except Exception:
+        pass
+    return None
+
+
+def fetch_today(code: str):
+    """获取当日开/收/高/低/量/昨收，用于生成模拟K线；失败返回 None"""
+    try:
+        parts = _fetch_quote_fields(code)
+        if parts and len(parts) > 36:
+            return {
+                'open': float(parts[5]), 'close': float(parts[3]),
+                'high': float(parts[33]), 'low': float(parts[34]),
+                'volume': int(parts[36]), 'prev_close': float(parts[4])
+            }
+    except Exception:
+        pass
+    return None
+
+
+def load_chart(code: str, chart_type: str, count: int, store=None, cancelled=None):
+    """加载一个图表的数据，code 带交易所前缀，返回 (类型, 数据)：
+    ('bars', 界面格式K线)、('minutes', (日期, 时间, 价格, 单分钟量, 昨收))、
+    ('mock', K线为当日行情 dict 或 None / 分时为昨收)、
+    TYPE_ALL_KLINES 时为 ('periods', {周期: 界面格式K线})；
+    分时连昨收都取不到，或 cancelled() 为真时返回 None"""
+    cancelled = cancelled or (lambda: False)
+    store = store or kline_store.KLineStore()
+    if chart_type == TYPE_ALL_KLINES:
+        loaded = store.load_periods(code, tuple(kline_store.PERIODS.values()), count, cancelled)
+        return 'periods', {name: kline_store.to_display(loaded[period])
+                           for name, period in kline_store.PERIODS.items() if period in loaded}
+    if chart_type == TYPE_INTRADAY:
+        prev_close = fetch_prev_close(code)
+        if not prev_close or cancelled():
+            return None
+        minutes = intraday.fetch_minutes(code)
+        if minutes is None:
+            return 'mock', prev_close
+        return 'minutes', (*minutes, prev_close)
+
+    period = kline_store.PERIODS.get(chart_type, 'day')
+    bars = store.load_period(code, period, count, cancelled)
+    if bars is not None:
+        return 'bars', kline_store.to_display(bars)
+    if cancelled():
+        return None
+    return 'mock', fetch_today(code)
+
+
+class _LoadSignals(QObject):
+    finished = pyqtSignal(int, str, object)  # (请求序号, 周期, load_chart 结果)
+
+
+class ChartLoadTask(QRunnable):
+    """后台加载一个图表的数据
+
+    cancel() 之后不再发起后续请求（已发出的请求无法中断）；
+    无论是否取消都会发出 finished，发起方据此释放引用，并按请求序号丢弃过期结果。
+    low_priority 时以最低线程优先级运行；received 为本次下载的字节数
+    """
+
+    def __init__(self, generation: int, code: str, chart_type: str, count: int, store=None,
+                 low_priority: bool = False):
+        super().__init__()
+        self.setAutoDelete(False)  # 由发起方持有引用
+        self.generation = generation
+        self.code = code
+        self.chart_type = chart_type
+        self.count = count
+        self.store = store
+        self.low_priority = low_priority
+        self.received = 0
+        self.signals = _LoadSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        result = None
+        if self.low_priority:
+            QThread.currentThread().setPriority(QThread.LowestPriority)
+        start = http_client.received_bytes()
+        try:
+            if not self._cancelled.is_set():
+                result = load_chart(self.code, self.chart_type, self.count, self.store,
+                                    self._cancelled.is_set)
+        except Exception as e:
+            print(f'图表数据加载失败: {e}')
+        finally:
+            self.received = http_client.received_bytes() - start
+            self.signals.finished.emit(self.generation, self.chart_type, result)
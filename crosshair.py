@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+十字光标叠加层
+光标线和价格/日期标签是常驻的 animated 图元，只改位置和文字；
+整图重绘后缓存背景，鼠标移动时恢复背景、画光标，逐个 blit 各图元所在的小块区域，
+鼠标事件按屏幕刷新间隔合并处理
+"""
+
+from PyQt5.QtCore import QTimer
+
+FRAME_MS = 16  # 约 60Hz
+
+
+class Crosshair:
+    """主图/副图共用的十字光标
+
+    update(x, y, price_tag, date_tag) 显示或移动光标，hide() 隐藏；
+    坐标轴 clear() 后图元会被移除，下次 update 时自动重建
+    """
+
+    def __init__(self, canvas, ax_main, ax_vol, color: str, tag_bg: str = '#2a2e39'):
+        self.canvas = canvas
+        self.ax_main = ax_main
+        self.ax_vol = ax_vol
+        self.color = color
+        self.tag_bg = tag_bg
+        self._artists = None
+        self._background = None
+        self._last_boxes = []
+        self.visible = False
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _create(self):
+        style = dict(color=self.color, lw=0.5, ls='--', alpha=0.7, animated=True, visible=False)
+        vline = self.ax_main.axvline(0, **style)
+        vline_vol = self.ax_vol.axvline(0, **style)
+        hline = self.ax_main.axhline(0, **style)
+        price_tag = self.ax_main.annotate(
+            '', xy=(1, 0), xycoords=('axes fraction', 'data'),
+            fontsize=8, color='#fff', fontweight='bold', animated=True, visible=False,
+            bbox=dict(boxstyle='round,pad=0.2', fc=self.tag_bg, ec='none', alpha=0.9),
+            va='center', ha='left', annotation_clip=False)
+        date_tag = self.ax_vol.annotate(
+            '', xy=(0, 0), xycoords=('data', 'axes fraction'),
+            fontsize=8, color='#fff', animated=True, visible=False,
+            bbox=dict(boxstyle='round,pad=0.2', fc=self.tag_bg, ec='none', alpha=0.9),
+            va='bottom', ha='center', annotation_clip=False)
+        self._artists = (vline, vline_vol, hline, price_tag, date_tag)
+
+    def _ensure(self):
+        if self._artists is None or self._artists[0].axes is None:
+            self._create()
+
+    def _on_draw(self, event):
+        """整图重绘后重新缓存背景（animated 图元不在背景里），再把光标画回去"""
+        self._background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._last_boxes = []
+        if self.visible and self._artists is not None and self._artists[0].axes is not None:
+            for artist in self._artists:
+                if artist.get_visible():
+                    artist.axes.draw_artist(artist)
+
+    def update(self, x, y=None, price_tag=None, date_tag=None):
+        """移动光标到 x（数据坐标），y 为 None 时不显示横线；
+        price_tag=(文字, 底色) 显示在主图右侧 y 处，date_tag 为文字，显示在副图底部 x 处"""
+        self._ensure()
+        vline, vline_vol, hline, ptag, dtag = self._artists
+        vline.set_xdata([x, x])
+        vline_vol.set_xdata([x, x])
+        vline.set_visible(True)
+        vline_vol.set_visible(True)
+        hline.set_visible(y is not None)
+        if y is not None:
+            hline.set_ydata([y, y])
+        ptag.set_visible(price_tag is not None and y is not None)
+        if ptag.get_visible():
+            text, bg = price_tag
+            ptag.set_text(f' {text} ')
+            ptag.xy = (1, y)
+            ptag.get_bbox_patch().set_facecolor(bg)
+        dtag.set_visible(date_tag is not None)
+        if date_tag is not None:
+            dtag.set_text(f' {date_tag} ')
+            dtag.xy = (x, 0)
+        self.visible = True
+        self._blit()
+
+    def hide(self):
+        if not self.visible:
+            return
+        self.visible = False
+        if self._artists is not None:
+            for artist in self._artists:
+                artist.set_visible(False)
+        self._blit()
+
+    def _blit(self):
+        if self._background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        boxes = []
+        renderer = self.canvas.get_renderer()
+        for artist in self._artists or ():
+            if artist.get_visible():
+                artist.axes.draw_artist(artist)
+                boxes.append(artist.get_window_extent(renderer).padded(2))
+        # 逐个刷新本帧和上一帧各图元覆盖的区域（上一帧的需要擦除）；
+        # 横竖线的合并外框接近整个绘图区，不能合并
+        for box in boxes + self._last_boxes:
+            self.canvas.blit(box)
+        self._last_boxes = boxes
+
+
+class EventThrottle:
+    """把高频鼠标事件合并到每帧最多处理一次，只处理最新的一个"""
+
+    def __init__(self, callback, interval: int = FRAME_MS, parent=None):
+        self.callback = callback
+        self._event = None
+        self._timer = QTimer(parent)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self._fire)
+
+    def push(self, event):
+        self._event = event
+        # 空闲时立即处理，否则等本帧结束时处理最新的一个
+        if not self._timer.isActive():
+            self._fire()
+
+    def cancel(self):
+        self._event = None
+
+    def _fire(self):
+        event, self._event = self._event, None
+        if event is not None:
+            self.callback(event)
+            self._timer.start()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+共享HTTP传输层
+全程序共用一个 requests.Session：按主机保持长连接池，不走系统代理，启动时预连接行情主机
+"""
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_CONNECTIONS = 8   # 缓存连接池的主机数
+POOL_MAXSIZE = 4       # 每个主机保持的长连接数
+
+# 启动时预连接的主机（行情/分时/K线/搜索）
+PRECONNECT_URLS = [
+    'http://qt.gtimg.cn/',
+    'http://web.ifzq.gtimg.cn/',
+    'https://web.ifzq.gtimg.cn/',
+    'http://suggest3.sinajs.cn/',
+]
+
+_session = None
+_session_lock = threading.Lock()
+_traffic = threading.local()  # 各线程累计收到的响应体字节数
+
+
+def get_session() -> requests.Session:
+    """获取共享会话（首次调用时创建）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                # 禁用代理，避免连接到本地代理导致超时
+                s.trust_env = False
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS,
+                                      pool_maxsize=POOL_MAXSIZE)
+                s.mount('http://', adapter)
+                s.mount('https://', adapter)
+                _session = s
+    return _session
+
+
+def get(url: str, timeout: float = 5, **kwargs) -> requests.Response:
+    """GET 请求，复用连接池"""
+    response = get_session().get(url, timeout=timeout, **kwargs)
+    _traffic.received = received_bytes() + len(response.content)
+    return response
+
+
+def received_bytes() -> int:
+    """当前线程累计收到的响应体字节数，前后相减即一段代码的下载量"""
+    return getattr(_traffic, 'received', 0)
+
+
+def preconnect(urls=None):
+    """后台预连接：提前完成DNS解析和TCP/TLS握手，连接留在池中供首轮刷新复用"""
+    def _run():
+        session = get_session()
+        for url in urls or PRECONNECT_URLS:
+            try:
+                session.head(url, timeout=3)
+            except Exception:
+                pass
+
+    threading.Thread(target=_run, name='preconnect', daemon=True).start()
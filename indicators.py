@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+技术指标计算
+输入为价格/成交量序列，输出 numpy 数组；窗口类指标用累加和、分块累积极值与滑动窗口视图向量化，
+EMA/KDJ/RSI 这类递推指标在原生 float 上单次循环
+"""
+
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _as_float(data):
+    return np.asarray(data, dtype=np.float64)
+
+
+def ma(data, period: int):
+    """简单移动平均，前 period-1 个为 nan"""
+    x = _as_float(data)
+    out = np.full(len(x), np.nan)
+    if len(x) >= period:
+        csum = np.cumsum(np.concatenate(([0.0], x)))
+        out[period - 1:] = (csum[period:] - csum[:-period]) / period
+    return out
+
+
+def ema(data, period: int):
+    """指数移动平均，以第一个值为初值"""
+    xs = _as_float(data).tolist()
+    if not xs:
+        return np.empty(0)
+    k = 2 / (period + 1)
+    prev = xs[0]
+    out = [prev]
+    for v in xs[1:]:
+        prev = v * k + prev * (1 - k)
+        out.append(prev)
+    return np.array(out)
+
+
+def _rolling_extreme(data, n: int, op, pad: float):
+    """n 周期滚动极值（van Herk/Gil-Werman）：按 n 分块各累积一次块内前缀/后缀极值，
+    窗口 [i, i+n-1] 至多跨两块，取前一块后缀与后一块前缀合并；O(n)，不生成 n×k 的临时数组"""
+    x = _as_float(data)
+    m = len(x)
+    out = np.full(m, np.nan)
+    if m < n:
+        return out
+    padded = np.full(-(-m // n) * n, pad)
+    padded[:m] = x
+    blocks = padded.reshape(-1, n)
+    prefix = op.accumulate(blocks, axis=1).ravel()
+    suffix = op.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    out[n - 1:] = op(suffix[:m - n + 1], prefix[n - 1:m])
+    return out
+
+
+def rolling_max(data, n: int):
+    """n 周期滚动最高，前 n-1 个为 nan"""
+    return _rolling_extreme(data, n, np.maximum, -np.inf)
+
+
+def rolling_min(data, n: int):
+    """n 周期滚动最低，前 n-1 个为 nan"""
+    return _rolling_extreme(data, n, np.minimum, np.inf)
+
+
+def boll(closes, period: int = 20, nbdev: float = 2):
+    """布林带：中轨=MA20, 上轨=中轨+2*std, 下轨=中轨-2*std，返回 (上, 中, 下)"""
+    x = _as_float(closes)
+    mid = ma(x, period)
+    std = np.full(len(x), np.nan)
+    if len(x) >= period:
+        std[period - 1:] = sliding_window_view(x, period).std(axis=1)
+    return mid + nbdev * std, mid, mid - nbdev * std
+
+
+def macd(closes, fast: int = 12, slow: int = 26, signal: int = 9):
+    """MACD，返回 (DIF, DEA, MACD柱)；数据不足 slow 条时返回空数组"""
+    x = _as_float(closes)
+    if len(x) < slow:
+        return np.empty(0), np.empty(0), np.empty(0)
+    dif = ema(x, fast) - ema(x, slow)
+    dea = ema(dif, signal)
+    return dif, dea, dif - dea
+
+
+def kdj(highs, lows, closes, n: int = 9, m1: int = 3, m2: int = 3):
+    """KDJ，前 n-1 根的 RSV 取 50，K/D 初值 50，返回 (K, D, J)"""
+    c = _as_float(closes)
+    hh = rolling_max(highs, n)
+    ll = rolling_min(lows, n)
+    rng = hh - ll
+    rsv = np.full(len(c), 50.0)
+    ok = ~np.isnan(rng) & (rng != 0)
+    rsv[ok] = (c[ok] - ll[ok]) / rng[ok] * 100
+    k_list, d_list = [], []
+    k, d = 50.0, 50.0
+    for r in rsv.tolist():
+        k = (r + (m1 - 1) * k) / m1
+        d = (k + (m2 - 1) * d) / m2
+        k_list.append(k)
+        d_list.append(d)
+    k_arr, d_arr = np.array(k_list), np.array(d_list)
+    return k_arr, d_arr, 3 * k_arr - 2 * d_arr
+
+
+def rsi(closes, period: int = 6):
+    """Wilder RSI，第一个值对应第 period+1 根K线；数据不足时返回空数组"""
+    x = _as_float(closes)
+    if len(x) < period + 1:
+        return np.empty(0)
+    chg = np.diff(x)
+    gains = np.maximum(chg, 0).tolist()
+    losses = np.maximum(-chg, 0).tolist()
+    ag = sum(gains[:period]) / period
+    al = sum(losses[:period]) / period
+    out = [100 if al == 0 else 100 - 100 / (1 + ag / al)]
+    for g, l in zip(gains[period:], losses[period:]):
+        ag = (ag * (period - 1) + g) / period
+        al = (al * (period - 1) + l) / period
+        out.append(100 if al == 0 else 100 - 100 / (1 + ag / al))
+    return np.array(out, dtype=np.float64)
+
+
+# ================================================================
+#  流式指标：保存递推状态，最后一根K线变化或新增一根时 O(1) 更新
+#  append(...) 新增一根并返回最新值，update_last(...) 修改最后一根并返回最新值
+# ================================================================
+
+class StreamingMA:
+    """简单移动平均，窗口不足时为 nan；维护窗口和，每次更新 O(1)"""
+
+    def __init__(self, period: int = 5):
+        self.period = period
+        self._win = deque(maxlen=period)
+        self._sum = 0.0
+        self._ops = 0
+
+    def _resync(self):
+        # 每 period 次更新重新求和一次，消除累加误差（均摊仍为 O(1)）
+        self._ops += 1
+        if self._ops % self.period == 0:
+            self._sum = sum(self._win)
+
+    def append(self, x):
+        x = float(x)
+        if len(self._win) == self.period:
+            self._sum -= self._win[0]
+        self._win.append(x)
+        self._sum += x
+        self._resync()
+        return self.value()
+
+    def update_last(self, x):
+        x = float(x)
+        self._sum += x - self._win[-1]
+        self._win[-1] = x
+        self._resync()
+        return self.value()
+
+    def value(self):
+        if len(self._win) < self.period:
+            return np.nan
+        return self._sum / self.period
+
+
+class StreamingEMA:
+    """指数移动平均，以第一个值为初值"""
+
+    def __init__(self, period: int):
+        self.k = 2 / (period + 1)
+        self._prev = None   # 倒数第二根的 EMA
+        self.value = np.nan
+        self._count = 0
+
+    def _step(self, x):
+        return x if self._prev is None else x * self.k + self._prev * (1 - self.k)
+
+    def append(self, x):
+        self._prev = self.value if self._count else None
+        self._count += 1
+        self.value = self._step(float(x))
+        return self.value
+
+    def update_last(self, x):
+        self.value = self._step(float(x))
+        return self.value
+
+
+class StreamingBoll:
+    """布林带，返回 (上, 中, 下)
+
+    维护窗口内 (x - 基准) 的和与平方和，每次更新 O(1)；基准取上次重新求和时的窗口均值，
+    减小平方和相减时的精度损失，每 period 次更新重新求和一次
+    """
+
+    def __init__(self, period: int = 20, nbdev: float = 2):
+        self.period = period
+        self.nbdev = nbdev
+        self._win = deque(maxlen=period)
+        self._base = None
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._ops = 0
+
+    def _add(self, x, sign):
+        d = x - self._base
+        self._sum += sign * d
+        self._sumsq += sign * d * d
+
+    def _resync(self):
+        self._ops += 1
+        if self._ops % self.period == 0:
+            self._base = sum(self._win) / len(self._win)
+            devs = [x - self._base for x in self._win]
+            self._sum = sum(devs)
+            self._sumsq = sum(d * d for d in devs)
+
+    def append(self, x):
+        x = float(x)
+        if self._base is None:
+            self._base = x
+        if len(self._win) == self.period:
+            self._add(self._win[0], -1)
+        self._win.append(x)
+        self._add(x, 1)
+        self._resync()
+        return self.value()
+
+    def update_last(self, x):
+        x = float(x)
+        self._add(self._win[-1], -1)
+        self._win[-1] = x
+        self._add(x, 1)
+        self._resync()
+        return self.value()
+
+    def value(self):
+        if len(self._win) < self.period:
+            return np.nan, np.nan, np.nan
+        mean = self._sum / self.period
+        std = max(self._sumsq / self.period - mean * mean, 0.0) ** 0.5
+        mid = self._base + mean
+        return mid + self.nbdev * std, mid, mid - self.nbdev * std
+
+
+class StreamingMACD:
+    """MACD，返回 (DIF, DEA, MACD柱)"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self._fast = StreamingEMA(fast)
+        self._slow = StreamingEMA(slow)
+        self._signal = StreamingEMA(signal)
+
+    def append(self, x):
+        dif = self._fast.append(x) - self._slow.append(x)
+        dea = self._signal.append(dif)
+        return dif, dea, dif - dea
+
+    def update_last(self, x):
+        dif = self._fast.update_last(x) - self._slow.update_last(x)
+        dea = self._signal.update_last(dif)
+        return dif, dea, dif - dea
+
+
+class StreamingKDJ:
+    """KDJ，保存最近 n 根的高低点和上一根的 K/D，返回 (K, D, J)"""
+
+    def __init__(self, n: int = 9, m1: int = 3, m2: int = 3):
+        self.n, self.m1, self.m2 = n, m1, m2
+        self._highs = deque(maxlen=n)
+        self._lows = deque(maxlen=n)
+        self._count = 0
+        self._prev_kd = (50.0, 50.0)
+        self._kd = (50.0, 50.0)
+
+    def _step(self, close):
+        if self._count < self.n:
+            rsv = 50
+        else:
+            hh, ll = max(self._highs), min(self._lows)
+            rsv = (close - ll) / (hh - ll) * 100 if hh != ll else 50
+        pk, pd = self._prev_kd
+        k = (rsv + (self.m1 - 1) * pk) / self.m1
+        d = (k + (self.m2 - 1) * pd) / self.m2
+        self._kd = (k, d)
+        return k, d, 3 * k - 2 * d
+
+    def append(self, high, low, close):
+        self._prev_kd = self._kd
+        self._highs.append(float(high))
+        self._lows.append(float(low))
+        self._count += 1
+        return self._step(float(close))
+
+    def update_last(self, high, low, close):
+        self._highs[-1] = float(high)
+        self._lows[-1] = float(low)
+        return self._step(float(close))
+
+
+class StreamingRSI:
+    """Wilder RSI，前 period 根为 nan
+
+    状态为 (已计入的涨跌次数, 涨幅和, 跌幅和, 平均涨幅, 平均跌幅)，
+    前 period 次涨跌累加求简单平均，之后按 Wilder 平滑
+    """
+
+    def __init__(self, period: int = 6):
+        self.period = period
+        self._committed = (0, 0.0, 0.0, 0.0, 0.0)  # 不含最后一根
+        self._state = self._committed
+        self._prev_close = None
+        self._last_close = None
+
+    def _fold(self, state, chg):
+        m, sg, sl, ag, al = state
+        g, l = max(chg, 0), max(-chg, 0)
+        m += 1
+        p = self.period
+        if m < p:
+            return m, sg + g, sl + l, ag, al
+        if m == p:
+            return m, sg + g, sl + l, (sg + g) / p, (sl + l) / p
+        return m, sg, sl, (ag * (p - 1) + g) / p, (al * (p - 1) + l) / p
+
+    def _value(self):
+        m, _, _, ag, al = self._state
+        if m < self.period:
+            return np.nan
+        return 100 if al == 0 else 100 - 100 / (1 + ag / al)
+
+    def append(self, x):
+        self._committed = self._state
+        self._prev_close, self._last_close = self._last_close, float(x)
+        if self._prev_close is not None:
+            self._state = self._fold(self._committed, self._last_close - self._prev_close)
+        return self._value()
+
+    def update_last(self, x):
+        self._last_close = float(x)
+        if self._prev_close is not None:
+            self._state = self._fold(self._committed, self._last_close - self._prev_close)
+        return self._value()
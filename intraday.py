@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+分时数据
+当日分钟线保存在预分配的 numpy 缓冲区里，盘中按实时行情改写当前分钟或追加新的一分钟，
+不再整段重新获取；接口返回的分钟数据整体转成数组解析，单分钟量和均价用 diff/cumsum 计算
+"""
+
+import json
+import datetime
+import numpy as np
+
+import http_client
+
+MINUTE_URL = 'https://web.ifzq.gtimg.cn/appstock/app/minute/query?_var=min_data&code={}'
+CAPACITY = 242  # 一个交易日的分时点数（9:30 开盘 + 上午 120 + 下午 120）加余量
+
+_AM_OPEN = datetime.time(9, 30)
+_AM_CLOSE = datetime.time(11, 30)
+_PM_OPEN = datetime.time(13, 0)
+_PM_CLOSE = datetime.time(15, 0)
+
+
+def minute_of(t: datetime.datetime):
+    """行情时间归入的分时点：分钟线按结束时刻标记（9:31 为 9:30:00-9:30:59），
+    开盘竞价归入 9:30，午休归入 11:30，收盘后归入 15:00；开盘竞价之前返回 None"""
+    clock = t.time()
+    if clock < datetime.time(9, 25):
+        return None
+    if clock <= _AM_OPEN:
+        clock = _AM_OPEN
+    elif _AM_CLOSE <= clock <= _PM_OPEN:
+        clock = _AM_CLOSE
+    elif clock >= _PM_CLOSE:
+        clock = _PM_CLOSE
+    else:
+        # 向上取整到整分钟
+        m = clock.hour * 60 + clock.minute + (1 if clock.second or clock.microsecond else 0)
+        clock = datetime.time(m // 60, m % 60)
+    return datetime.datetime.combine(t.date(), clock)
+
+
+def parse_minutes(items, day: datetime.date):
+    """把接口返回的 ['HHMM 价格 累计量 累计额', ...] 转为 (时间, 价格, 单分钟量) 数组"""
+    flat = ' '.join(items).split()
+    width = len(flat) // len(items) if items else 0
+    try:
+        if width < 3 or width * len(items) != len(flat):
+            raise ValueError
+        table = np.array(flat, dtype=np.float64).reshape(-1, width)
+    except ValueError:
+        # 字段数不一致或有无法解析的字段时逐条取前三项
+        rows = [item.split()[:3] for item in items]
+        table = np.array([row for row in rows if len(row) == 3], dtype=np.float64).reshape(-1, 3)
+    hhmm = table[:, 0].astype(np.int64)
+    times = np.datetime64(day, 'm') + (hhmm // 100 * 60 + hhmm % 100).astype('timedelta64[m]')
+    prices = table[:, 1]
+    cum_vols = table[:, 2]
+    return times, prices, np.diff(cum_vols, prepend=0.0)
+
+
+def fetch_minutes(code: str):
+    """获取当日分时 (日期, 时间, 价格, 单分钟量)，code 带交易所前缀；失败返回 None"""
+    try:
+        r = http_client.get(MINUTE_URL.format(code), timeout=10)
+        if r.status_code != 200:
+            return None
+        content = r.text.strip()
+        if content.startswith('min_data='):
+            content = content[9:]
+        data = json.loads(content)
+        if data.get('code') != 0:
+            return None
+        sd = data.get('data', {}).get(code, {}).get('data', {})
+        items = sd.get('data', [])
+        if not items:
+            return None
+        try:
+            day = datetime.datetime.strptime(sd.get('date', ''), '%Y%m%d').date()
+        except ValueError:
+            day = datetime.datetime.now().date()
+        return (day, *parse_minutes(items, day))
+    except Exception as e:
+        print(f'分时API失败: {e}')
+        return None
+
+
+def vwap(prices, vols):
+    """逐分钟累计均价（成交量为 0 之前取当时价格）"""
+    prices = np.asarray(prices, dtype=np.float64)
+    vols = np.asarray(vols, dtype=np.float64)
+    total_vol = np.cumsum(vols)
+    total_amount = np.cumsum(prices * vols)
+    out = prices.copy()
+    ok = total_vol > 0
+    out[ok] = total_amount[ok] / total_vol[ok]
+    return out
+
+
+def fill_polygons(x, y, base):
+    """价格线与基准线（昨收）之间的填充多边形，返回 (上方, 下方) 顶点数组；
+    在穿越基准线的位置插入交点，保证填充边界与价格线重合"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    d = y - base
+    cross = np.flatnonzero(d[:-1] * d[1:] < 0)
+    xc = x[cross] + d[cross] / (d[cross] - d[cross + 1]) * (x[cross + 1] - x[cross])
+    xs = np.insert(x, cross + 1, xc)
+    ys = np.insert(y, cross + 1, base)
+    polys = []
+    for top in (np.maximum(ys, base), np.minimum(ys, base)):
+        verts = np.empty((len(xs) + 2, 2))
+        verts[1:-1, 0] = xs
+        verts[1:-1, 1] = top
+        verts[0] = (xs[0], base)
+        verts[-1] = (xs[-1], base)
+        polys.append(verts)
+    return polys[0], polys[1]
+
+
+class MinuteSeries:
+    """当日分时序列
+
+    times/prices/avgs/vols 为容量 capacity 的缓冲区，前 n 项有效，view() 返回有效部分的视图。
+    push() 接收实时行情（时间、现价、当日累计成交量）：落在最后一分钟内时改写最后一点，
+    更晚时追加一点，该分钟成交量 = 累计量 - 之前各分钟之和
+    """
+
+    def __init__(self, day: datetime.date, prev_close: float, times=(), prices=(), vols=(),
+                 avgs=None, capacity: int = CAPACITY):
+        n = len(prices)
+        capacity = max(capacity, n)
+        self.day = day
+        self.prev_close = prev_close
+        self.times = np.empty(capacity, dtype='datetime64[m]')
+        self.prices = np.empty(capacity)
+        self.avgs = np.empty(capacity)
+        self.vols = np.empty(capacity)
+        self.n = n
+        if n:
+            self.times[:n] = np.asarray(times, dtype='datetime64[m]')
+            self.prices[:n] = prices
+            self.vols[:n] = vols
+            self.avgs[:n] = vwap(prices, vols) if avgs is None else avgs
+        # 最后一分钟之前的成交量/成交额合计
+        self._volume = float(self.vols[:n - 1].sum()) if n else 0.0
+        self._amount = float(self.prices[:n - 1] @ self.vols[:n - 1]) if n else 0.0
+
+    def __len__(self):
+        return self.n
+
+    def snapshot(self):
+        """缓存格式 (日期, 昨收, 时间, 价格, 均价, 单分钟量)：复制有效部分，之后追加不影响快照。
+        保存的是换算后的单分钟量和均价，不是接口原始的累计量，from_snapshot 原样还原"""
+        return (self.day, self.prev_close, *(a.copy() for a in self.view()))
+
+    @classmethod
+    def from_snapshot(cls, snap):
+        day, prev_close, times, prices, avgs, vols = snap
+        return cls(day, prev_close, times, prices, vols, avgs)
+
+    def view(self):
+        """(时间, 价格, 均价, 成交量) 有效部分的视图"""
+        n = self.n
+        return self.times[:n], self.prices[:n], self.avgs[:n], self.vols[:n]
+
+    def _grow(self):
+        capacity = len(self.prices) * 2
+        for name in ('times', 'prices', 'avgs', 'vols'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def push(self, t: datetime.datetime, price: float, cum_vol: float):
+        """按行情更新，返回 'update'（改写最后一点）或 'append'（新增一点）；
+        不是当天或早于最后一点时返回 None"""
+        if t.date() != self.day:
+            return None
+        minute = np.datetime64(t, 'm')
+        n = self.n
+        if n and minute < self.times[n - 1]:
+            return None
+        if n and minute == self.times[n - 1]:
+            i, action = n - 1, 'update'
+        else:
+            if n:
+                self._volume += self.vols[n - 1]
+                self._amount += self.prices[n - 1] * self.vols[n - 1]
+            if n == len(self.prices):
+                self._grow()
+            i, action = n, 'append'
+            self.times[i] = minute
+            self.n += 1
+        vol = max(float(cum_vol) - self._volume, 0.0)
+        total = self._volume + vol
+        self.prices[i] = price
+        self.vols[i] = vol
+        self.avgs[i] = (self._amount + price * vol) / total if total > 0 else price
+        return action
+
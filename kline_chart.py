@@ -4,15 +4,20 @@
 独立于主程序，提供K线蜡烛图、技术指标等功能
 """
 
-import json
 import datetime
 import numpy as np
-import requests
+import chart_data
+import indicators
+import intraday
+from candles import CandleRenderer, SparseTable, rect_verts
+from crosshair import Crosshair, EventThrottle
 from PyQt5.QtWidgets import (QDialog, QLabel, QVBoxLayout, QHBoxLayout,
                              QPushButton, QButtonGroup, QApplication)
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThreadPool
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import to_rgba
 from matplotlib.gridspec import GridSpec
 import matplotlib.pyplot as plt
 
@@ -40,7 +45,7 @@ class KLineDialog(QDialog):
     """专业K线图表对话框"""
 
     # 图表类型
-    TYPE_INTRADAY = '分时'
+    TYPE_INTRADAY = chart_data.TYPE_INTRADAY
     TYPE_DAILY = '日K'
     TYPE_WEEKLY = '周K'
     TYPE_MONTHLY = '月K'
@@ -49,8 +54,11 @@ class KLineDialog(QDialog):
     TYPE_RSI = 'RSI'
     TYPE_BOLL = 'BOLL'
 
-    _cache = {}
-    _CACHE_TTL = 300
+    COUNTS = (60, 120, chart_data.KLINE_COUNT)  # 可选显示条数，数据按最大条数获取一次
+
+    # 各窗口和预取共用的图表数据缓存与K线存储
+    _cache = chart_data.CACHE
+    _store = chart_data.STORE
 
     def __init__(self, stock_code: str, stock_name: str, parent=None):
         super().__init__(parent)
@@ -66,6 +74,17 @@ class KLineDialog(QDialog):
         self.lows = []
         self.closes = []
         self.volumes = []
+        self._bars = ([], [], [], [], [], [])  # 全部已加载K线，上面各列是其最近 data_count 条
+        self._data_version = 0  # K线数据每次替换加一，指标缓存据此失效
+        self._memo_key = None
+        self._memo_cache = {}
+        self._streams = None    # 实时更新用的流式指标 {指标名: (对象, 输入列)}
+        self._streams_key = None
+        self._candles = CandleRenderer(C_UP, C_DOWN)
+        self._ma_lines = {}
+        self._vol_ma_lines = {}
+        self._ranges = None     # 可见区间纵轴范围查询 (最高, 最低, 成交量) 稀疏表
+        self._kline_layout = None  # 上次整体绘制K线时的 (条数, 是否BOLL, 横轴范围)
 
         # 分时数据
         self._fs_times = []
@@ -73,13 +92,11 @@ class KLineDialog(QDialog):
         self._fs_avg = []
         self._fs_vols = []
         self._fs_prev_close = 0.0
+        self._fs = None           # intraday.MinuteSeries，上面几项是它的视图
+        self._fs_live = False     # 是否可以用实时行情追加（模拟数据不追加）
+        self._fs_artists = None   # (价格线, 均价线, 上方填充, 下方填充, 成交量柱)
+        self._fs_pct_ax = None    # 右侧涨跌幅坐标轴
 
-        # 悬停
-        self._hover_vline = None
-        self._hover_vline_vol = None
-        self._hover_hline = None
-        self._hover_price_tag = None
-        self._hover_date_tag = None
 
         # 缩放状态
         self._zoom_xlim = None  # None = 显示全部
@@ -95,8 +112,21 @@ class KLineDialog(QDialog):
         self._pan_start_x = None
         self._pan_start_xlim = None
 
+        # 后台加载：每次请求递增序号，只绘制与当前序号一致的结果
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(2)
+        self._load_gen = 0
+        self._load_tasks = set()
+        self._loading = False
+
         self._build_ui()
-        self._load_intraday()
+        self._request_data(self.TYPE_INTRADAY)
+        # 订阅主窗口行情中心，日K最后一根随行情更新，分时图追加新的一分钟
+        if parent is not None and hasattr(parent, 'quote_store'):
+            parent.quote_store.updated.connect(self._on_quotes_updated)
+        # 本股票不在主窗口列表里时也随主窗口一起刷新行情，刷新节奏由主窗口按交易时段调度
+        if parent is not None and hasattr(parent, 'watch_quote'):
+            parent.watch_quote(self.stock_code)
         # 分时模式隐藏K线专属控件
         for btn in self._count_btns:
             btn.setVisible(False)
@@ -163,7 +193,7 @@ class KLineDialog(QDialog):
         row1.addWidget(sep)
 
         self._count_btns = []
-        for n in [60, 120, 250]:
+        for n in self.COUNTS:
             btn = QPushButton(str(n))
             btn.setCheckable(True)
             btn.clicked.connect(lambda _, cnt=n: self._switch_count(cnt))
@@ -236,11 +266,15 @@ class KLineDialog(QDialog):
         self._style_ax(self.ax_vol, show_x=True)
         plt.setp(self.ax_main.get_xticklabels(), visible=False)
 
+        # 十字光标叠加层，鼠标移动按帧合并处理
+        self._crosshair = Crosshair(self.canvas, self.ax_main, self.ax_vol, C_CROSS)
+        self._hover_throttle = EventThrottle(self._handle_hover, parent=self)
         self.canvas.mpl_connect('motion_notify_event', self._on_hover)
         self.canvas.mpl_connect('scroll_event', self._on_scroll)
         self.canvas.mpl_connect('button_press_event', self._on_click)
         self.canvas.mpl_connect('button_release_event', self._on_release)
         self.canvas.mpl_connect('key_press_event', self._on_key)
+        self.canvas.mpl_connect('resize_event', lambda _: self._update_viewport())
 
         root.addWidget(self.canvas)
         self.setLayout(root)
@@ -277,16 +311,15 @@ class KLineDialog(QDialog):
             btn.setVisible(not is_fs)
         self.sender()  # avoid unused
         # 刷新数据
-        if is_fs:
-            self._load_intraday()
-        else:
-            self._load_data(chart_type)
+        self._request_data(chart_type)
 
     def _switch_count(self, count):
         for btn in self._count_btns:
             btn.setChecked(btn.text() == str(count))
         self.data_count = count
-        self._load_data(self.chart_type)
+        # 加载中时，结果到达后按新的条数显示
+        if not self._loading:
+            self._request_data(self.chart_type)
 
     def _switch_indicator(self, indicator):
         for btn in self._ind_btns:
@@ -321,82 +354,77 @@ class KLineDialog(QDialog):
     #  数据加载
     # ================================================================
 
-    def _load_data(self, chart_type):
-        # 缓存
-        key = f'kline_{chart_type}_{self.stock_code}_{self.data_count}'
-        if key in self._cache:
-            ts, d = self._cache[key]
-            if (datetime.datetime.now() - ts).seconds < self._CACHE_TTL:
-                self.dates, self.opens, self.highs, self.lows, self.closes, self.volumes = d
-                self._draw()
+    def _request_data(self, chart_type):
+        """显示 chart_type 的数据：缓存命中时直接绘制，否则先画加载中占位图，
+        在后台获取；之前未完成的请求作废"""
+        self._cancel_loading()
+        if chart_type == self.TYPE_INTRADAY:
+            if self._load_intraday_cached():
                 return
-
-        if self._fetch_tencent(chart_type):
+        elif self._load_cached(chart_type):
             return
+        self._loading = True
+        self._draw_loading()
+        task = chart_data.ChartLoadTask(self._load_gen, self._code_prefix(), chart_type,
+                                        chart_data.KLINE_COUNT, self._store)
+        task.signals.finished.connect(self._on_data_loaded)
+        self._load_tasks.add(task)
+        self._pool.start(task)
+
+    def _cancel_loading(self):
+        """作废进行中的请求：还在排队的直接移出线程池，已开始的不再发起后续请求"""
+        self._load_gen += 1
+        self._loading = False
+        for task in list(self._load_tasks):
+            task.cancel()
+            if self._pool.tryTake(task):
+                self._load_tasks.discard(task)
+
+    def _on_data_loaded(self, generation, chart_type, result):
+        self._load_tasks = {t for t in self._load_tasks if t.generation != generation}
+        kind, payload = result if result is not None else (None, None)
+        # 过期的结果也写入缓存，切回来时直接使用
+        data = chart_data.cache_result(self.stock_code, chart_type, result, self._cache)
+        if generation != self._load_gen or chart_type != self.chart_type:
+            return
+        self._loading = False
+        if chart_type == self.TYPE_INTRADAY:
+            if data is not None:
+                self._set_intraday(data, live=True)
+            elif kind == 'mock':
+                self._gen_mock_intraday(payload)
+            self._draw_intraday()
+        else:
+            if data is not None:
+                self._set_bars(data)
+            else:
+                self._gen_mock(payload or {'open': 100, 'close': 101, 'high': 102, 'low': 99,
+                                           'volume': 100000, 'prev_close': 100})
+            self._draw()
+
+    def _load_cached(self, chart_type) -> bool:
+        # 缓存（按最大条数保存，不同条数共用）
+        d = self._cache.get(chart_data.cache_key(self.stock_code, chart_type))
+        if d is None:
+            return False
+        self._set_bars(d)
+        self._draw()
+        return True
 
-        self._fallback_mock()
+    def _set_bars(self, bars):
+        """设置全部K线并取最近 data_count 条（数组切片，不复制数据）"""
+        if bars is not self._bars:
+            self._bars = bars
+            self._data_version += 1
+        n = self.data_count
+        self.dates, self.opens, self.highs, self.lows, self.closes, self.volumes = (
+            col[-n:] for col in bars)
 
     def _code_prefix(self):
         if self.stock_code.startswith(('sh', 'sz')):
             return self.stock_code
         return ('sh' if self.stock_code[0] in ('6', '5') else 'sz') + self.stock_code
 
-    def _fetch_tencent(self, chart_type):
-        period = {'日K': 'day', '周K': 'week', '月K': 'month'}.get(chart_type, 'day')
-        try:
-            code = self._code_prefix()
-            url = f'http://web.ifzq.gtimg.cn/appstock/app/fqkline/get?param={code},{period},,,{self.data_count},qfq'
-            r = requests.get(url, timeout=10, proxies={'http': None, 'https': None})
-            if r.status_code != 200:
-                return False
-            data = r.json()
-            if data.get('code') != 0:
-                return False
-            sd = data['data'].get(code, {})
-            items = sd.get(f'qfq{period}', []) or sd.get(period, [])
-            if not items:
-                return False
-
-            self.dates = [x[0] for x in items]
-            self.opens = [float(x[1]) for x in items]
-            self.highs = [float(x[2]) for x in items]
-            self.lows = [float(x[3]) for x in items]
-            self.closes = [float(x[4]) for x in items]
-            self.volumes = [int(float(x[5])) for x in items]
-
-            key = f'kline_{chart_type}_{self.stock_code}_{self.data_count}'
-            self._cache[key] = (datetime.datetime.now(),
-                               (self.dates, self.opens, self.highs,
-                                self.lows, self.closes, self.volumes))
-            self._draw()
-            return True
-        except Exception as e:
-            print(f'腾讯K线API失败: {e}')
-            return False
-
-    def _fallback_mock(self):
-        """用实时行情生成模拟K线"""
-        try:
-            code = self._code_prefix()
-            url = f'http://qt.gtimg.cn/q={code}'
-            r = requests.get(url, timeout=10, proxies={'http': None, 'https': None})
-            if r.status_code == 200:
-                parts = r.content.decode('gbk').strip().split('~')
-                if len(parts) > 36:
-                    today = {
-                        'open': float(parts[5]), 'close': float(parts[3]),
-                        'high': float(parts[33]), 'low': float(parts[34]),
-                        'volume': int(parts[36]), 'prev_close': float(parts[4])
-                    }
-                    self._gen_mock(today)
-                    self._draw()
-                    return
-        except Exception:
-            pass
-        self._gen_mock({'open': 100, 'close': 101, 'high': 102, 'low': 99,
-                        'volume': 100000, 'prev_close': 100})
-        self._draw()
-
     def _gen_mock(self, today):
         import random
         base = today['prev_close']
@@ -418,169 +446,94 @@ class KLineDialog(QDialog):
         self.opens.append(today['open']); self.highs.append(today['high'])
         self.lows.append(today['low']); self.closes.append(today['close'])
         self.volumes.append(today['volume'])
+        self._bars = (self.dates, self.opens, self.highs, self.lows, self.closes, self.volumes)
+        self._data_version += 1
 
     # ================================================================
     #  分时数据
     # ================================================================
 
-    def _load_intraday(self):
-        """加载分时数据"""
-        # 检查缓存
-        key = f'fs_{self.stock_code}'
-        if key in self._cache:
-            ts, d = self._cache[key]
-            if (datetime.datetime.now() - ts).seconds < 120:
-                self._fs_times, self._fs_prices, self._fs_avg, self._fs_vols, self._fs_prev_close = d
-                self._draw_intraday()
-                return
-
-        code = self._code_prefix()
-        prev_close = self._fetch_prev_close(code)
-
-        # 获取分钟数据
+    def _load_intraday_cached(self) -> bool:
+        d = self._cache.get(chart_data.cache_key(self.stock_code, self.TYPE_INTRADAY))
+        if d is None:
+            return False
+        self._set_intraday(intraday.MinuteSeries.from_snapshot(d), live=True)
+        self._draw_intraday()
+        return True
+
+    def _set_intraday(self, series, live):
+        """替换分时序列；live 表示数据来自服务器，可以接着用实时行情追加"""
+        self._fs = series
+        self._fs_live = live
+        self._fs_prev_close = series.prev_close
+        self._fs_times, self._fs_prices, self._fs_avg, self._fs_vols = series.view()
+
+    def _cache_intraday(self):
+        chart_data.cache_series(self.stock_code, self._fs, self._cache)
+
+    def _push_intraday(self, info):
+        """实时行情并入分时序列：同一分钟改写最后一点，新的一分钟追加一点，原地更新图元"""
+        if self._fs is None or not self._fs_live or not info.timestamp:
+            return
         try:
-            url = f'https://web.ifzq.gtimg.cn/appstock/app/minute/query?_var=min_data&code={code}'
-            r = requests.get(url, timeout=10, proxies={'http': None, 'https': None})
-            if r.status_code == 200:
-                content = r.text.strip()
-                if content.startswith('min_data='):
-                    content = content[9:]
-                data = json.loads(content)
-                if data.get('code') == 0:
-                    sd = data.get('data', {}).get(code, {})
-                    minute_list = sd.get('data', {}).get('data', [])
-                    if minute_list and prev_close:
-                        times, prices, avgs, vols = [], [], [], []
-                        today = datetime.datetime.now().date()
-                        for item in minute_list:
-                            parts = item.split()
-                            if len(parts) >= 3:
-                                t = parts[0]
-                                h, m = int(t[:2]), int(t[2:4])
-                                dt = datetime.datetime.combine(today, datetime.time(h, m))
-                                times.append(dt)
-                                prices.append(float(parts[1]))
-                                avgs.append(float(parts[2]))
-                                vols.append(int(float(parts[3])))
-
-                        # avgs 是累积成交量，转换为单分钟量
-                        minute_vols = [int(avgs[0])] if avgs else []
-                        for i in range(1, len(avgs)):
-                            minute_vols.append(int(avgs[i]) - int(avgs[i - 1]))
-
-                        self._fs_times = times
-                        self._fs_prices = prices
-                        self._fs_avg = [prices[0]] if prices else []  # parts[2]实际是累积量，暂用价格初始化
-                        self._fs_vols = minute_vols
-                        self._fs_prev_close = prev_close
-
-                        # 重新计算均价线
-                        total_amount = 0.0
-                        total_vol = 0
-                        self._fs_avg = []
-                        for pi, vi in zip(prices, minute_vols):
-                            total_amount += pi * vi
-                            total_vol += vi
-                            self._fs_avg.append(total_amount / total_vol if total_vol > 0 else pi)
-
-                        self._cache[key] = (datetime.datetime.now(),
-                                            (times[:], prices[:], avgs[:], vols[:], prev_close))
-                        self._draw_intraday()
-                        return
-        except Exception as e:
-            print(f'分时API失败: {e}')
-
-        # 生成模拟分时数据
-        if prev_close:
-            self._gen_mock_intraday(prev_close)
+            ts = datetime.datetime.strptime(info.timestamp[:14], '%Y%m%d%H%M%S')
+        except ValueError:
+            return
+        t = intraday.minute_of(ts)
+        if t is None or self._fs.push(t, info.price, info.volume) is None:
+            return
+        self._set_intraday(self._fs, live=True)
+        self._cache_intraday()
+        if self._fs_artists is not None and self._fs_artists[0].axes is self.ax_main:
+            self._update_intraday()
+            self.canvas.draw_idle()
+        else:
             self._draw_intraday()
 
-    def _fetch_prev_close(self, code):
-        """获取昨收价"""
-        try:
-            url = f'http://qt.gtimg.cn/q={code}'
-            r = requests.get(url, timeout=10, proxies={'http': None, 'https': None})
-            if r.status_code == 200:
-                parts = r.content.decode('gbk').strip().split('~')
-                if len(parts) > 4:
-                    return float(parts[4])
-        except Exception:
-            pass
-        return None
-
     def _gen_mock_intraday(self, prev_close):
         """生成模拟分时数据"""
         import random
-        times, prices, avgs, vols = [], [], [], []
+        times, prices, vols = [], [], []
         today = datetime.datetime.now().date()
         price = prev_close
-        total_vol = 0
-        total_amount = 0
         for h, m_range in [(9, range(30, 60)), (10, range(0, 60)), (11, range(0, 30)),
                            (13, range(0, 60)), (14, range(0, 60)), (15, range(0, 1))]:
             for m in m_range:
                 dt = datetime.datetime.combine(today, datetime.time(h, m))
                 times.append(dt)
                 price += random.uniform(-prev_close * 0.002, prev_close * 0.002)
-                vol = random.randint(100, 5000)
-                total_vol += vol
-                total_amount += price * vol
                 prices.append(round(price, 2))
-                avgs.append(round(total_amount / total_vol, 2))
-                vols.append(vol)
-        self._fs_times = times
-        self._fs_prices = prices
-        self._fs_avg = avgs
-        self._fs_vols = vols
-        self._fs_prev_close = prev_close
+                vols.append(random.randint(100, 5000))
+        self._set_intraday(intraday.MinuteSeries(today, prev_close, times, prices, vols), live=False)
 
     def _draw_intraday(self):
         """绘制分时走势图（无午休断档）"""
         self._clear()
+        self._fs_artists = None
         ax_p = self.ax_main
         ax_v = self.ax_vol
 
-        if not self._fs_times:
+        if not len(self._fs_times):
             ax_p.text(0.5, 0.5, '暂无分时数据', ha='center', va='center',
                       fontsize=14, color=C_DIM, transform=ax_p.transAxes)
             self.canvas.draw()
             return
 
         prev = self._fs_prev_close
-        cur = self._fs_prices[-1]
-        chg = cur - prev
-        pct = chg / prev * 100 if prev > 0 else 0
-        is_up = chg >= 0
-        color = C_UP if is_up else C_DOWN
 
-        # 用整数索引作为x轴，避免午休断档
-        n = len(self._fs_times)
-        x = np.arange(n)
-        p = self._fs_prices
-
-        # 渐变填充
-        ax_p.fill_between(x, p, prev,
-                          where=[v >= prev for v in p], color=C_UP, alpha=0.12, interpolate=True)
-        ax_p.fill_between(x, p, prev,
-                          where=[v < prev for v in p], color=C_DOWN, alpha=0.12, interpolate=True)
-
-        # 价格线
-        ax_p.plot(x, p, color=color, linewidth=1.5, antialiased=True, zorder=3)
-
-        # 均价线
-        if self._fs_avg:
-            ax_p.plot(x, self._fs_avg, color='#ffa726', linewidth=1.0, alpha=0.85, zorder=2)
+        # 渐变填充（昨收上方/下方），价格线、均价线，数据由 _update_intraday 填入
+        fill_up = PolyCollection([], facecolors=C_UP, edgecolors='none', alpha=0.12)
+        fill_down = PolyCollection([], facecolors=C_DOWN, edgecolors='none', alpha=0.12)
+        ax_p.add_collection(fill_up)
+        ax_p.add_collection(fill_down)
+        price_line, = ax_p.plot([], [], linewidth=1.5, antialiased=True, zorder=3)
+        avg_line, = ax_p.plot([], [], color='#ffa726', linewidth=1.0, alpha=0.85, zorder=2)
 
         # 昨收线
         ax_p.axhline(prev, color=C_DIM, ls='--', lw=0.5, alpha=0.6)
         ax_p.annotate(f'昨收 {prev:.2f}', xy=(1.0, prev), xycoords=('axes fraction', 'data'),
                       fontsize=8, color=C_DIM, va='center',
                       bbox=dict(boxstyle='round,pad=0.2', fc=C_BG, ec='none', alpha=0.8))
-
-        # Y轴对称
-        p_min, p_max = min(p), max(p)
-        max_dev = max(abs(p_max - prev), abs(p_min - prev), prev * 0.005)
-        ax_p.set_ylim(prev - max_dev * 1.15, prev + max_dev * 1.15)
         ax_p.yaxis.set_major_formatter(plt.FuncFormatter(lambda v, _: f'{v:.2f}'))
 
         # 右侧涨跌幅
@@ -592,20 +545,59 @@ class KLineDialog(QDialog):
         ax_pct.spines['right'].set_color(C_GRID)
         ax_pct.yaxis.set_major_formatter(plt.FuncFormatter(
             lambda v, _: f'{(v - prev) / prev * 100:+.2f}%'))
-        ax_pct.set_ylim(prev - max_dev * 1.15, prev + max_dev * 1.15)
+        self._fs_pct_ax = ax_pct
 
         # 成交量
-        v_colors = [C_UP if p[i] >= (prev if i == 0 else p[i-1])
-                    else C_DOWN for i in range(n)]
-        ax_v.bar(x, self._fs_vols, width=1.0, color=v_colors, alpha=0.7, edgecolor='none')
+        vol_bars = PolyCollection([], edgecolors='none', alpha=0.7)
+        ax_v.add_collection(vol_bars)
         ax_v.yaxis.set_major_formatter(plt.FuncFormatter(self._vol_fmt))
 
+        self._fs_artists = (price_line, avg_line, fill_up, fill_down, vol_bars)
+        self._update_intraday()
+        self.canvas.draw()
+
+    def _update_intraday(self):
+        """用当前分时数据原地更新价格线、均价线、填充、成交量柱、坐标范围和标题"""
+        price_line, avg_line, fill_up, fill_down, vol_bars = self._fs_artists
+        ax_p = self.ax_main
+        ax_v = self.ax_vol
+        prev = self._fs_prev_close
+        p = self._fs_prices
+        cur = p[-1]
+        chg = cur - prev
+        pct = chg / prev * 100 if prev > 0 else 0
+        is_up = chg >= 0
+        color = C_UP if is_up else C_DOWN
+
+        # 用整数索引作为x轴，避免午休断档
+        n = len(p)
+        x = np.arange(n)
+        up, down = intraday.fill_polygons(x, p, prev)
+        fill_up.set_verts([up])
+        fill_down.set_verts([down])
+        price_line.set_data(x, p)
+        price_line.set_color(color)
+        avg_line.set_data(x, self._fs_avg)
+        ax_p.relim()
+        ax_p.autoscale_view(scaley=False)
+
+        # Y轴对称
+        max_dev = max(abs(p.max() - prev), abs(p.min() - prev), prev * 0.005)
+        ax_p.set_ylim(prev - max_dev * 1.15, prev + max_dev * 1.15)
+        self._fs_pct_ax.set_ylim(prev - max_dev * 1.15, prev + max_dev * 1.15)
+
+        # 成交量，颜色按与上一分钟（第一分钟与昨收）比较
+        rising = p >= np.r_[prev, p[:-1]]
+        vol_bars.set_verts(rect_verts(x, 0.0, self._fs_vols, 1.0))
+        vol_bars.set_facecolor(np.where(rising[:, None], to_rgba(C_UP), to_rgba(C_DOWN)))
+        vmax = float(self._fs_vols.max())
+        ax_v.set_ylim(0, vmax * 1.05 if vmax > 0 else 1)
+
         # X轴时间标签
         step = max(1, n // 6)
         ticks = list(range(0, n, step))
-        time_labels = [self._fs_times[i].strftime('%H:%M') for i in ticks]
         ax_v.set_xticks(ticks)
-        ax_v.set_xticklabels(time_labels, fontsize=8, color=C_DIM)
+        ax_v.set_xticklabels([self._fs_time_str(i) for i in ticks], fontsize=8, color=C_DIM)
 
         # 标题
         sign = '+' if is_up else ''
@@ -615,100 +607,213 @@ class KLineDialog(QDialog):
         self._change_lbl.setStyleSheet(f'font-size: 12px; font-weight: bold; color: {color};')
         self._info.setText(f'<span style="color:{C_DIM}">均价:{self._fs_avg[-1]:.2f}</span>')
 
-        self.canvas.draw()
+    def _fs_time_str(self, i):
+        """第 i 个分时点的 'HH:MM'"""
+        return str(self._fs_times[i])[11:16]
+
+    # ================================================================
     #  指标计算
     # ================================================================
 
     @staticmethod
     def _ma(data, period):
-        out = []
-        for i in range(len(data)):
-            if i < period - 1:
-                out.append(np.nan)
-            else:
-                out.append(np.mean(data[i - period + 1:i + 1]))
-        return out
+        return indicators.ma(data, period)
 
     @staticmethod
     def _ema(data, period):
-        out = [data[0]]
-        k = 2 / (period + 1)
-        for i in range(1, len(data)):
-            out.append(data[i] * k + out[-1] * (1 - k))
-        return out
+        return indicators.ema(data, period)
+
+    def _memo(self) -> dict:
+        """当前数据版本的指标缓存 {指标名: 结果}，数据替换后清空"""
+        key = (self.stock_code, self.chart_type, self._data_version)
+        if key != self._memo_key:
+            self._memo_key = key
+            self._memo_cache = {}
+        return self._memo_cache
+
+    def _indicator(self, name):
+        """指标结果：按数据版本（代码、周期、数据替换次数）缓存，
+        在全部已加载K线上计算，返回与当前显示条数对齐的部分"""
+        value = self._memo().get(name)
+        if value is None:
+            value = self._memo_cache[name] = self._compute_indicator(name)
+        n = len(self.closes)
+        if isinstance(value, tuple):
+            return tuple(v[max(len(v) - n, 0):] for v in value)
+        return value[max(len(value) - n, 0):]
+
+    def _compute_indicator(self, name):
+        _, _, highs, lows, closes, _ = self._bars
+        kind = name[0]
+        if kind == 'ma':
+            return indicators.ma(closes, name[1])
+        if kind == 'boll':
+            return indicators.boll(closes, name[1], name[2])
+        if kind == 'macd':
+            return indicators.macd(closes)
+        if kind == 'kdj':
+            return indicators.kdj(highs, lows, closes, *name[1:])
+        # RSI 前面补 nan，与K线逐根对齐
+        rsi = indicators.rsi(closes, name[1])
+        return np.concatenate((np.full(len(closes) - len(rsi), np.nan), rsi))
+
+    def _close_ma(self, period):
+        return self._indicator(('ma', period))
 
     def _calc_boll(self, period=20, nbdev=2):
         """布林带：中轨=MA20, 上轨=中轨+2*std, 下轨=中轨-2*std"""
-        mid = self._ma(self.closes, period)
-        upper, lower = [], []
-        for i in range(len(self.closes)):
-            if i < period - 1:
-                upper.append(np.nan); lower.append(np.nan)
-            else:
-                std = np.std(self.closes[i - period + 1:i + 1])
-                upper.append(mid[i] + nbdev * std)
-                lower.append(mid[i] - nbdev * std)
-        return upper, mid, lower
+        return self._indicator(('boll', period, nbdev))
 
     def _calc_macd(self):
-        if len(self.closes) < 26:
-            return [], [], []
-        dif = [a - b for a, b in zip(self._ema(self.closes, 12), self._ema(self.closes, 26))]
-        dea = self._ema(dif, 9)
-        macd = [a - b for a, b in zip(dif, dea)]
-        return dif, dea, macd
+        return self._indicator(('macd',))
 
     def _calc_kdj(self, n=9, m1=3, m2=3):
-        k_list, d_list, j_list = [], [], []
-        for i in range(len(self.closes)):
-            if i < n - 1:
-                rsv = 50
-            else:
-                hh = max(self.highs[i - n + 1:i + 1])
-                ll = min(self.lows[i - n + 1:i + 1])
-                rsv = (self.closes[i] - ll) / (hh - ll) * 100 if hh != ll else 50
-            k = (rsv + (m1 - 1) * (k_list[-1] if k_list else 50)) / m1
-            d = (k + (m2 - 1) * (d_list[-1] if d_list else 50)) / m2
-            j = 3 * k - 2 * d
-            k_list.append(k); d_list.append(d); j_list.append(j)
-        return k_list, d_list, j_list
+        return self._indicator(('kdj', n, m1, m2))
 
     def _calc_rsi(self, period=6):
-        if len(self.closes) < period + 1:
-            return []
-        gains, losses = [], []
-        for i in range(1, len(self.closes)):
-            chg = self.closes[i] - self.closes[i - 1]
-            gains.append(max(chg, 0)); losses.append(max(-chg, 0))
-        ag = sum(gains[:period]) / period
-        al = sum(losses[:period]) / period
-        out = [100 if al == 0 else 100 - 100 / (1 + ag / al)]
-        for i in range(period, len(gains)):
-            ag = (ag * (period - 1) + gains[i]) / period
-            al = (al * (period - 1) + losses[i]) / period
-            out.append(100 if al == 0 else 100 - 100 / (1 + ag / al))
-        return out
+        return self._indicator(('rsi', period))
+
+    # ================================================================
+    #  实时更新
+    # ================================================================
+
+    def _build_streams(self):
+        """用全部K线建立流式指标状态，之后每个行情只做 O(1) 更新"""
+        _, _, highs, lows, closes, _ = self._bars
+        streams = {('ma', p): (indicators.StreamingMA(p), 'c') for p in (5, 10, 20, 60)}
+        streams[('boll', 20, 2)] = (indicators.StreamingBoll(20, 2), 'c')
+        streams[('macd',)] = (indicators.StreamingMACD(), 'c')
+        streams[('kdj', 9, 3, 3)] = (indicators.StreamingKDJ(9, 3, 3), 'hlc')
+        streams[('rsi', 6)] = (indicators.StreamingRSI(6), 'c')
+        for h, l, c in zip(highs.tolist(), lows.tolist(), closes.tolist()):
+            for obj, cols in streams.values():
+                obj.append(h, l, c) if cols == 'hlc' else obj.append(c)
+        self._streams = streams
+        self._streams_key = (self.stock_code, self.chart_type, self._data_version)
+
+    def _step_streams(self, h, l, c, append):
+        """推进流式指标，并把最新值写进（或追加到）已缓存的指标数组"""
+        n = len(self._bars[0])
+        for name, (obj, cols) in self._streams.items():
+            step = obj.append if append else obj.update_last
+            value = step(h, l, c) if cols == 'hlc' else step(c)
+            cached = self._memo().get(name)
+            if cached is None:
+                continue
+            arrays = cached if isinstance(cached, tuple) else (cached,)
+            values = value if isinstance(cached, tuple) else (value,)
+            # 数据不足时向量化结果可能是空数组，长度对不上就丢弃，用到时重算
+            if any(len(a) != (n - 1 if append else n) for a in arrays):
+                del self._memo_cache[name]
+            elif append:
+                arrays = tuple(np.append(a, v) for a, v in zip(arrays, values))
+                self._memo_cache[name] = arrays if isinstance(cached, tuple) else arrays[0]
+            else:
+                for a, v in zip(arrays, values):
+                    a[-1] = v
+
+    def _on_quotes_updated(self, quotes: dict):
+        """日K跟随实时行情：同一天改写最后一根，新交易日追加一根；分时图并入当前分钟"""
+        info = quotes.get(self.stock_code)
+        if info is None or info.stale or self._loading:
+            return
+        if self.chart_type == self.TYPE_INTRADAY:
+            self._push_intraday(info)
+            return
+        if (not info.date or info.volume <= 0
+                or self.chart_type != self.TYPE_DAILY
+                or not isinstance(self._bars[0], np.ndarray) or not len(self._bars[0])):
+            return
+        date = f'{info.date[:4]}-{info.date[4:6]}-{info.date[6:8]}'
+        last = str(self._bars[0][-1])
+        if date < last:
+            return
+        if self._streams_key != (self.stock_code, self.chart_type, self._data_version):
+            self._build_streams()
+        bar = (date, info.open_price, info.high, info.low, info.price, info.volume)
+        if date == last:
+            for col, v in zip(self._bars, bar):
+                col[-1] = v
+            self._step_streams(info.high, info.low, info.price, append=False)
+            if self._redraw_last_bar():
+                return
+        else:
+            self._bars = tuple(np.append(col, v).astype(col.dtype) for col, v in zip(self._bars, bar))
+            self._cache.put(chart_data.cache_key(self.stock_code, self.chart_type), self._bars)
+            self._step_streams(info.high, info.low, info.price, append=True)
+            self._set_bars(self._bars)
+        self._draw()
+
+    def _redraw_last_bar(self) -> bool:
+        """K线主图只重绘最后一根和均线末端，其余图元不动；无法原地更新时返回 False"""
+        if (getattr(self, 'indicator', 'K线') != 'K线' or self._candles.bodies is None
+                or self._candles.bodies.axes is not self.ax_main):
+            return False
+        i = len(self.closes) - 1
+        o, h, l, c, v = (float(a[-1]) for a in (self.opens, self.highs, self.lows,
+                                                 self.closes, self.volumes))
+        self._candles.update_last(i, o, h, l, c, v)
+        if self._ranges is not None and len(self._ranges[0]) == i + 1:
+            for table, val in zip(self._ranges, (h, l, v)):
+                table.update_last(val)
+        self._sync_ma_lines()
+        self._update_viewport()
+        self._update_title()
+        self._update_extra()
+        self._show_info(i)
+        self.canvas.draw_idle()
+        return True
+
+    def done(self, result):
+        self._cancel_loading()
+        parent = self.parent()
+        if parent is not None and hasattr(parent, 'quote_store'):
+            try:
+                parent.quote_store.updated.disconnect(self._on_quotes_updated)
+            except TypeError:
+                pass
+        if parent is not None and hasattr(parent, 'unwatch_quote'):
+            parent.unwatch_quote(self.stock_code)
+        super().done(result)
 
     # ================================================================
     #  绘图
     # ================================================================
 
     def _draw(self):
+        if self._loading:
+            self._draw_loading()
+            return
         ind = getattr(self, 'indicator', 'K线')
+        in_place = False
         if ind == self.TYPE_MACD:
             self._draw_macd()
         elif ind == self.TYPE_KDJ:
             self._draw_kdj()
         elif ind == self.TYPE_RSI:
             self._draw_rsi()
+        elif ind == 'K线' and self._update_kline():
+            in_place = True
         else:
             self._draw_kline(boll=(ind == self.TYPE_BOLL))
         self._update_title()
         self._update_extra()
-        self._redraw_tools()
+        if not in_place:
+            self._redraw_tools()
         self._apply_zoom()
 
+    def _draw_loading(self):
+        """数据加载中的占位图"""
+        self._clear()
+        self._fs_artists = None
+        self.ax_main.text(0.5, 0.5, '加载中…', ha='center', va='center',
+                          fontsize=14, color=C_DIM, transform=self.ax_main.transAxes)
+        self.canvas.draw_idle()
+
     def _clear(self):
+        if self._fs_pct_ax is not None:
+            self._fs_pct_ax.remove()
+            self._fs_pct_ax = None
         self.ax_main.clear(); self.ax_vol.clear()
         self._style_ax(self.ax_main, show_x=False)
         self._style_ax(self.ax_vol, show_x=True)
@@ -733,26 +838,21 @@ class KLineDialog(QDialog):
         if n == 0:
             return
         x = np.arange(n)
-        o = np.array(self.opens); c = np.array(self.closes)
-        h = np.array(self.highs); l = np.array(self.lows)
-        v = np.array(self.volumes)
-        up = c >= o
-
-        # 影线
-        for i in range(n):
-            self.ax_main.vlines(x[i], l[i], h[i], color=C_UP if up[i] else C_DOWN, linewidth=0.8)
-
-        # 实体
-        bh = np.abs(c - o)
-        bh = np.where(bh < (h.max() - l.min()) * 0.001, (h.max() - l.min()) * 0.001, bh)
-        bb = np.minimum(o, c)
-        bc = np.where(up, C_UP, C_DOWN)
-        self.ax_main.bar(x, bh, bottom=bb, width=0.7, color=bc, edgecolor=bc, linewidth=0.3)
+        o = np.asarray(self.opens, dtype=float); c = np.asarray(self.closes, dtype=float)
+        h = np.asarray(self.highs, dtype=float); l = np.asarray(self.lows, dtype=float)
+        v = np.asarray(self.volumes, dtype=float)
+
+        # 影线、实体、成交量柱
+        self._candles.draw(self.ax_main, self.ax_vol, x, o, h, l, c, v)
+
+        self._ranges = (SparseTable(h), SparseTable(l, np.minimum), SparseTable(v))
 
         # MA
+        self._ma_lines = {}
         for period, color in [(5, C_MA5), (10, C_MA10), (20, C_MA20), (60, C_MA60)]:
-            self.ax_main.plot(x, self._ma(list(c), period), color=color, linewidth=0.9,
-                             alpha=0.9, label=f'MA{period}', antialiased=True)
+            self._ma_lines[period], = self.ax_main.plot(
+                x, self._close_ma(period), color=color, linewidth=0.9,
+                alpha=0.9, label=f'MA{period}', antialiased=True)
 
         # BOLL布林带
         if boll:
@@ -766,22 +866,49 @@ class KLineDialog(QDialog):
         pad = (h.max() - l.min()) * 0.05
         self.ax_main.set_ylim(l.min() - pad, h.max() + pad)
 
-        # 成交量
-        self.ax_vol.bar(x, v, width=0.7, color=np.where(up, C_UP, C_DOWN), alpha=0.55, edgecolor='none')
-        self.ax_vol.plot(x, self._ma(list(v), 5), color=C_MA5, linewidth=0.7, alpha=0.7)
-        self.ax_vol.plot(x, self._ma(list(v), 10), color=C_MA10, linewidth=0.7, alpha=0.7)
+        # 成交量均线
+        self._vol_ma_lines = {
+            period: self.ax_vol.plot(x, self._ma(v, period), color=color,
+                                     linewidth=0.7, alpha=0.7)[0]
+            for period, color in ((5, C_MA5), (10, C_MA10))}
         self.ax_vol.yaxis.set_major_formatter(plt.FuncFormatter(self._vol_fmt))
 
         self._date_ticks(self.ax_vol, n)
         self._show_info(n - 1)
+        # 记下布局，之后只有数据变化（同条数、无BOLL）时可原地更新
+        self._kline_layout = (n, boll, self.ax_main.get_xlim())
+        self._update_viewport()
         self.canvas.draw()
 
+    def _update_kline(self) -> bool:
+        """K线图已画在当前坐标轴上、条数不变且没有BOLL时（换周期、新交易日追加一根），
+        原地替换蜡烛、均线和量均线的数据，不清空坐标轴重建；不满足条件时返回 False"""
+        n = len(self.dates)
+        if (n == 0 or self._candles.bodies is None or self._candles.bodies.axes is not self.ax_main
+                or self._kline_layout is None or self._kline_layout[:2] != (n, False)):
+            return False
+        x = np.arange(n)
+        o, h, l, c, v = (np.asarray(a, dtype=float) for a in
+                         (self.opens, self.highs, self.lows, self.closes, self.volumes))
+        self._candles.set_data(x, o, h, l, c, v)
+        self._ranges = (SparseTable(h), SparseTable(l, np.minimum), SparseTable(v))
+        self._sync_ma_lines()
+        for period, line in self._vol_ma_lines.items():
+            line.set_data(x, self._ma(v, period))
+        if self._zoom_xlim is None:
+            self.ax_main.set_xlim(self._kline_layout[2])
+        self._date_ticks(self.ax_vol, n)
+        self._show_info(n - 1)
+        self._update_viewport()
+        self.canvas.draw_idle()
+        return True
+
     # ---- MACD ----
 
     def _draw_macd(self):
         self._clear()
         dif, dea, macd = self._calc_macd()
-        if not dif: return
+        if not len(dif): return
         n = len(self.dates); x = np.arange(n)
         self.ax_main.plot(x, dif, color=C_MA5, linewidth=1.1, label='DIF', antialiased=True)
         self.ax_main.plot(x, dea, color=C_MA10, linewidth=1.1, label='DEA', antialiased=True)
@@ -798,7 +925,7 @@ class KLineDialog(QDialog):
     def _draw_kdj(self):
         self._clear()
         k, d, j = self._calc_kdj()
-        if not k: return
+        if not len(k): return
         n = len(self.dates); x = np.arange(n)
         self.ax_main.plot(x, k, color=C_MA5, linewidth=1.0, label='K', antialiased=True)
         self.ax_main.plot(x, d, color=C_MA10, linewidth=1.0, label='D', antialiased=True)
@@ -818,7 +945,7 @@ class KLineDialog(QDialog):
     def _draw_rsi(self):
         self._clear()
         rsi = self._calc_rsi()
-        if not rsi: return
+        if not len(rsi): return
         n = len(self.dates); x = np.arange(len(rsi))
         self.ax_main.plot(x, rsi, color=C_MA10, linewidth=1.1, label='RSI(6)', antialiased=True)
         self.ax_main.axhline(80, color=C_UP, ls='--', lw=0.5, alpha=0.3)
@@ -837,7 +964,7 @@ class KLineDialog(QDialog):
     # ================================================================
 
     def _update_title(self):
-        if not self.closes: return
+        if not len(self.closes): return
         c = self.closes[-1]
         prev = self.closes[-2] if len(self.closes) > 1 else self.opens[0]
         chg = c - prev
@@ -873,8 +1000,8 @@ class KLineDialog(QDialog):
         chg = c - prev; pct = chg / prev * 100 if prev else 0
         amp = (h - l) / prev * 100 if prev else 0
         sc = '+' if chg >= 0 else ''
-        ma5 = self._ma(self.closes, 5); ma10 = self._ma(self.closes, 10)
-        ma20 = self._ma(self.closes, 20); ma60 = self._ma(self.closes, 60)
+        ma5 = self._close_ma(5); ma10 = self._close_ma(10)
+        ma20 = self._close_ma(20); ma60 = self._close_ma(60)
         self._info.setTextFormat(Qt.RichText)
         self._info.setText(
             f'<span style="color:{C_DIM}">{d}</span> '
@@ -896,21 +1023,20 @@ class KLineDialog(QDialog):
     # ================================================================
 
     def _clear_hover(self):
-        for attr in ('_hover_vline', '_hover_vline_vol', '_hover_hline',
-                      '_hover_price_tag', '_hover_date_tag'):
-            obj = getattr(self, attr, None)
-            if obj is not None:
-                try: obj.remove()
-                except Exception: pass
-                setattr(self, attr, None)
+        self._crosshair.hide()
 
     def _on_hover(self, event):
+        self._hover_throttle.push(event)
+
+    def _handle_hover(self, event):
+        if self._loading:
+            return
         # 分时模式
         if self.chart_type == self.TYPE_INTRADAY:
             self._on_hover_intraday(event)
             return
 
-        if not self.dates:
+        if not len(self.dates):
             return
 
         # 拖拽平移中
@@ -939,15 +1065,16 @@ class KLineDialog(QDialog):
             self._zoom_xlim = (new_left, new_right)
             self.ax_main.set_xlim(new_left, new_right)
             self._update_date_ticks()
+            self._update_viewport()
             self.canvas.draw_idle()
             return
 
         if event.inaxes not in (self.ax_main, self.ax_vol):
-            self._clear_hover(); self.canvas.draw_idle(); return
+            self._clear_hover(); return
         xd = event.xdata
         yd = event.ydata
         if xd is None:
-            self._clear_hover(); self.canvas.draw_idle(); return
+            self._clear_hover(); return
 
         # 画线模式：显示预览
         if self._tool_mode != 'hover' and event.button == 1:
@@ -955,12 +1082,9 @@ class KLineDialog(QDialog):
             self.canvas.draw_idle()
             return
 
-        self._clear_hover()
         idx = int(round(xd))
-        if idx < 0 or idx >= len(self.dates): return
-
-        self._hover_vline = self.ax_main.axvline(idx, color=C_CROSS, lw=0.5, ls='--', alpha=0.7)
-        self._hover_vline_vol = self.ax_vol.axvline(idx, color=C_CROSS, lw=0.5, ls='--', alpha=0.7)
+        if idx < 0 or idx >= len(self.dates):
+            self._clear_hover(); return
 
         ind = getattr(self, 'indicator', 'K线')
         if ind in ('K线', self.TYPE_BOLL):
@@ -971,30 +1095,24 @@ class KLineDialog(QDialog):
             self._hover_kdj(idx)
         elif ind == self.TYPE_RSI:
             self._hover_rsi(idx)
-        self.canvas.draw_idle()
 
     def _on_hover_intraday(self, event):
         """分时图十字光标"""
-        if event.inaxes not in (self.ax_main, self.ax_vol) or not self._fs_times:
-            self._clear_hover(); self.canvas.draw_idle(); return
+        if event.inaxes not in (self.ax_main, self.ax_vol) or not len(self._fs_times):
+            self._clear_hover(); return
         xd = event.xdata
         if xd is None:
-            self._clear_hover(); self.canvas.draw_idle(); return
-
-        self._clear_hover()
+            self._clear_hover(); return
 
         # 整数索引
         idx = int(round(xd))
         idx = max(0, min(idx, len(self._fs_times) - 1))
 
-        t = self._fs_times[idx]
         price = self._fs_prices[idx]
-        vol = self._fs_vols[idx]
-        avg = self._fs_avg[idx] if self._fs_avg else 0
+        vol = int(self._fs_vols[idx])
+        avg = self._fs_avg[idx]
 
-        self._hover_vline = self.ax_main.axvline(idx, color=C_CROSS, lw=0.5, ls='--', alpha=0.7)
-        self._hover_vline_vol = self.ax_vol.axvline(idx, color=C_CROSS, lw=0.5, ls='--', alpha=0.7)
-        self._hover_hline = self.ax_main.axhline(price, color=C_CROSS, lw=0.5, ls='--', alpha=0.7)
+        self._crosshair.update(idx, price)
 
         prev = self._fs_prev_close
         chg = price - prev
@@ -1002,7 +1120,7 @@ class KLineDialog(QDialog):
         sc = '+' if chg >= 0 else ''
         col = C_UP if chg >= 0 else C_DOWN
         vs = f'{vol}手'
-        t_str = t.strftime('%H:%M')
+        t_str = self._fs_time_str(idx)
 
         self._info.setTextFormat(Qt.RichText)
         self._info.setText(
@@ -1011,54 +1129,49 @@ class KLineDialog(QDialog):
             f'<span style="color:{col}">{sc}{chg:.2f}({sc}{pct:.2f}%)</span> '
             f'<span style="color:#ffa726">均价:{avg:.2f}</span> '
             f'<span style="color:{C_DIM}">量:{vs}</span>')
-        self.canvas.draw_idle()
 
     def _hover_kline(self, idx):
         c = self.closes[idx]
         cc = C_UP if c >= self.opens[idx] else C_DOWN
-        self._hover_hline = self.ax_main.axhline(c, color=C_CROSS, lw=0.5, ls='--', alpha=0.7)
-        self._hover_price_tag = self.ax_main.annotate(
-            f' {c:.2f} ', xy=(1, c), xycoords=('axes fraction', 'data'),
-            fontsize=8, color='#fff', fontweight='bold',
-            bbox=dict(boxstyle='round,pad=0.2', fc=cc, ec='none', alpha=0.9),
-            va='center', ha='left')
-        self._hover_date_tag = self.ax_vol.annotate(
-            f' {self.dates[idx]} ', xy=(idx, 0), xycoords=('data', 'axes fraction'),
-            fontsize=8, color='#fff',
-            bbox=dict(boxstyle='round,pad=0.2', fc='#2a2e39', ec='none', alpha=0.9),
-            va='bottom', ha='center')
+        self._crosshair.update(idx, c, price_tag=(f'{c:.2f}', cc), date_tag=self.dates[idx])
         self._show_info(idx)
 
     def _hover_macd(self, idx):
         dif, dea, macd = self._calc_macd()
         if idx < len(dif):
-            self._hover_hline = self.ax_main.axhline(dif[idx], color=C_CROSS, lw=0.5, ls='--', alpha=0.7)
+            self._crosshair.update(idx, dif[idx])
             self._info.setTextFormat(Qt.RichText)
             self._info.setText(
                 f'<span style="color:{C_DIM}">{self.dates[idx]}</span> '
                 f'<span style="color:{C_MA5}">DIF:{dif[idx]:.3f}</span> '
                 f'<span style="color:{C_MA10}">DEA:{dea[idx]:.3f}</span> '
                 f'<span style="color:{C_UP}">MACD:{macd[idx]:.3f}</span>')
+        else:
+            self._crosshair.update(idx)
 
     def _hover_kdj(self, idx):
         k, d, j = self._calc_kdj()
         if idx < len(k):
-            self._hover_hline = self.ax_main.axhline(k[idx], color=C_CROSS, lw=0.5, ls='--', alpha=0.7)
+            self._crosshair.update(idx, k[idx])
             self._info.setTextFormat(Qt.RichText)
             self._info.setText(
                 f'<span style="color:{C_DIM}">{self.dates[idx]}</span> '
                 f'<span style="color:{C_MA5}">K:{k[idx]:.2f}</span> '
                 f'<span style="color:{C_MA10}">D:{d[idx]:.2f}</span> '
                 f'<span style="color:{C_MA20}">J:{j[idx]:.2f}</span>')
+        else:
+            self._crosshair.update(idx)
 
     def _hover_rsi(self, idx):
         rsi = self._calc_rsi()
-        if idx < len(rsi):
-            self._hover_hline = self.ax_main.axhline(rsi[idx], color=C_CROSS, lw=0.5, ls='--', alpha=0.7)
+        if idx < len(rsi) and not np.isnan(rsi[idx]):
+            self._crosshair.update(idx, rsi[idx])
             self._info.setTextFormat(Qt.RichText)
             self._info.setText(
                 f'<span style="color:{C_DIM}">{self.dates[idx]}</span> '
                 f'<span style="color:{C_MA10}">RSI(6):{rsi[idx]:.2f}</span>')
+        else:
+            self._crosshair.update(idx)
 
     # ================================================================
     #  缩放
@@ -1066,7 +1179,7 @@ class KLineDialog(QDialog):
 
     def _on_scroll(self, event):
         """鼠标滚轮缩放"""
-        if not self.dates or event.inaxes not in (self.ax_main, self.ax_vol):
+        if not len(self.dates) or event.inaxes not in (self.ax_main, self.ax_vol):
             return
         n = len(self.dates)
         cur = list(self.ax_main.get_xlim())
@@ -1097,11 +1210,12 @@ class KLineDialog(QDialog):
         self._zoom_xlim = (new_left, new_right)
         self.ax_main.set_xlim(new_left, new_right)
         self._update_date_ticks()
+        self._update_viewport()
         self.canvas.draw_idle()
 
     def _update_date_ticks(self):
         """根据当前可视范围更新日期标签"""
-        if not self.dates:
+        if not len(self.dates):
             return
         xlim = self.ax_main.get_xlim()
         start = max(0, int(xlim[0]))
@@ -1128,14 +1242,14 @@ class KLineDialog(QDialog):
 
         # hover模式：开始拖拽平移
         if self._tool_mode == 'hover':
-            if event.inaxes in (self.ax_main, self.ax_vol) and self.dates:
+            if event.inaxes in (self.ax_main, self.ax_vol) and len(self.dates):
                 self._pan_active = True
                 self._pan_start_x = event.x
                 self._pan_start_xlim = list(self.ax_main.get_xlim())
             return
 
         # 画线模式
-        if event.inaxes != self.ax_main or not self.dates:
+        if event.inaxes != self.ax_main or not len(self.dates):
             return
 
         xd = event.xdata
@@ -1214,6 +1328,36 @@ class KLineDialog(QDialog):
         if self._zoom_xlim is not None:
             self.ax_main.set_xlim(self._zoom_xlim)
             self._update_date_ticks()
+            self._update_viewport()
+
+    def _update_viewport(self):
+        """只把可见区间（两侧留余量）交给蜡烛和均线，K线过密（每根不足2像素）时改用合并后的K线；
+        纵轴按可见K线的最高/最低和最大成交量调整"""
+        if self._candles.bodies is None or self._candles.bodies.axes is not self.ax_main:
+            return
+        n = len(self.closes)
+        x0, x1 = self.ax_main.get_xlim()
+        width = self.ax_main.bbox.width
+        lo, hi = max(0, int(np.ceil(x0))), min(n - 1, int(np.floor(x1)))
+        if x1 <= x0 or width <= 0 or lo > hi:
+            return
+        if self._candles.set_view(width / (x1 - x0), lo, hi):
+            self._sync_ma_lines()
+        if self._ranges is None or len(self._ranges[0]) != n:
+            return
+        top, bottom, vmax = (t.query(lo, hi) for t in self._ranges)
+        pad = (top - bottom) * 0.05 or top * 0.01 or 1
+        self.ax_main.set_ylim(bottom - pad, top + pad)
+        self.ax_vol.set_ylim(0, vmax * 1.05 if vmax > 0 else 1)
+
+    def _sync_ma_lines(self):
+        """均线只保留蜡烛图当前绘制的区间"""
+        if not self._ma_lines or self._candles.window is None:
+            return
+        a, b = self._candles.window
+        x = np.arange(a, b + 1)
+        for period, line in self._ma_lines.items():
+            line.set_data(x, self._close_ma(period)[a:b + 1])
 
 
 # ================================================================
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+K线本地列式存储
+每个 (代码, 周期) 一个目录，日期/开/高/低/收/量各存一个 .npy 文件，读取时内存映射；
+已收盘的历史K线视为不变，打开图表时只向腾讯 fqkline 接口补取最后存储日期之后的增量，
+需要更多历史时只补取最早存储日期之前的部分
+"""
+
+import os
+import json
+import time
+import threading
+import numpy as np
+
+import http_client
+import market_clock
+
+STORE_DIR = 'kline_data'
+KLINE_URL = 'http://web.ifzq.gtimg.cn/appstock/app/fqkline/get?param={},{},{},{},{},qfq'
+COLUMNS = ('dates', 'opens', 'highs', 'lows', 'closes', 'volumes')
+PERIODS = {'日K': 'day', '周K': 'week', '月K': 'month'}
+OVERLAP = 2        # 增量请求与本地数据重叠的K线数，用来发现复权调整
+PRICE_TOL = 1e-3   # 重叠K线价格比较容差
+
+
+BARS_PER = {'week': 5, 'month': 22}  # 每根周/月K大约包含的日K数
+MAX_DAILY = 1260  # 合成周K/月K最多取的日K数（约5年，够250根周K）；更早的月K用服务器的月K
+
+
+def parse_items(items):
+    """把接口返回的 [[日期, 开, 收, 高, 低, 量, ...]] 转为列数组 (日期, 开, 高, 低, 收, 量)"""
+    dates = np.array([x[0] for x in items], dtype='datetime64[D]')
+    # 第7项起可能是除权信息，只取前6项
+    values = np.array([x[1:6] for x in items], dtype=np.float64).reshape(-1, 5)
+    return (dates, values[:, 0].copy(), values[:, 2].copy(), values[:, 3].copy(),
+            values[:, 1].copy(), values[:, 4].astype(np.int64))
+
+
+def aggregate(bars, period: str):
+    """日K合成周K/月K：按自然周（周一起）或自然月分组，
+    取首日开盘、最高、最低、末日收盘、成交量合计，日期取组内最后一个交易日"""
+    dates, opens, highs, lows, closes, volumes = bars
+    if not len(dates):
+        return bars
+    days = dates.astype(np.int64)
+    if period == 'week':
+        # 1970-01-01 是周四，+3 后整除7即以周一为界
+        keys = (days + 3) // 7
+    else:
+        keys = dates.astype('datetime64[M]').astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+    return (dates[ends], opens[starts], np.maximum.reduceat(highs, starts),
+            np.minimum.reduceat(lows, starts), closes[ends], np.add.reduceat(volumes, starts))
+
+
+def fetch_kline(code: str, period: str, count: int, start: str = '', end: str = ''):
+    """从腾讯接口获取前复权K线：[start, end] 范围内（为空表示不限）最近的 count 条；失败返回 None"""
+    try:
+        r = http_client.get(KLINE_URL.format(code, period, start, end, count), timeout=10)
+        if r.status_code != 200:
+            return None
+        data = r.json()
+        if data.get('code') != 0:
+            return None
+        sd = data['data'].get(code, {})
+        items = sd.get(f'qfq{period}', []) or sd.get(period, [])
+        return parse_items(items) if items else None
+    except Exception as e:
+        print(f'腾讯K线API失败: {e}')
+        return None
+
+
+def _daily_needed(period: str, count: int) -> int:
+    """得到 count 根该周期K线要取的日K数"""
+    if period not in BARS_PER:
+        return count
+    # 多取一组：日K的第一组可能不完整，合成后丢掉
+    return min((count + 1) * BARS_PER[period], MAX_DAILY)
+
+
+def to_display(bars):
+    """存储格式转为界面使用的格式：日期转 'YYYY-MM-DD' 字符串"""
+    dates, *rest = bars
+    return (dates.astype('U10'), *rest)
+
+
+class KLineStore:
+    """K线列式存储
+
+    目录结构: kline_data/sh600519_day/{dates,opens,highs,lows,closes,volumes}.npy + meta.json
+    meta 记录 depth（全量获取时请求的条数）和 updated（最后一次与服务器同步的时间），
+    日K另可记录 listed（已确认的上市首日，日K从这天起即为全部历史）。
+    增量请求从倒数第 OVERLAP 根K线的日期开始，重叠部分价格不一致说明发生了除权
+    （前复权价整体变化），此时整体重新获取；请求的条数超过 depth 时只往前补取
+    最早一根之前的部分，同样用重叠的那根核对。load() 可在多个线程中调用，
+    同一个 (代码, 周期) 同一时间只有一个在读写，不同目录互不等待
+    """
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        self._locks = {}  # {(代码, 周期): Lock}
+        self._locks_guard = threading.Lock()
+
+    def _dir(self, code, period):
+        return os.path.join(self.root, f'{code}_{period}')
+
+    def read(self, code: str, period: str):
+        """读取本地数据 (列数组元组, meta)，列为只读内存映射；不存在或损坏时返回 (None, None)"""
+        path = self._dir(code, period)
+        try:
+            with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            bars = tuple(np.load(os.path.join(path, f'{col}.npy'), mmap_mode='r')
+                         for col in COLUMNS)
+        except FileNotFoundError:
+            return None, None
+        except Exception as e:
+            print(f'读取K线缓存失败: {e}')
+            return None, None
+        # 写入中途中断时各列长度可能不一致
+        if len({len(col) for col in bars}) != 1 or not len(bars[0]):
+            return None, None
+        return bars, meta
+
+    def write(self, code: str, period: str, bars, meta: dict):
+        """写入全部列（逐列先写临时文件再替换），meta 最后写入"""
+        path = self._dir(code, period)
+        try:
+            os.makedirs(path, exist_ok=True)
+            for col, arr in zip(COLUMNS, bars):
+                target = os.path.join(path, f'{col}.npy')
+                with open(target + '.tmp', 'wb') as f:
+                    np.save(f, np.ascontiguousarray(arr))
+                os.replace(target + '.tmp', target)
+            self._write_meta(path, meta)
+        except Exception as e:
+            print(f'保存K线缓存失败: {e}')
+
+    @staticmethod
+    def _write_meta(path, meta):
+        target = os.path.join(path, 'meta.json')
+        with open(target + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(target + '.tmp', target)
+
+    def _is_fresh(self, meta, count):
+        """休市中、本地数据在最近一次收盘之后同步过且深度足够时无需请求服务器；
+        开市期间最后一根K线随时在变，总是补取增量"""
+        if market_clock.market_phase() != market_clock.PHASE_CLOSED:
+            return False
+        return (meta.get('depth', 0) >= count
+                and meta.get('updated', 0) >= market_clock.last_close().timestamp())
+
+    def _merge(self, stored, delta):
+        """把增量接到本地数据后面；重叠部分对不上（除权或中间有缺口）时返回 None"""
+        n = len(stored[0])
+        if n < OVERLAP or not len(delta[0]) or delta[0][0] != stored[0][n - OVERLAP]:
+            return None
+        # 只比较已收盘的那根（最后一根可能是盘中未完成的K线）
+        for old, new in zip(stored[1:5], delta[1:5]):
+            if abs(float(old[n - OVERLAP]) - float(new[0])) > PRICE_TOL:
+                return None
+        return tuple(np.concatenate((old[:n - OVERLAP], new)) for old, new in zip(stored, delta))
+
+    def _extend(self, code, period, stored, count):
+        """往前补取到 count 条：取截至本地最早一根（含）的 count-n+1 条，与最早一根核对后接在前面；
+        对不上（除权）或请求失败时返回 None。服务器没有更早的数据时原样返回"""
+        first = str(stored[0][0])
+        older = fetch_kline(code, period, count - len(stored[0]) + 1, end=first)
+        if older is None or str(older[0][-1]) != first:
+            return None
+        for old, new in zip(stored[1:5], older[1:5]):
+            if abs(float(old[0]) - float(new[-1])) > PRICE_TOL:
+                return None
+        return tuple(np.concatenate((new[:-1], old)) for old, new in zip(stored, older))
+
+    def _lock_for(self, code, period):
+        with self._locks_guard:
+            return self._locks.setdefault((code, period), threading.Lock())
+
+    def load(self, code: str, period: str, count: int, cancelled=None):
+        """返回最近 count 条K线 (日期, 开, 高, 低, 收, 量)，本地数据加增量；全部失败时返回 None。
+        cancelled() 为真时不再发起后续请求，返回 None"""
+        with self._lock_for(code, period):
+            return self._load(code, period, count, cancelled or (lambda: False))
+
+    def _load(self, code, period, count, cancelled):
+        stored, meta = self.read(code, period)
+        if stored is not None and self._is_fresh(meta, count):
+            # 复制出需要的部分，不长期占用映射文件
+            return tuple(np.array(col[-count:]) for col in stored)
+        if cancelled():
+            return None
+
+        bars = None
+        depth = max(count, meta.get('depth', 0)) if stored is not None else count
+        if stored is not None and len(stored[0]) >= OVERLAP:
+            base = stored
+            if meta.get('depth', 0) < count and len(stored[0]) < count:
+                base = self._extend(code, period, stored, count)
+                if cancelled():
+                    return None
+            if base is not None:
+                start = str(base[0][len(base[0]) - OVERLAP])
+                delta = fetch_kline(code, period, depth, start)
+                if delta is None:
+                    # 网络失败时退回本地数据
+                    return tuple(np.array(col[-count:]) for col in base)
+                bars = self._merge(base, delta)
+        if bars is None:
+            if cancelled():
+                return None
+            bars = fetch_kline(code, period, depth)
+            if bars is None:
+                if stored is not None:
+                    return tuple(np.array(col[-count:]) for col in stored)
+                return None
+        # 释放映射后再覆盖文件
+        stored = None
+        new_meta = {'depth': depth, 'updated': time.time()}
+        if meta and 'listed' in meta:
+            new_meta['listed'] = meta['listed']
+        self.write(code, period, bars, new_meta)
+        return tuple(col[-count:] for col in bars)
+
+    def load_period(self, code: str, period: str, count: int, cancelled=None):
+        """按周期取K线：周K/月K由本地日K（最多 MAX_DAILY 根）合成，合成不够 count 根时
+        接上本地存的该周期K线，仍不够才向服务器取；cancelled 含义同 load()"""
+        cancelled = cancelled or (lambda: False)
+        if period not in BARS_PER:
+            return self.load(code, period, count, cancelled)
+        daily = self.load(code, 'day', _daily_needed(period, count), cancelled)
+        return self._from_daily(code, period, count, daily, cancelled)
+
+    def load_periods(self, code: str, periods, count: int, cancelled=None):
+        """一次取同一股票的多个周期，返回 {周期: K线}（取不到的不在其中）：
+        按最深的周期只取一次日K，各周期都从它截取或合成，避免逐个周期重复下载日K"""
+        cancelled = cancelled or (lambda: False)
+        needed = max(_daily_needed(p, count) for p in periods)
+        daily = self.load(code, 'day', needed, cancelled)
+        result = {}
+        for period in periods:
+            if cancelled():
+                break
+            if period == 'day':
+                bars = None if daily is None else tuple(col[-count:] for col in daily)
+            elif period in BARS_PER:
+                bars = self._from_daily(code, period, count, daily, cancelled)
+            else:
+                bars = self.load(code, period, count, cancelled)
+            if bars is not None:
+                result[period] = bars
+        return result
+
+    def _from_daily(self, code, period, count, daily, cancelled):
+        """用日K合成最近 count 根周K/月K。日K已从上市首日开始时合成结果就是全部历史；
+        否则日K只是最近一段，丢掉可能不完整的第一组，不够 count 根时前面接上本地存的
+        服务器周K/月K，还不够才向服务器取该周期。服务器也没有更早的数据说明
+        日K确实是全部历史，记下上市首日，以后不再核对"""
+        needed = _daily_needed(period, count)
+        full = bars = None
+        if daily is not None:
+            daily = tuple(col[-needed:] for col in daily)
+            full = aggregate(daily, period)
+            first = str(daily[0][0])
+            if len(daily[0]) < needed and self._listed(code) == first:
+                return tuple(col[-count:] for col in full)
+            bars = tuple(col[1:] for col in full)
+            if len(bars[0]) >= count:
+                return tuple(col[-count:] for col in bars)
+            joined = self._join(code, period, bars, count)
+            if joined is not None:
+                return tuple(col[-count:] for col in joined)
+        if cancelled():
+            return None
+        # 日K不够可能是新股，也可能是服务器限制了返回条数，用服务器的周K/月K判断
+        remote = self.load(code, period, count, cancelled)
+        if full is None:
+            return remote
+        if remote is None or (len(daily[0]) < needed and remote[0][0] >= full[0][0]):
+            if remote is not None:
+                self._mark_listed(code, first)
+            return tuple(col[-count:] for col in full)
+        return remote
+
+    def _join(self, code, period, bars, count):
+        """在合成的周K/月K前面接上本地存的服务器K线：从合成的第一根（完整的一组）处拼接；
+        没存、存的深度不到 count、该根日期和价格对不上（除权）时返回 None"""
+        if len(bars[0]) < 2:
+            return None
+        with self._lock_for(code, period):
+            stored, meta = self.read(code, period)
+            if stored is None or meta.get('depth', 0) < count:
+                return None
+            i = int(np.searchsorted(stored[0], bars[0][0]))
+            if i >= len(stored[0]) or stored[0][i] != bars[0][0]:
+                return None
+            for old, new in zip(stored[1:5], bars[1:5]):
+                if abs(float(old[i]) - float(new[0])) > PRICE_TOL:
+                    return None
+            return tuple(np.concatenate((old[:i], new)) for old, new in zip(stored, bars))
+
+    def _read_meta(self, code, period):
+        try:
+            with open(os.path.join(self._dir(code, period), 'meta.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def _listed(self, code):
+        meta = self._read_meta(code, 'day')
+        return meta.get('listed') if meta else None
+
+    def _mark_listed(self, code, first):
+        """在日K的 meta 里记下上市首日"""
+        with self._lock_for(code, 'day'):
+            meta = self._read_meta(code, 'day')
+            if meta is None or meta.get('listed') == first:
+                return
+            meta['listed'] = first
+            try:
+                self._write_meta(self._dir(code, 'day'), meta)
+            except Exception as e:
+                print(f'保存K线缓存失败: {e}')
+
+
+def compare_with_server(code: str, period: str, count: int = 60, store: KLineStore = None):
+    """用服务器的周K/月K核对本地合成结果，返回不一致的 [(日期, 本地, 服务器)]"""
+    store = store or KLineStore()
+    local = store.load_period(code, period, count)
+    remote = fetch_kline(code, period, count)
+    if local is None or remote is None:
+        return None
+    remote_rows = {d: row for d, *row in zip(*remote)}
+    diffs = []
+    for d, *row in zip(*local):
+        ref = remote_rows.get(d)
+        if ref is None:
+            continue
+        if not np.allclose(row[:4], ref[:4], atol=PRICE_TOL) or row[4] != ref[4]:
+            diffs.append((str(d), row, ref))
+    return diffs
+
+
+if __name__ == '__main__':
+    import sys
+    code = sys.argv[1] if len(sys.argv) > 1 else 'sh600519'
+    for p in BARS_PER:
+        diffs = compare_with_server(code, p)
+        if diffs is None:
+            print(f'{code} {p}: 获取数据失败')
+        else:
+            print(f'{code} {p}: {len(diffs)} 根不一致')
+            for d in diffs[:10]:
+                print('  ', *d)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+A股交易时段与交易日历
+按时段调整行情刷新频率：连续竞价快、集合竞价/午休慢、收盘后停
+"""
+
+import datetime
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+# 交易所休市安排（含周末的整段假期，周末本身另行判断），每年按交易所公告补充
+_HOLIDAY_RANGES = [
+    ('2025-01-01', '2025-01-01'),  # 元旦
+    ('2025-01-28', '2025-02-04'),  # 春节
+    ('2025-04-04', '2025-04-06'),  # 清明
+    ('2025-05-01', '2025-05-05'),  # 劳动节
+    ('2025-05-31', '2025-06-02'),  # 端午
+    ('2025-10-01', '2025-10-08'),  # 国庆、中秋
+    ('2026-01-01', '2026-01-03'),  # 元旦
+    ('2026-02-15', '2026-02-23'),  # 春节
+    ('2026-04-04', '2026-04-06'),  # 清明
+    ('2026-05-01', '2026-05-05'),  # 劳动节
+    ('2026-06-19', '2026-06-21'),  # 端午
+    ('2026-09-25', '2026-09-27'),  # 中秋
+    ('2026-10-01', '2026-10-07'),  # 国庆
+]
+
+
+def _expand_ranges(ranges):
+    days = set()
+    for start, end in ranges:
+        d = datetime.date.fromisoformat(start)
+        last = datetime.date.fromisoformat(end)
+        while d <= last:
+            days.add(d)
+            d += datetime.timedelta(days=1)
+    return frozenset(days)
+
+
+HOLIDAYS = _expand_ranges(_HOLIDAY_RANGES)
+
+# 交易时段
+PHASE_CLOSED = 'closed'      # 休市/盘前/收盘后
+PHASE_AUCTION = 'auction'    # 集合竞价 9:15-9:25、14:57-15:00
+PHASE_BREAK = 'break'        # 竞价结束待开盘 9:25-9:30、午休 11:30-13:00
+PHASE_TRADING = 'trading'    # 连续竞价 9:30-11:30、13:00-14:57
+
+_SESSIONS = [
+    (datetime.time(9, 15), datetime.time(9, 25), PHASE_AUCTION),
+    (datetime.time(9, 25), datetime.time(9, 30), PHASE_BREAK),
+    (datetime.time(9, 30), datetime.time(11, 30), PHASE_TRADING),
+    (datetime.time(11, 30), datetime.time(13, 0), PHASE_BREAK),
+    (datetime.time(13, 0), datetime.time(14, 57), PHASE_TRADING),
+    (datetime.time(14, 57), datetime.time(15, 0), PHASE_AUCTION),
+]
+OPEN_TIME = _SESSIONS[0][0]
+CLOSE_TIME = _SESSIONS[-1][1]
+
+
+def is_trading_day(day: datetime.date) -> bool:
+    """是否交易日（周一至周五且不在休市表中）"""
+    return day.weekday() < 5 and day not in HOLIDAYS
+
+
+def market_phase(now: datetime.datetime = None) -> str:
+    """当前所处交易时段"""
+    now = now or datetime.datetime.now()
+    if not is_trading_day(now.date()):
+        return PHASE_CLOSED
+    t = now.time()
+    for start, end, phase in _SESSIONS:
+        if start <= t < end:
+            return phase
+    return PHASE_CLOSED
+
+
+def next_open(now: datetime.datetime = None) -> datetime.datetime:
+    """下一次开盘（集合竞价开始）时间"""
+    now = now or datetime.datetime.now()
+    day = now.date()
+    if now.time() >= OPEN_TIME:
+        day += datetime.timedelta(days=1)
+    while not is_trading_day(day):
+        day += datetime.timedelta(days=1)
+    return datetime.datetime.combine(day, OPEN_TIME)
+
+
+def last_close(now: datetime.datetime = None) -> datetime.datetime:
+    """最近一次已经收盘的时间（收盘后的交易日取当天 15:00，否则往前找）"""
+    now = now or datetime.datetime.now()
+    day = now.date()
+    if now.time() < CLOSE_TIME:
+        day -= datetime.timedelta(days=1)
+    while not is_trading_day(day):
+        day -= datetime.timedelta(days=1)
+    return datetime.datetime.combine(day, CLOSE_TIME)
+
+
+def seconds_to_next_boundary(now: datetime.datetime = None):
+    """距今天下一个时段切换点的秒数，今天已无切换点时返回 None"""
+    now = now or datetime.datetime.now()
+    t = now.time()
+    for start, end, _ in _SESSIONS:
+        for edge in (start, end):
+            if edge > t:
+                edge_dt = datetime.datetime.combine(now.date(), edge)
+                return (edge_dt - now).total_seconds()
+    return None
+
+
+class RefreshScheduler(QObject):
+    """按交易时段调度的刷新定时器
+
+    连续竞价按 trading_interval 刷新，集合竞价按 auction_interval，
+    午休等间歇按 break_interval；收盘时补刷一次后停到下次开盘。
+    market_hours_only 为 False 时全天按 trading_interval 刷新
+    """
+
+    tick = pyqtSignal()
+
+    MAX_SLEEP = 30 * 60  # 休市时最长睡眠（秒），到点重新判断，兼容系统休眠/改时间
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.trading_interval = 5
+        self.auction_interval = 10
+        self.break_interval = 60
+        self.market_hours_only = True
+        self._last_phase = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_timeout)
+
+    def start(self):
+        """开始调度（不立即触发）"""
+        self._last_phase = market_phase()
+        self._schedule(self._last_phase)
+
+    def stop(self):
+        self._timer.stop()
+
+    def _on_timeout(self):
+        phase = market_phase()
+        was_open = self._last_phase not in (None, PHASE_CLOSED)
+        self._last_phase = phase
+        # 开市期间每次都刷新；刚收盘时再刷最后一次
+        if phase != PHASE_CLOSED or was_open or not self.market_hours_only:
+            self.tick.emit()
+        self._schedule(phase)
+
+    def _schedule(self, phase):
+        if not self.market_hours_only or phase == PHASE_TRADING:
+            seconds = self.trading_interval
+        elif phase == PHASE_AUCTION:
+            seconds = self.auction_interval
+        elif phase == PHASE_BREAK:
+            seconds = self.break_interval
+        else:
+            now = datetime.datetime.now()
+            seconds = (next_open(now) - now).total_seconds()
+            seconds = min(max(seconds, 1), self.MAX_SLEEP)
+        if self.market_hours_only and phase != PHASE_CLOSED:
+            # 不跨过时段切换点，保证午休结束、收盘等时刻及时切换频率
+            boundary = seconds_to_next_boundary()
+            if boundary is not None:
+                seconds = min(seconds, boundary + 0.5)
+        self._timer.start(int(seconds * 1000))
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+图表数据预取
+在低优先级线程池里提前把可能打开的图表数据放进共用缓存：
+启动后预取置顶股票，打开K线窗口时预取该股票的其他周期和列表中相邻的股票
+"""
+
+import datetime
+from collections import deque
+
+from PyQt5.QtCore import QObject, QThreadPool
+
+import chart_data
+import kline_store
+from quote_api import code_with_prefix
+
+MAX_WORKERS = 2                      # 同时进行的预取请求数
+DAILY_BUDGET = 8 * 1024 * 1024       # 每天预取的下载字节上限
+
+
+class Prefetcher(QObject):
+    """后台预取器
+
+    request() 把 (代码, 周期) 排进先进先出队列，已缓存或已在队列/进行中的跳过；
+    最多 max_workers 个任务同时以最低线程优先级运行，结果写入共用缓存（模拟数据不写）。
+    按响应体字节数统计当天的下载量，达到 daily_budget 后当天不再发起预取
+    """
+
+    def __init__(self, cache=chart_data.CACHE, store=chart_data.STORE,
+                 max_workers: int = MAX_WORKERS, daily_budget: int = DAILY_BUDGET, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.store = store
+        self.max_workers = max_workers
+        self.daily_budget = daily_budget
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_workers)
+        self._queue = deque()      # 待发起的 (代码, 周期)
+        self._pending = set()      # 排队中和进行中的 (代码, 周期)
+        self._running = {}         # {序号: (任务, 代码)}
+        self._seq = 0
+        self._day = datetime.date.today()
+        self.spent = 0             # 当天已用字节数
+        self.completed = 0
+
+    def budget_left(self) -> int:
+        today = datetime.date.today()
+        if today != self._day:
+            self._day = today
+            self.spent = 0
+        return self.daily_budget - self.spent
+
+    def request(self, stock_codes, chart_types):
+        """预取这些股票的这些周期"""
+        for code in stock_codes:
+            for chart_type in chart_types:
+                item = (code, chart_type)
+                if item in self._pending or self._cached(code, chart_type):
+                    continue
+                self._pending.add(item)
+                self._queue.append(item)
+        self._pump()
+
+    def warm(self, stock_codes):
+        """预取分时和日K"""
+        self.request(stock_codes, (chart_data.TYPE_INTRADAY, '日K'))
+
+    def around(self, stock_code: str, neighbors=()):
+        """K线窗口打开时（窗口自己在加载分时）：预取该股票的各K线周期（日K只取一次，
+        最多 kline_store.MAX_DAILY 根，周K/月K尽量由它合成），以及相邻股票的分时和日K"""
+        self.request([stock_code], (chart_data.TYPE_ALL_KLINES,))
+        self.warm(neighbors)
+
+    def _cached(self, code, chart_type):
+        types = tuple(kline_store.PERIODS) if chart_type == chart_data.TYPE_ALL_KLINES else (chart_type,)
+        return all(chart_data.cache_key(code, t) in self.cache for t in types)
+
+    def clear(self):
+        """丢弃尚未发起的预取"""
+        for item in self._queue:
+            self._pending.discard(item)
+        self._queue.clear()
+
+    def _pump(self):
+        while self._queue and len(self._running) < self.max_workers:
+            if self.budget_left() <= 0:
+                self.clear()
+                return
+            code, chart_type = self._queue.popleft()
+            # 排队期间可能已被K线窗口加载
+            if self._cached(code, chart_type):
+                self._pending.discard((code, chart_type))
+                continue
+            self._seq += 1
+            task = chart_data.ChartLoadTask(self._seq, code_with_prefix(code), chart_type,
+                                            chart_data.KLINE_COUNT, self.store, low_priority=True)
+            task.signals.finished.connect(self._on_finished)
+            self._running[self._seq] = (task, code)
+            self._pool.start(task)
+
+    def _on_finished(self, seq, chart_type, result):
+        task, code = self._running.pop(seq)
+        self._pending.discard((code, chart_type))
+        self.budget_left()
+        self.spent += task.received
+        self.completed += 1
+        chart_data.cache_result(code, chart_type, result, self.cache)
+        self._pump()
+
+    def stats(self) -> dict:
+        return {'queued': len(self._queue), 'running': len(self._running),
+                'completed': self.completed, 'spent': self.spent,
+                'daily_budget': self.daily_budget}
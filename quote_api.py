@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+实时行情接口
+腾讯行情 (qt.gtimg.cn) 批量查询、解析、后台刷新与内存行情中心，不依赖界面控件
+"""
+
+import os
+import json
+import time
+import http_client
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+QUOTE_URL = 'http://qt.gtimg.cn/q='
+BATCH_SIZE = 60  # 单次请求最多合并的代码数，避免URL过长
+SNAPSHOT_FILE = 'quote_snapshot.json'  # 最近行情快照，启动时先用它显示
+
+
+class StockInfoWidget:
+    """股票信息数据类"""
+    def __init__(self, code: str, name: str, price: float,
+                 change: float, change_percent: float, open_price: float):
+        self.code = code
+        self.name = name
+        self.price = price
+        self.change = change
+        self.change_percent = change_percent
+        self.open_price = open_price
+        # 五档买卖盘
+        self.bid_prices = [0.0] * 5
+        self.bid_vols = [0] * 5
+        self.ask_prices = [0.0] * 5
+        self.ask_vols = [0] * 5
+        # 当日最高/最低/成交量(手)及行情日期 YYYYMMDD、时间 YYYYMMDDHHMMSS
+        self.high = price
+        self.low = price
+        self.volume = 0
+        self.date = ''
+        self.timestamp = ''
+        self.stale = False  # 是否为上次运行保存的旧快照
+
+
+def code_with_prefix(stock_code: str) -> str:
+    """补全交易所前缀：600519 -> sh600519"""
+    if stock_code.startswith('sh') or stock_code.startswith('sz'):
+        return stock_code
+    code_prefix = 'sh' if stock_code.startswith(('6', '5')) else 'sz'
+    return f'{code_prefix}{stock_code}'
+
+
+def parse_quote(stock_code: str, data: list):
+    """解析一条 ~ 分隔的行情字段，字段不足时返回 None"""
+    if len(data) <= 32:
+        return None
+    info = StockInfoWidget(
+        code=stock_code,
+        name=data[1],
+        price=float(data[3]),
+        change=float(data[31]),
+        change_percent=float(data[32]),
+        open_price=float(data[5])
+    )
+    # 解析五档买卖盘 data[9]~data[28]
+    try:
+        for i in range(5):
+            info.bid_prices[i] = float(data[9 + i * 2])   # 买1-5价
+            info.bid_vols[i] = int(float(data[10 + i * 2]))  # 买1-5量(手)
+            info.ask_prices[i] = float(data[19 + i * 2])   # 卖1-5价
+            info.ask_vols[i] = int(float(data[20 + i * 2]))  # 卖1-5量(手)
+    except (ValueError, IndexError):
+        pass
+    try:
+        info.date = data[30][:8]
+        info.timestamp = data[30]
+        info.high = float(data[33])
+        info.low = float(data[34])
+        info.volume = int(float(data[36]))
+    except (ValueError, IndexError):
+        pass
+    return info
+
+
+def parse_quotes(content: str, symbol_map: dict) -> dict:
+    """解析批量响应 v_sh600519="...";v_sz000001="..."; -> {原始代码: StockInfoWidget}"""
+    quotes = {}
+    for line in content.split(';'):
+        line = line.strip()
+        if not line.startswith('v_') or '="' not in line:
+            continue
+        symbol, body = line[2:].split('="', 1)
+        codes = symbol_map.get(symbol)
+        if not codes:
+            continue
+        data = body.rstrip('"').split('~')
+        for code in codes:
+            try:
+                info = parse_quote(code, data)
+            except ValueError:
+                info = None
+            if info:
+                quotes[code] = info
+    return quotes
+
+
+def fetch_quotes(stock_codes, batch_size: int = BATCH_SIZE) -> dict:
+    """批量获取实时行情，按 batch_size 分块，每块一次请求
+
+    返回 {代码: StockInfoWidget}，获取失败的代码不在结果中
+    """
+    # 同一 symbol 可能对应多个写法（如 600519 与 sh600519）
+    symbol_map = {}
+    for code in stock_codes:
+        symbol_map.setdefault(code_with_prefix(code), []).append(code)
+    symbols = list(symbol_map)
+
+    quotes = {}
+    for i in range(0, len(symbols), batch_size):
+        chunk = symbols[i:i + batch_size]
+        try:
+            api_url = QUOTE_URL + ','.join(chunk)
+            response = http_client.get(api_url, timeout=5)
+            if response.status_code == 200:
+                # 手动解码GBK编码的响应
+                content = response.content.decode('gbk', errors='ignore').strip()
+                quotes.update(parse_quotes(content, symbol_map))
+        except Exception as e:
+            print(f"批量获取行情失败 ({len(chunk)}只): {e}")
+    return quotes
+
+
+class _QuoteSignals(QObject):
+    finished = pyqtSignal(dict)
+
+
+class _QuoteTask(QRunnable):
+    """线程池任务：拉取一轮行情"""
+
+    def __init__(self, stock_codes):
+        super().__init__()
+        self.setAutoDelete(False)  # 由 QuoteEngine 持有引用
+        self.stock_codes = stock_codes
+        self.signals = _QuoteSignals()
+
+    def run(self):
+        quotes = {}
+        try:
+            quotes = fetch_quotes(self.stock_codes)
+        finally:
+            self.signals.finished.emit(quotes)
+
+
+class QuoteEngine(QObject):
+    """后台行情引擎
+
+    在线程池中批量拉取行情，完成后通过 snapshot_ready 信号把快照送回主线程；
+    上一轮尚未返回时不并发请求，只记下最新一次请求的代码，本轮结束后代码有变化才补发一轮
+    """
+
+    snapshot_ready = pyqtSignal(dict)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._task = None
+        self._pending = None  # 进行中时收到的最新请求
+
+    def is_busy(self) -> bool:
+        return self._task is not None
+
+    def request(self, stock_codes) -> bool:
+        """发起一轮刷新；上一轮未完成时记下这次请求，待其结束后补发，返回 False"""
+        if not stock_codes:
+            return False
+        if self._task is not None:
+            self._pending = list(stock_codes)
+            return False
+        self._task = _QuoteTask(list(stock_codes))
+        self._task.signals.finished.connect(self._on_finished)
+        self._pool.start(self._task)
+        return True
+
+    def _on_finished(self, quotes):
+        done, self._task = self._task.stock_codes, None
+        pending, self._pending = self._pending, None
+        # 本轮进行中新增了代码（如刚加入自选），不等下一次定时刷新
+        if pending is not None and set(pending) != set(done):
+            self.request(pending)
+        self.snapshot_ready.emit(quotes)
+
+
+class QuoteStore(QObject):
+    """内存行情中心
+
+    按代码保存最新快照及其时间戳，各窗口优先从这里读取；
+    超过 ttl 秒的快照视为过期，需要时才补一次批量请求。
+    每次写入都会发出 updated 信号，订阅方据此刷新界面
+    """
+
+    updated = pyqtSignal(dict)  # 本次写入的 {代码: StockInfoWidget}
+
+    def __init__(self, ttl: float = 10, parent=None):
+        super().__init__(parent)
+        self.ttl = ttl
+        self._quotes = {}  # {代码: (时间戳, StockInfoWidget)}
+
+    def update(self, quotes: dict):
+        """写入一批行情并通知订阅方"""
+        if not quotes:
+            return
+        now = time.monotonic()
+        for code, info in quotes.items():
+            self._quotes[code] = (now, info)
+        self.updated.emit(quotes)
+
+    def peek(self, stock_code: str):
+        """读取最新快照，不论是否过期"""
+        entry = self._quotes.get(stock_code)
+        return entry[1] if entry else None
+
+    def get(self, stock_code: str, max_age: float = None):
+        """读取未过期的快照，过期或不存在时返回 None"""
+        entry = self._quotes.get(stock_code)
+        if entry is None:
+            return None
+        ttl = self.ttl if max_age is None else max_age
+        if time.monotonic() - entry[0] > ttl:
+            return None
+        return entry[1]
+
+    def save_snapshot(self, path: str = SNAPSHOT_FILE):
+        """保存最近行情（代码、名称、现价、今开、涨跌、涨跌幅），供下次启动直接显示"""
+        rows = [[code, info.name, info.price, info.open_price, info.change, info.change_percent]
+                for code, (_, info) in self._quotes.items()]
+        tmp = path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(rows, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"保存行情快照失败: {e}")
+
+    def load_snapshot(self, path: str = SNAPSHOT_FILE) -> int:
+        """加载上次保存的行情，标记为旧数据且视为已过期，不发信号；返回条数"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                rows = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            print(f"加载行情快照失败: {e}")
+            return 0
+        count = 0
+        for row in rows:
+            try:
+                code, name, price, open_price, change, change_percent = row
+                info = StockInfoWidget(code, name, float(price), float(change),
+                                       float(change_percent), float(open_price))
+            except (TypeError, ValueError):
+                continue
+            info.stale = True
+            if code not in self._quotes:
+                self._quotes[code] = (float('-inf'), info)
+                count += 1
+        return count
+
+    def ensure(self, stock_codes, max_age: float = None) -> dict:
+        """返回这些代码的最新行情，缺失或过期的合并为一次批量请求补齐"""
+        result = {}
+        missing = []
+        for code in stock_codes:
+            info = self.get(code, max_age)
+            if info is not None:
+                result[code] = info
+            else:
+                missing.append(code)
+        if missing:
+            fetched = fetch_quotes(missing)
+            self.update(fetched)
+            result.update(fetched)
+        return result
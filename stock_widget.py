@@ -4,20 +4,49 @@
 无边框透明窗口，可拖动位置
 """
 
+import time
+_STARTUP_T0 = time.perf_counter()  # 启动计时起点（本模块开始导入）
+
 import sys
 import json
 import ctypes
-import requests
-from kline_chart import KLineDialog
+import http_client
+from quote_api import StockInfoWidget, QuoteEngine, QuoteStore, code_with_prefix
+from symbol_index import (SymbolIndex, SuggestTask, SymbolListTask, fetch_suggest, make_result,
+                          pinyin_initials)
+from market_clock import RefreshScheduler
+from alert_engine import AlertIndex, AlertNotifier
 from datetime import datetime
 from PyQt5.QtWidgets import (QApplication, QWidget, QLabel, QVBoxLayout,
                              QHBoxLayout, QPushButton, QSystemTrayIcon, QMenu,
                              QAction, QDialog, QListWidget, QLineEdit, QMessageBox,
                              QListWidgetItem, QAbstractItemView, QScrollArea,
                              QSlider, QSpinBox, QGridLayout, QComboBox, QInputDialog)
-from PyQt5.QtCore import Qt, QTimer, QPoint, QRegExp
+from PyQt5.QtCore import Qt, QTimer, QPoint, QRegExp, QThreadPool
 from PyQt5.QtGui import QFont, QColor, QIcon, QDoubleValidator, QIntValidator, QRegExpValidator
 
+# K线模块依赖 matplotlib/numpy，导入较慢，首次打开详情时才加载（见 show_stock_detail）
+
+_startup_marks = []  # [(阶段, 时间点)]
+
+
+def _startup_mark(label):
+    """记录启动阶段的时间点"""
+    _startup_marks.append((label, time.perf_counter()))
+
+
+def _startup_report():
+    """打印启动各阶段耗时"""
+    prev = _STARTUP_T0
+    parts = []
+    for label, t in _startup_marks:
+        parts.append(f'{label} {(t - prev) * 1000:.0f}ms')
+        prev = t
+    print(f"启动耗时: {' | '.join(parts)} | 合计 {(prev - _STARTUP_T0) * 1000:.0f}ms")
+
+
+_startup_mark('导入模块')
+
 
 def _chinese_input_dialog(parent, title, label, text=''):
     """自定义输入弹窗，中文按钮"""
@@ -131,23 +160,6 @@ class ClickableLabel(QLabel):
         self.right_callback = callback
 
 
-class StockInfoWidget:
-    """股票信息数据类"""
-    def __init__(self, code: str, name: str, price: float,
-                 change: float, change_percent: float, open_price: float):
-        self.code = code
-        self.name = name
-        self.price = price
-        self.change = change
-        self.change_percent = change_percent
-        self.open_price = open_price
-        # 五档买卖盘
-        self.bid_prices = [0.0] * 5
-        self.bid_vols = [0] * 5
-        self.ask_prices = [0.0] * 5
-        self.ask_vols = [0] * 5
-
-
 class StockManageDialog(QDialog):
     """股票管理对话框 - 支持添加、删除、搜索股票"""
 
@@ -159,19 +171,23 @@ class StockManageDialog(QDialog):
         self.pinned_stocks = pinned_stocks.copy() if pinned_stocks else set()  # 存储置顶的股票代码
         self.groups = dict(groups) if groups else {}  # 复制分组
         self.search_results = []
+        self._suggest_tasks = set()  # 进行中的后台联想任务
         self.load_stock_names()  # 先加载股票名称
         self.init_ui()
+        # 输入停顿后再去后台补充索引
+        self._suggest_timer = QTimer(self)
+        self._suggest_timer.setSingleShot(True)
+        self._suggest_timer.setInterval(400)
+        self._suggest_timer.timeout.connect(self._start_suggest)
 
     def load_stock_names(self):
         """加载当前股票的名称"""
         parent = self.parent()
-        if parent and hasattr(parent, 'get_stock_price'):
+        if parent and hasattr(parent, 'get_stock_prices'):
+            quotes = parent.get_stock_prices(self.current_stocks)
             for code in self.current_stocks:
-                info = parent.get_stock_price(code)
-                if info:
-                    self.stock_names[code] = info.name
-                else:
-                    self.stock_names[code] = code
+                info = quotes.get(code)
+                self.stock_names[code] = info.name if info else code
 
     def init_ui(self):
         """初始化界面"""
@@ -257,6 +273,7 @@ class StockManageDialog(QDialog):
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText('输入股票代码或名称搜索...')
         self.search_input.returnPressed.connect(self.do_search)
+        self.search_input.textChanged.connect(self._on_search_text_changed)
         search_layout.addWidget(self.search_input)
 
         self.search_btn = QPushButton('🔍 搜索')
@@ -295,35 +312,61 @@ class StockManageDialog(QDialog):
         self.setLayout(layout)
 
     def do_search(self):
-        """执行搜索"""
-        keyword = self.search_input.text().strip()
-        if not keyword:
-            return
+        """执行搜索：立即查本地索引，同时后台联想补充"""
+        self._suggest_timer.stop()
+        self._local_search()
+        self._start_suggest()
 
-        self.result_list.clear()
-        self.search_results = []
+    def _on_search_text_changed(self, _text):
+        """输入时即时查本地索引，停顿后后台联想"""
+        self._local_search()
+        self._suggest_timer.start()
 
-        # 调用父窗口的搜索方法获取股票名称
+    def _symbol_index(self):
         parent = self.parent()
-        if parent and hasattr(parent, 'search_stocks'):
-            self.search_results = parent.search_stocks(keyword)
-
-        # 如果没有搜索结果，且输入是6位数字，尝试直接获取股票信息
-        if not self.search_results and len(keyword) == 6 and keyword.isdigit():
-            # 通过API获取股票名称
-            if parent and hasattr(parent, 'get_stock_price'):
-                stock_info = parent.get_stock_price(keyword)
-                if stock_info:
-                    self.search_results.append({'code': keyword, 'name': stock_info.name, 'pinyin': ''})
-                else:
-                    # API失败时也允许添加
-                    self.search_results.append({'code': keyword, 'name': f'{keyword}(待获取)', 'pinyin': ''})
+        return getattr(parent, 'symbol_index', None) if parent else None
 
+    def _local_search(self, extra=None):
+        """查本地索引并显示，extra 为后台联想返回的补充结果"""
+        keyword = self.search_input.text().strip()
+        index = self._symbol_index()
+        results = index.search(keyword) if index is not None and keyword else []
+        codes = {r['code'] for r in results}
+        for item in extra or []:
+            if item['code'] not in codes:
+                codes.add(item['code'])
+                results.append(item)
+
+        # 如果没有搜索结果，且输入是6位数字，先允许直接添加，名称待后台获取
+        if not results and len(keyword) == 6 and keyword.isdigit():
+            results.append({'code': keyword, 'name': f'{keyword}(待获取)', 'pinyin': ''})
+
+        self.search_results = results
+        self.result_list.clear()
         # 显示搜索结果
         for item in self.search_results[:20]:  # 最多显示20条
             display_text = f"{item['code']} - {item['name']}"
             self.result_list.addItem(display_text)
 
+    def _start_suggest(self):
+        """后台联想搜索，结果并入本地索引"""
+        keyword = self.search_input.text().strip()
+        if not keyword:
+            return
+        task = SuggestTask(keyword)
+        task.signals.finished.connect(self._on_suggest_finished)
+        self._suggest_tasks.add(task)
+        QThreadPool.globalInstance().start(task)
+
+    def _on_suggest_finished(self, keyword, records):
+        self._suggest_tasks = {t for t in self._suggest_tasks if t.keyword != keyword}
+        parent = self.parent()
+        if parent and hasattr(parent, 'merge_symbols'):
+            parent.merge_symbols(records)
+        # 输入已变化的过期结果只并入索引，不刷新列表
+        if keyword == self.search_input.text().strip():
+            self._local_search([make_result(*r) for r in records])
+
     def add_selected_stock(self):
         """添加选中的股票"""
         current_item = self.result_list.currentItem()
@@ -488,10 +531,14 @@ class SettingsDialog(QDialog):
 
     def __init__(self, opacity: float, refresh_interval: int,
                  hotkey_ctrl=True, hotkey_shift=True, hotkey_alt=False, hotkey_key='H',
+                 auction_interval=10, break_interval=60, market_hours_only=True,
                  parent=None):
         super().__init__(parent)
         self.opacity = opacity
         self.refresh_interval = refresh_interval
+        self.auction_interval = auction_interval
+        self.break_interval = break_interval
+        self.market_hours_only = market_hours_only
         self.hotkey_ctrl = hotkey_ctrl
         self.hotkey_shift = hotkey_shift
         self.hotkey_alt = hotkey_alt
@@ -501,7 +548,7 @@ class SettingsDialog(QDialog):
     def init_ui(self):
         """初始化界面"""
         self.setWindowTitle('设置')
-        self.setFixedSize(350, 320)
+        self.setFixedSize(350, 460)
         self.setStyleSheet('''
             QDialog {
                 background-color: #ffffff;
@@ -568,7 +615,7 @@ class SettingsDialog(QDialog):
 
         # 刷新间隔设置
         interval_layout = QHBoxLayout()
-        interval_label = QLabel('刷新间隔（秒）：')
+        interval_label = QLabel('盘中刷新间隔：')
         interval_label.setStyleSheet('font-size: 14px;')
         interval_layout.addWidget(interval_label)
 
@@ -582,13 +629,50 @@ class SettingsDialog(QDialog):
         interval_layout.addStretch()
         layout.addLayout(interval_layout)
 
+        # 集合竞价刷新间隔
+        auction_layout = QHBoxLayout()
+        auction_label = QLabel('集合竞价刷新间隔：')
+        auction_label.setStyleSheet('font-size: 14px;')
+        auction_layout.addWidget(auction_label)
+
+        self.auction_spinbox = QSpinBox()
+        self.auction_spinbox.setMinimum(1)
+        self.auction_spinbox.setMaximum(300)
+        self.auction_spinbox.setValue(self.auction_interval)
+        self.auction_spinbox.setSuffix(' 秒')
+        self.auction_spinbox.setFixedWidth(100)
+        auction_layout.addWidget(self.auction_spinbox)
+        auction_layout.addStretch()
+        layout.addLayout(auction_layout)
+
+        # 午休刷新间隔
+        break_layout = QHBoxLayout()
+        break_label = QLabel('午休刷新间隔：')
+        break_label.setStyleSheet('font-size: 14px;')
+        break_layout.addWidget(break_label)
+
+        self.break_spinbox = QSpinBox()
+        self.break_spinbox.setMinimum(5)
+        self.break_spinbox.setMaximum(600)
+        self.break_spinbox.setValue(self.break_interval)
+        self.break_spinbox.setSuffix(' 秒')
+        self.break_spinbox.setFixedWidth(100)
+        break_layout.addWidget(self.break_spinbox)
+        break_layout.addStretch()
+        layout.addLayout(break_layout)
+
+        # 收盘后停止刷新
+        from PyQt5.QtWidgets import QCheckBox
+        self._market_hours_cb = QCheckBox('仅交易时段刷新（收盘后停止，节假日不刷新）')
+        self._market_hours_cb.setChecked(self.market_hours_only)
+        layout.addWidget(self._market_hours_cb)
+
         # 快捷键设置
         hotkey_label = QLabel('全局快捷键（显示/隐藏窗口）：')
         hotkey_label.setStyleSheet('font-size: 14px;')
         layout.addWidget(hotkey_label)
 
         hotkey_layout = QHBoxLayout()
-        from PyQt5.QtWidgets import QCheckBox
         self._hk_ctrl = QCheckBox('Ctrl')
         self._hk_ctrl.setChecked(self.hotkey_ctrl)
         hotkey_layout.addWidget(self._hk_ctrl)
@@ -645,7 +729,9 @@ class SettingsDialog(QDialog):
         """获取设置"""
         return (self.opacity, self.interval_spinbox.value(),
                 self._hk_ctrl.isChecked(), self._hk_shift.isChecked(),
-                self._hk_alt.isChecked(), self._hk_key.text().strip().upper() or 'H')
+                self._hk_alt.isChecked(), self._hk_key.text().strip().upper() or 'H',
+                self.auction_spinbox.value(), self.break_spinbox.value(),
+                self._market_hours_cb.isChecked())
 
 
 class AlertDialog(QDialog):
@@ -827,7 +913,10 @@ class BidAskDialog(QDialog):
         self.stock_name = stock_name
         self.init_ui()
         self._refresh()
-        # 30秒自动刷新
+        # 订阅行情中心，主窗口每轮刷新后同步更新
+        if parent is not None and hasattr(parent, 'quote_store'):
+            parent.quote_store.updated.connect(self._on_quotes_updated)
+        # 30秒自动刷新（行情中心快照未过期时不发请求）
         self._timer = QTimer(self)
         self._timer.timeout.connect(self._refresh)
         self._timer.start(30000)
@@ -953,9 +1042,15 @@ class BidAskDialog(QDialog):
         if not parent or not hasattr(parent, 'get_stock_price'):
             return
         info = parent.get_stock_price(self.stock_code)
-        if not info:
-            return
+        if info:
+            self._show_quote(info)
+
+    def _on_quotes_updated(self, quotes: dict):
+        info = quotes.get(self.stock_code)
+        if info:
+            self._show_quote(info)
 
+    def _show_quote(self, info):
         c = info.price
         prev = info.open_price  # 近似
         chg = info.change
@@ -998,6 +1093,16 @@ class BidAskDialog(QDialog):
         self._extra_lbl.setText(
             f'买量: {total_bid}手  卖量: {total_ask}手  比率: {ratio:.2f}')
 
+    def done(self, result):
+        self._timer.stop()
+        parent = self.parent()
+        if parent is not None and hasattr(parent, 'quote_store'):
+            try:
+                parent.quote_store.updated.disconnect(self._on_quotes_updated)
+            except TypeError:
+                pass
+        super().done(result)
+
     def closeEvent(self, event):
         self._timer.stop()
         super().closeEvent(event)
@@ -1184,11 +1289,18 @@ class StockDesktopWidget(QWidget):
         super().__init__()
         self.stocks = []
         self.pinned_stocks = set()  # 置顶的股票代码
-        self.stock_widgets = []
+        self.stock_widgets = {}  # 行池 {代码: ClickableLabel}，按代码复用
+        self._row_state = {}  # {代码: 上次渲染的(名称, 今开, 现价, 涨跌幅, 是否旧数据)}
+        self._row_order = []  # 当前显示顺序
         self.drag_position = None
         self.window_opacity = 0.85  # 默认透明度
         self.refresh_interval = 5  # 默认刷新间隔（秒）
+        self.auction_interval = 10  # 集合竞价刷新间隔（秒）
+        self.break_interval = 60  # 午休刷新间隔（秒）
+        self.market_hours_only = True  # 仅交易时段刷新
         self.alerts = []  # 价格预警列表
+        self.alert_index = AlertIndex()  # 按代码/目标价索引的待触发预警
+        self.alert_notifier = AlertNotifier(parent=self)  # 非模态预警通知队列
         self.groups = {}  # 分组 {组名: [股票代码列表]}
         self._current_group = '全部'
         self._hotkey_id = 1
@@ -1196,13 +1308,28 @@ class StockDesktopWidget(QWidget):
         self.hotkey_shift = True
         self.hotkey_alt = False
         self.hotkey_key = 'H'
+        self.quote_store = QuoteStore(parent=self)  # 行情中心，各窗口共用
+        self._watched_codes = {}  # K线窗口打开的股票 {代码: 窗口数}，随列表一起刷新行情
+        self.symbol_index = SymbolIndex()  # 本地代码索引，搜索用
+        self.symbol_index.load()
+        self._symbol_list_task = None  # 进行中的代码全表拉取
+        self.quote_store.updated.connect(self._on_quotes_ready)
+        self.quote_engine = QuoteEngine(self)
+        self.quote_engine.snapshot_ready.connect(self.quote_store.update)
+        self._first_paint_done = False
+        self._prefetcher = None  # 图表数据预取，首次用到时创建（延迟导入 numpy）
         self.init_ui()
         self.load_config()
         self._rebuild_group_tabs()
+        # 先用上次保存的行情显示（灰色），首轮实时行情在后台获取
+        self.quote_store.load_snapshot()
         self.setup_timer()
         self.setup_system_tray()
+        # 首次运行或全表过期时，启动后在后台拉取代码全表
+        QTimer.singleShot(3000, self._refresh_symbol_list)
         self._register_hotkey()
         QApplication.instance().aboutToQuit.connect(self._unregister_hotkey)
+        QApplication.instance().aboutToQuit.connect(self.quote_store.save_snapshot)
 
     def init_ui(self):
         """初始化界面"""
@@ -1393,6 +1520,13 @@ class StockDesktopWidget(QWidget):
         self.content_layout.setSpacing(2)
         self.content_layout.setContentsMargins(0, 0, 0, 0)
         self.scroll_content.setLayout(self.content_layout)
+
+        # 标题行和底部弹性空间只创建一次，股票行插在两者之间
+        header = QLabel('代码/名称&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;今开&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;现价&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;涨跌')
+        header.setTextFormat(Qt.RichText)
+        header.setStyleSheet('color: #000000; font-size: 13px; font-weight: bold; padding: 2px 12px; font-family: Consolas, "Courier New", monospace;')
+        self.content_layout.addWidget(header)
+        self.content_layout.addStretch()
         self.scroll_area.setWidget(self.scroll_content)
 
         self.main_layout.addWidget(self.scroll_area)
@@ -1416,6 +1550,10 @@ class StockDesktopWidget(QWidget):
             self.pinned_stocks = set(config.get('pinned', []))
             self.window_opacity = config.get('opacity', 0.85)
             self.refresh_interval = config.get('refresh_interval', 5)
+            self.quote_store.ttl = self.refresh_interval * 2
+            self.auction_interval = config.get('auction_interval', 10)
+            self.break_interval = config.get('break_interval', 60)
+            self.market_hours_only = config.get('market_hours_only', True)
             self.alerts = config.get('alerts', [])
             self.groups = config.get('groups', {})
             # 快捷键设置
@@ -1426,12 +1564,16 @@ class StockDesktopWidget(QWidget):
             self.hotkey_key = hk.get('key', 'H')
             # 应用加载的设置
             self.setWindowOpacity(self.window_opacity)
+            self.alert_index.rebuild(self.alerts)
         except:
             # 默认股票和设置
             self.stocks = ['600519', '000001', '600036']
             self.pinned_stocks = set()
             self.window_opacity = 0.85
             self.refresh_interval = 5
+            self.auction_interval = 10
+            self.break_interval = 60
+            self.market_hours_only = True
             self.alerts = []
             self.groups = {}
             self.hotkey_ctrl = True
@@ -1447,6 +1589,9 @@ class StockDesktopWidget(QWidget):
                 'pinned': list(self.pinned_stocks),
                 'opacity': self.window_opacity,
                 'refresh_interval': self.refresh_interval,
+                'auction_interval': self.auction_interval,
+                'break_interval': self.break_interval,
+                'market_hours_only': self.market_hours_only,
                 'alerts': self.alerts,
                 'groups': self.groups,
                 'hotkey': {
@@ -1585,19 +1730,47 @@ class StockDesktopWidget(QWidget):
         """显示设置对话框"""
         dialog = SettingsDialog(self.window_opacity, self.refresh_interval,
                                 self.hotkey_ctrl, self.hotkey_shift,
-                                self.hotkey_alt, self.hotkey_key, self)
+                                self.hotkey_alt, self.hotkey_key,
+                                self.auction_interval, self.break_interval,
+                                self.market_hours_only, self)
         if dialog.exec_() == QDialog.Accepted:
             (self.window_opacity, self.refresh_interval,
              self.hotkey_ctrl, self.hotkey_shift,
-             self.hotkey_alt, self.hotkey_key) = dialog.get_settings()
+             self.hotkey_alt, self.hotkey_key,
+             self.auction_interval, self.break_interval,
+             self.market_hours_only) = dialog.get_settings()
             self.setWindowOpacity(self.window_opacity)
+            self.quote_store.ttl = self.refresh_interval * 2
             # 重新注册快捷键
             self._unregister_hotkey()
             self._register_hotkey()
             self.save_config()
             # 重启定时器
             self.timer.stop()
-            self.timer.start(self.refresh_interval * 1000)
+            self._apply_schedule()
+            self.timer.start()
+
+    def _preload_chart_module(self):
+        """预加载K线模块（matplotlib）"""
+        t = time.perf_counter()
+        try:
+            import kline_chart  # noqa: F401
+        except Exception as e:
+            print(f"预加载K线模块失败: {e}")
+            return
+        print(f"K线模块预加载 {(time.perf_counter() - t) * 1000:.0f}ms")
+
+    def _get_prefetcher(self):
+        if self._prefetcher is None:
+            from prefetch import Prefetcher
+            self._prefetcher = Prefetcher(parent=self)
+        return self._prefetcher
+
+    def _prefetch_pinned(self):
+        """预取置顶股票的分时和日K"""
+        pinned = [s for s in self.stocks if s in self.pinned_stocks]
+        if pinned:
+            self._get_prefetcher().warm(pinned)
 
     def show_calculator_dialog(self):
         """显示做T计算器对话框"""
@@ -1623,40 +1796,15 @@ class StockDesktopWidget(QWidget):
         dialog = AlertDialog(self.alerts, self.stocks, self)
         if dialog.exec_() == QDialog.Accepted:
             self.alerts = dialog.get_alerts()
+            self.alert_index.rebuild(self.alerts)
             self.save_config()
 
-    def _check_alerts(self):
-        """检查预警条件"""
-        triggered_any = False
-        for alert in self.alerts:
-            if alert.get('triggered'):
-                continue
-            info = self.get_stock_price(alert['code'])
-            if not info:
-                continue
-            price = info.price
-            target = alert['target']
-            direction = alert['direction']
-
-            hit = (direction == 'above' and price >= target) or \
-                  (direction == 'below' and price <= target)
-            if hit:
-                alert['triggered'] = True
-                triggered_any = True
-                sign = '高于' if direction == 'above' else '低于'
-                color = '#ef5350' if direction == 'above' else '#26a69a'
-                QMessageBox.warning(
-                    self, '价格预警',
-                    f'<span style="font-size:14px;">'
-                    f'{alert.get("name", alert["code"])} ({alert["code"]})<br>'
-                    f'当前价: <b>{price:.2f}</b><br>'
-                    f'已{sign}目标价: <b style="color:{color}">{target:.2f}</b>'
-                    f'</span>'
-                )
-                # 蜂鸣声
-                QApplication.beep()
-
-        if triggered_any:
+    def _check_alerts(self, quotes: dict):
+        """用本轮行情快照检查预警，触发的进入非模态通知队列"""
+        hits = self.alert_index.check(quotes)
+        for alert, price in hits:
+            self.alert_notifier.push(alert, price)
+        if hits:
             self.save_config()
 
     def _reset_daily_alerts(self):
@@ -1666,142 +1814,141 @@ class StockDesktopWidget(QWidget):
         for alert in self.alerts:
             if alert.get('triggered'):
                 alert['triggered'] = False
+        self.alert_index.rebuild(self.alerts)
         self.save_config()
 
     def show_stock_detail(self, stock_code: str, stock_name: str):
         """显示K线/分时对话框"""
+        from kline_chart import KLineDialog  # 延迟导入 matplotlib
         dialog = KLineDialog(stock_code, stock_name, self)
         dialog.show()
+        # 预取该股票的其他周期和列表中上下相邻的股票
+        rows = self._row_order
+        i = rows.index(stock_code) if stock_code in rows else -1
+        neighbors = [rows[j] for j in (i - 1, i + 1) if i >= 0 and 0 <= j < len(rows)]
+        self._get_prefetcher().around(stock_code, neighbors)
 
     def search_stocks(self, keyword: str) -> list:
-        """搜索股票（根据代码或名称）- 使用新浪API"""
-        results = []
-        try:
-            # 新浪股票搜索API
-            # type=11:沪深A股, type=12:指数
-            api_url = f"http://suggest3.sinajs.cn/suggest/type=11,12,13,14,15&key={keyword}&name=suggestdata"
-            # 禁用代理，避免连接到本地代理导致超时
-            response = requests.get(api_url, timeout=5, proxies={'http': None, 'https': None})
-
-            if response.status_code == 200:
-                # 手动解码GBK编码的响应
-                content = response.content.decode('gbk').strip()
-                # 格式: var suggestdata="..."
-                if 'suggestdata="' in content:
-                    data_str = content.split('suggestdata="')[1].split('";')[0]
-                    if data_str:
-                        items = data_str.split(';')
-                        for item in items:
-                            if not item:
-                                continue
-                            parts = item.split(',')
-                            if len(parts) >= 6:
-                                # parts[0]=名称, parts[1]=类型, parts[2]=6位代码
-                                code = parts[2]
-                                name = parts[0]
-                                # 跳过名称为空的股票
-                                if len(code) == 6 and code.isdigit() and name and name.strip():
-                                    # 检测name是否是代码格式(如sh600893)，如果是则获取真实名称
-                                    if name.startswith('sh') or name.startswith('sz'):
-                                        stock_info = self.get_stock_price(code)
-                                        if stock_info:
-                                            name = stock_info.name
-                                        else:
-                                            name = code  # fallback
-                                    results.append({
-                                        'code': code,
-                                        'name': name,
-                                        'pinyin': parts[5] if len(parts) > 5 else ''
-                                    })
-        except Exception as e:
-            print(f"搜索失败: {e}")
-        return results
+        """搜索股票（根据代码或名称）- 使用新浪API，结果同时并入本地索引"""
+        records = fetch_suggest(keyword)
+        self.merge_symbols(records)
+        return [make_result(*r) for r in records]
+
+    def merge_symbols(self, records, keep_pinyin: bool = False):
+        """把 [(symbol, 名称, 拼音)] 并入本地代码索引，有变化时写回文件"""
+        if self.symbol_index.merge(records, keep_pinyin):
+            self.symbol_index.save()
+
+    def _refresh_symbol_list(self):
+        """后台拉取沪深A股/ETF/指数全表（首次运行及每隔几天一次）"""
+        if self._symbol_list_task is not None or not self.symbol_index.needs_list():
+            return
+        self._symbol_list_task = SymbolListTask()
+        self._symbol_list_task.signals.finished.connect(self._on_symbol_list)
+        QThreadPool.globalInstance().start(self._symbol_list_task)
+
+    def _on_symbol_list(self, records, complete):
+        """全表并入索引（保留联想接口给的拼音）；不完整时下次启动再拉"""
+        self._symbol_list_task = None
+        if complete:
+            self.symbol_index.list_updated = time.time()
+        self.symbol_index.merge(records, keep_pinyin=True)
+        self.symbol_index.save()
 
     def get_stock_price(self, stock_code: str):
         """获取股票实时价格（腾讯API）"""
-        try:
-            # 判断代码是否已包含前缀
-            if stock_code.startswith('sh') or stock_code.startswith('sz'):
-                code_with_prefix = stock_code
-            else:
-                code_prefix = "sh" if stock_code.startswith(("6", "5")) else "sz"
-                code_with_prefix = f"{code_prefix}{stock_code}"
-
-            api_url = f"http://qt.gtimg.cn/q={code_with_prefix}"
-
-            # 禁用代理，避免连接到本地代理导致超时
-            response = requests.get(api_url, timeout=5, proxies={'http': None, 'https': None})
-
-            if response.status_code == 200:
-                # 手动解码GBK编码的响应
-                content = response.content.decode('gbk').strip()
-                if '~' in content:
-                    data = content.split('~')
-                    if len(data) > 32:
-                        info = StockInfoWidget(
-                            code=stock_code,
-                            name=data[1],
-                            price=float(data[3]),
-                            change=float(data[31]),
-                            change_percent=float(data[32]),
-                            open_price=float(data[5])
-                        )
-                        # 解析五档买卖盘 data[9]~data[28]
-                        if len(data) > 28:
-                            try:
-                                for i in range(5):
-                                    info.bid_prices[i] = float(data[9 + i * 2])   # 买1-5价
-                                    info.bid_vols[i] = int(float(data[10 + i * 2]))  # 买1-5量(手)
-                                    info.ask_prices[i] = float(data[19 + i * 2])   # 卖1-5价
-                                    info.ask_vols[i] = int(float(data[20 + i * 2]))  # 卖1-5量(手)
-                            except (ValueError, IndexError):
-                                pass
-                        return info
-        except Exception as e:
-            print(f"获取 {stock_code} 失败: {e}")
-        return None
+        return self.get_stock_prices([stock_code]).get(stock_code)
 
-    def update_stock_display(self):
-        """更新股票显示"""
-        # 清空整个 content_layout（包括旧的 stretch）
-        while self.content_layout.count():
-            item = self.content_layout.takeAt(0)
-            w = item.widget()
-            if w:
-                w.deleteLater()
-        self.stock_widgets.clear()
-
-        # 添加标题行
-        header = QLabel('代码/名称&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;今开&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;现价&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;涨跌')
-        header.setTextFormat(Qt.RichText)
-        header.setStyleSheet('color: #000000; font-size: 13px; font-weight: bold; padding: 2px 12px; font-family: Consolas, "Courier New", monospace;')
-        self.stock_widgets.append(header)
-        self.content_layout.addWidget(header)
+    def get_stock_prices(self, stock_codes: list) -> dict:
+        """批量获取实时价格，返回 {代码: StockInfoWidget}，优先使用行情中心的未过期快照"""
+        return self.quote_store.ensure(stock_codes)
 
-        # 根据当前分组决定显示哪些股票
+    def _display_stocks(self) -> list:
+        """根据当前分组决定显示哪些股票"""
         if self._current_group == '全部':
-            display_stocks = self.stocks
+            return self.stocks
+        group_codes = set(self.groups.get(self._current_group, []))
+        return [s for s in self.stocks if s in group_codes]
+
+    def update_stock_display(self):
+        """更新股票显示：先用最近快照重绘，再后台拉取最新行情"""
+        self._render_stocks()
+        self.refresh_quotes()
+
+    def refresh_quotes(self):
+        """后台批量拉取当前显示股票、预警股票及K线窗口股票的行情；
+        上一轮未完成时由行情引擎记下，结束后代码有变化再补发"""
+        codes = list(self._display_stocks()) + self.alert_index.codes() + list(self._watched_codes)
+        self.quote_engine.request(list(dict.fromkeys(codes)))
+
+    def watch_quote(self, stock_code: str):
+        """K线窗口打开时登记，之后每轮刷新都带上这只股票；还没有行情时立即补刷一轮"""
+        self._watched_codes[stock_code] = self._watched_codes.get(stock_code, 0) + 1
+        if self.quote_store.get(stock_code) is None:
+            self.refresh_quotes()
+
+    def unwatch_quote(self, stock_code: str):
+        """K线窗口关闭时注销"""
+        left = self._watched_codes.get(stock_code, 0) - 1
+        if left > 0:
+            self._watched_codes[stock_code] = left
         else:
-            group_codes = set(self.groups.get(self._current_group, []))
-            display_stocks = [s for s in self.stocks if s in group_codes]
-
-        # 添加新标签
-        for stock_code in display_stocks:
-            stock_info = self.get_stock_price(stock_code)
-            if stock_info:
-                label = self.create_stock_label(stock_info)
-                self.stock_widgets.append(label)
-                self.content_layout.addWidget(label)
-
-        # 添加弹性空间到底部
-        self.content_layout.addStretch()
+            self._watched_codes.pop(stock_code, None)
+
+    def _on_quotes_ready(self, quotes: dict):
+        """行情中心有更新（主线程）"""
+        self._render_stocks()
+        if not self._first_paint_done:
+            self._first_paint_done = True
+            _startup_mark('首次行情')
+            _startup_report()
+            # 首屏出来后空闲时预热K线模块，首次打开详情不再等待导入
+            QTimer.singleShot(3000, self._preload_chart_module)
+            # 再预取置顶股票的图表数据
+            QTimer.singleShot(5000, self._prefetch_pinned)
+        # 自选股名称顺带补充到本地索引
+        self.merge_symbols(((code_with_prefix(c), q.name, pinyin_initials(q.name))
+                            for c, q in quotes.items()), keep_pinyin=True)
+        self.quote_store.save_snapshot()
 
         # 检查价格预警
-        if self.alerts:
-            self._check_alerts()
-
-    def create_stock_label(self, stock: StockInfoWidget) -> ClickableLabel:
-        """创建股票信息标签"""
+        self._check_alerts(quotes)
+
+    def _render_stocks(self):
+        """按最近快照增量更新股票列表：按代码复用行，只重绘有变化的行"""
+        codes = [c for c in self._display_stocks() if self.quote_store.peek(c)]
+        wanted = set(codes)
+
+        # 移除不再显示的行
+        for code in [c for c in self.stock_widgets if c not in wanted]:
+            label = self.stock_widgets.pop(code)
+            self._row_state.pop(code, None)
+            self.content_layout.removeWidget(label)
+            label.deleteLater()
+
+        # 新建或更新行
+        for code in codes:
+            stock = self.quote_store.peek(code)
+            state = (stock.name, stock.open_price, stock.price, stock.change_percent, stock.stale)
+            label = self.stock_widgets.get(code)
+            if label is None:
+                self.stock_widgets[code] = self.create_stock_label(stock)
+            elif self._row_state.get(code) != state:
+                label.stock_name = stock.name
+                label.setText(self._stock_label_text(stock))
+            self._row_state[code] = state
+
+        # 列表或分组变化时才调整顺序（标题行之后、弹性空间之前）
+        if codes != self._row_order:
+            for code in codes:
+                self.content_layout.removeWidget(self.stock_widgets[code])
+            for i, code in enumerate(codes):
+                self.content_layout.insertWidget(1 + i, self.stock_widgets[code])
+            self._row_order = codes
+
+    @staticmethod
+    def _stock_label_text(stock: StockInfoWidget) -> str:
+        """股票行的富文本"""
         # 根据涨跌设置颜色
         if stock.change_percent >= 0:
             color = '#ff4d4f'  # 红色-涨
@@ -1810,25 +1957,40 @@ class StockDesktopWidget(QWidget):
             color = '#52c41a'  # 绿色-跌
             sign = ''
 
+        # 上次运行保存的旧数据整行置灰，等实时行情到达后恢复
+        text_color = '#999999' if stock.stale else '#000000'
+        if stock.stale:
+            color = text_color
+
         change_str = f'<span style="color:{color};font-weight:bold;">{sign}{stock.change_percent:.2f}%</span>'
         # 代码在上，名称在下，数据对齐
-        text = f'<div style="margin-bottom:2px;">{stock.code}</div><div>{stock.name}&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;{stock.open_price:.2f}&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;{stock.price:.2f}&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;{change_str}</div>'
+        return f'<div style="margin-bottom:2px;color:{text_color};">{stock.code}</div><div style="color:{text_color};">{stock.name}&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;{stock.open_price:.2f}&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;{stock.price:.2f}&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;{change_str}</div>'
 
+    def create_stock_label(self, stock: StockInfoWidget) -> ClickableLabel:
+        """创建股票信息标签"""
         label = ClickableLabel(stock.code, stock.name)
-        label.setText(text)
         label.setTextFormat(Qt.RichText)
+        label.setText(self._stock_label_text(stock))
         label.setStyleSheet('padding: 2px 12px; font-family: Consolas, "Courier New", monospace;')
         label.set_clicked_callback(self.show_stock_detail)
         label.set_right_callback(self.show_bidask_dialog)
         return label
 
     def setup_timer(self):
-        """设置定时刷新"""
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_stock_display)
-        self.timer.start(self.refresh_interval * 1000)  # 使用配置的刷新间隔
+        """设置定时刷新（按交易时段调整频率）"""
+        self.timer = RefreshScheduler(self)
+        self.timer.tick.connect(self.refresh_quotes)
+        self._apply_schedule()
+        self.timer.start()
         self.update_stock_display()  # 立即刷新一次
 
+    def _apply_schedule(self):
+        """把刷新频率设置同步到调度器"""
+        self.timer.trading_interval = self.refresh_interval
+        self.timer.auction_interval = self.auction_interval
+        self.timer.break_interval = self.break_interval
+        self.timer.market_hours_only = self.market_hours_only
+
     def setup_system_tray(self):
         """设置系统托盘"""
         self.tray_icon = QSystemTrayIcon(self)
@@ -1859,6 +2021,7 @@ class StockDesktopWidget(QWidget):
         except:
             pass
         self.tray_icon.show()
+        self.alert_notifier.tray_icon = self.tray_icon
 
     def mousePressEvent(self, event):
         """鼠标按下事件 - 用于拖动"""
@@ -1928,9 +2091,13 @@ class StockDesktopWidget(QWidget):
 def main():
     app = QApplication(sys.argv)
     app.setQuitOnLastWindowClosed(False)  # 关闭窗口时不退出程序
+    http_client.preconnect()  # 预连接行情主机，首轮刷新免去DNS和握手
+    _startup_mark('创建应用')
 
     window = StockDesktopWidget()
+    _startup_mark('创建窗口')
     window.show()
+    _startup_mark('显示窗口')
 
     # 窗口居中显示
     screen = app.primaryScreen()
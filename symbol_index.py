@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+本地证券代码索引
+代码/名称/拼音首字母保存在本地文件，按有序前缀表二分查找，输入时即时出结果；
+首次运行及每隔 LIST_REFRESH_DAYS 天在后台从新浪行情中心拉取沪深A股/ETF/指数全表，
+新浪联想接口 (suggest3.sinajs.cn) 只在后台用来补充索引
+"""
+
+import os
+import json
+import time
+from bisect import bisect_left, bisect_right, insort
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+import http_client
+from quote_api import code_with_prefix, fetch_quotes
+
+INDEX_FILE = 'symbols.tsv'
+SUGGEST_URL = 'http://suggest3.sinajs.cn/suggest/type=11,12,13,14,15&key={}&name=suggestdata'
+LIST_URL = ('http://vip.stock.finance.sina.com.cn/quotes_service/api/json_v2.php/'
+            'Market_Center.getHQNodeData?page={}&num={}&sort=symbol&asc=1&node={}')
+LIST_NODES = ('hs_a', 'etf_hq_fund', 'hs_s')  # 沪深A股、ETF、沪深指数
+LIST_PAGE_SIZE = 100
+LIST_REFRESH_DAYS = 7  # 全表重新拉取间隔（新股上市、改名）
+
+# GB2312 一级汉字按拼音排序，各声母首字的编码，用于推出名称的拼音首字母
+_GB_INITIALS = (
+    (0xB0A1, 'a'), (0xB0C5, 'b'), (0xB2C1, 'c'), (0xB4EE, 'd'), (0xB6EA, 'e'), (0xB7A2, 'f'),
+    (0xB8C1, 'g'), (0xB9FE, 'h'), (0xBBF7, 'j'), (0xBFA6, 'k'), (0xC0AC, 'l'), (0xC2E8, 'm'),
+    (0xC4C3, 'n'), (0xC5B6, 'o'), (0xC5BE, 'p'), (0xC6DA, 'q'), (0xC8BB, 'r'), (0xC8F6, 's'),
+    (0xCBFA, 't'), (0xCDDA, 'w'), (0xCEF4, 'x'), (0xD1B9, 'y'), (0xD4D1, 'z'),
+)
+_GB_LEVEL1_END = 0xD7F9
+_GB_STARTS = [code for code, _ in _GB_INITIALS]
+# 证券名称中常见的多音字按惯用读音（银行、重庆、西藏）
+_PINYIN_OVERRIDES = {'行': 'h', '重': 'c', '藏': 'z'}
+
+
+def _add_code(symbol: str) -> str:
+    """添加到自选时使用的代码：前缀可由规则推出时用6位代码，否则保留前缀（如 sh000001）"""
+    code = symbol[2:]
+    return code if code_with_prefix(code) == symbol else symbol
+
+
+def make_result(symbol: str, name: str, pinyin: str) -> dict:
+    """搜索结果条目"""
+    return {'code': _add_code(symbol), 'name': name, 'pinyin': pinyin}
+
+
+def pinyin_initials(name: str) -> str:
+    """名称的拼音首字母（小写）：字母数字原样保留，一级汉字按 GB2312 编码区间推出，
+    其余字符（二级汉字、符号）跳过；多音字除常见的几个外取 GB2312 排序所用的读音"""
+    out = []
+    for ch in name:
+        if ch.isascii():
+            if ch.isalnum():
+                out.append(ch.lower())
+            continue
+        if ch in _PINYIN_OVERRIDES:
+            out.append(_PINYIN_OVERRIDES[ch])
+            continue
+        try:
+            raw = ch.encode('gb2312')
+        except UnicodeEncodeError:
+            continue
+        code = raw[0] << 8 | raw[1] if len(raw) == 2 else 0
+        if _GB_STARTS[0] <= code <= _GB_LEVEL1_END:
+            out.append(_GB_INITIALS[bisect_right(_GB_STARTS, code) - 1][1])
+    return ''.join(out)
+
+
+class SymbolIndex:
+    """证券代码索引
+
+    记录 {symbol: (名称, 拼音首字母)}，另为带前缀代码、代码、拼音、名称各维护一张
+    有序的 [(键, symbol)] 表，前缀查询用二分定位后顺序扫描
+    """
+
+    FIELDS = ('symbol', 'code', 'pinyin', 'name')
+
+    def __init__(self, path: str = INDEX_FILE):
+        self.path = path
+        self._records = {}
+        self._keys = {f: [] for f in self.FIELDS}
+        self.list_updated = 0.0  # 最近一次拉取全表的时间戳
+
+    def __len__(self):
+        return len(self._records)
+
+    @staticmethod
+    def _entries(symbol, name, pinyin):
+        yield 'symbol', symbol
+        yield 'code', symbol[2:]
+        if pinyin:
+            yield 'pinyin', pinyin.lower()
+        yield 'name', name.lower()
+
+    def load(self):
+        """从本地文件加载索引，每行: symbol\\t名称\\t拼音；
+        另有一行 #list\\t时间戳 记录最近一次拉取全表的时间"""
+        records = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.rstrip('\n').split('\t')
+                    if len(parts) == 3 and parts[0]:
+                        records[parts[0]] = (parts[1], parts[2])
+                    elif len(parts) == 2 and parts[0] == '#list':
+                        try:
+                            self.list_updated = float(parts[1])
+                        except ValueError:
+                            pass
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"加载代码索引失败: {e}")
+        self._records = records
+        self._keys = {f: [] for f in self.FIELDS}
+        for symbol, (name, pinyin) in records.items():
+            for field, key in self._entries(symbol, name, pinyin):
+                self._keys[field].append((key, symbol))
+        for keys in self._keys.values():
+            keys.sort()
+
+    def save(self):
+        """写回本地文件（先写临时文件再替换）"""
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                if self.list_updated:
+                    f.write(f'#list\t{self.list_updated:.0f}\n')
+                for symbol in sorted(self._records):
+                    name, pinyin = self._records[symbol]
+                    f.write(f'{symbol}\t{name}\t{pinyin}\n')
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"保存代码索引失败: {e}")
+
+    def needs_list(self) -> bool:
+        """是否需要（重新）拉取全表"""
+        return time.time() - self.list_updated > LIST_REFRESH_DAYS * 86400
+
+    def merge(self, records, keep_pinyin: bool = False) -> bool:
+        """合并 [(symbol, 名称, 拼音)]，已有拼音不会被空值覆盖；keep_pinyin 时已有拼音一律保留
+        （全表的拼音由本地推出，多音字可能不准，不覆盖联想接口给的）。返回是否有变化"""
+        changed = False
+        for symbol, name, pinyin in records:
+            old = self._records.get(symbol)
+            if old and old[1] and (keep_pinyin or not pinyin):
+                pinyin = old[1]
+            if old == (name, pinyin):
+                continue
+            if old:
+                for field, key in self._entries(symbol, *old):
+                    keys = self._keys[field]
+                    i = bisect_left(keys, (key, symbol))
+                    if i < len(keys) and keys[i] == (key, symbol):
+                        del keys[i]
+            for field, key in self._entries(symbol, name, pinyin):
+                insort(self._keys[field], (key, symbol))
+            self._records[symbol] = (name, pinyin)
+            changed = True
+        return changed
+
+    def search(self, keyword: str, limit: int = 20) -> list:
+        """前缀搜索：数字按代码，字母按拼音首字母和名称，中文按名称；
+        带交易所前缀的代码（如 sh6000）先列同一市场的，再列其他市场代码相同的"""
+        kw = keyword.strip().lower()
+        if not kw:
+            return []
+        if kw[:2] in ('sh', 'sz') and kw[2:].isdigit():
+            queries = (('symbol', kw), ('code', kw[2:]))
+        elif kw.isdigit():
+            queries = (('code', kw),)
+        else:
+            queries = (('pinyin', kw), ('name', kw))
+        results, seen = [], set()
+        for field, prefix in queries:
+            keys = self._keys[field]
+            i = bisect_left(keys, (prefix,))
+            while i < len(keys) and len(results) < limit and keys[i][0].startswith(prefix):
+                symbol = keys[i][1]
+                if symbol not in seen:
+                    seen.add(symbol)
+                    results.append(make_result(symbol, *self._records[symbol]))
+                i += 1
+        return results
+
+
+def fetch_suggest(keyword: str) -> list:
+    """新浪联想搜索，返回 [(symbol, 名称, 拼音)]"""
+    records = []
+    try:
+        # 新浪股票搜索API
+        # type=11:沪深A股, type=12:指数
+        response = http_client.get(SUGGEST_URL.format(keyword), timeout=5)
+        if response.status_code == 200:
+            # 手动解码GBK编码的响应
+            content = response.content.decode('gbk').strip()
+            # 格式: var suggestdata="..."
+            if 'suggestdata="' in content:
+                data_str = content.split('suggestdata="')[1].split('";')[0]
+                for item in data_str.split(';'):
+                    parts = item.split(',')
+                    if len(parts) < 6:
+                        continue
+                    # parts[0]=名称, parts[2]=6位代码, parts[3]=带前缀代码, parts[5]=拼音
+                    code, name = parts[2], parts[0]
+                    # 跳过名称为空的股票
+                    if len(code) == 6 and code.isdigit() and name and name.strip():
+                        symbol = parts[3] if parts[3][:2] in ('sh', 'sz') else code_with_prefix(code)
+                        records.append((symbol, name, parts[5]))
+        # name是代码格式(如sh600893)的结果，合并为一次批量请求获取真实名称
+        unnamed = [r[0] for r in records if r[1].startswith(('sh', 'sz'))]
+        if unnamed:
+            quotes = fetch_quotes(unnamed)
+            records = [(s, quotes[s].name if s in quotes else s[2:], p) if n.startswith(('sh', 'sz'))
+                       else (s, n, p) for s, n, p in records]
+    except Exception as e:
+        print(f"搜索失败: {e}")
+    return records
+
+
+class _SuggestSignals(QObject):
+    finished = pyqtSignal(str, list)
+
+
+class SuggestTask(QRunnable):
+    """后台联想搜索任务，结果用于补充本地索引
+
+    联想无结果且输入为6位代码时，直接用行情接口查名称
+    """
+
+    def __init__(self, keyword: str):
+        super().__init__()
+        self.setAutoDelete(False)  # 由发起方持有引用
+        self.keyword = keyword
+        self.signals = _SuggestSignals()
+
+    def run(self):
+        records = []
+        try:
+            records = fetch_suggest(self.keyword)
+            if not records and len(self.keyword) == 6 and self.keyword.isdigit():
+                info = fetch_quotes([self.keyword]).get(self.keyword)
+                if info:
+                    records = [(code_with_prefix(self.keyword), info.name, '')]
+        finally:
+            self.signals.finished.emit(self.keyword, records)
+
+
+def _decode(content: bytes) -> str:
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        return content.decode('gbk')
+
+
+def fetch_symbol_list(nodes=LIST_NODES, page_size: int = LIST_PAGE_SIZE):
+    """从新浪行情中心分页拉取全表，返回 ([(symbol, 名称, 拼音)], 是否完整)；
+    中途失败时返回已取到的部分"""
+    records = []
+    for node in nodes:
+        page = 1
+        while True:
+            try:
+                r = http_client.get(LIST_URL.format(page, page_size, node), timeout=10)
+                if r.status_code != 200:
+                    return records, False
+                # 超出最后一页时返回 null
+                rows = json.loads(_decode(r.content)) or []
+            except Exception as e:
+                print(f"获取代码列表失败 ({node} 第{page}页): {e}")
+                return records, False
+            for row in rows:
+                symbol, name = str(row.get('symbol', '')), str(row.get('name', '')).strip()
+                if symbol[:2] in ('sh', 'sz') and symbol[2:].isdigit() and name:
+                    records.append((symbol, name, pinyin_initials(name)))
+            if len(rows) < page_size:
+                break
+            page += 1
+    return records, True
+
+
+class _ListSignals(QObject):
+    finished = pyqtSignal(list, bool)
+
+
+class SymbolListTask(QRunnable):
+    """后台拉取代码全表，结果 (记录, 是否完整) 通过信号送回主线程并入索引"""
+
+    def __init__(self):
+        super().__init__()
+        self.setAutoDelete(False)  # 由发起方持有引用
+        self.signals = _ListSignals()
+
+    def run(self):
+        records, complete = [], False
+        try:
+            records, complete = fetch_symbol_list()
+        finally:
+            self.signals.finished.emit(records, complete)
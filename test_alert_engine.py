@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+价格预警引擎测试
+核对有序索引的触发条件（穿越、等于目标价）、删除预警后不再触发、
+同一天不重复提示，以及通知队列对相同预警的去重
+运行: python -m pytest -q test_alert_engine.py
+"""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt5.QtWidgets import QApplication, QSystemTrayIcon  # noqa: E402
+
+import alert_engine  # noqa: E402
+from alert_engine import AlertIndex, AlertNotifier  # noqa: E402
+
+
+def alert(code, direction, target, **kw):
+    return {'code': code, 'name': code, 'direction': direction, 'target': target,
+            'triggered': False, **kw}
+
+
+def quotes(**prices):
+    return {code: SimpleNamespace(price=price) for code, price in prices.items()}
+
+
+def hit_targets(hits):
+    return sorted((a['code'], a['direction'], a['target']) for a, _ in hits)
+
+
+# ================================================================
+#  AlertIndex
+# ================================================================
+
+def test_above_triggers_at_and_over_target():
+    alerts = [alert('600519', 'above', t) for t in (1700, 1650, 1800, 1680)]
+    index = AlertIndex(alerts)
+    assert index.check(quotes(**{'600519': 1679.99})) == [
+        (alerts[1], 1679.99)]
+    # 等于目标价也触发
+    hits = index.check(quotes(**{'600519': 1700}))
+    assert hit_targets(hits) == [('600519', 'above', 1680), ('600519', 'above', 1700)]
+    assert index.codes() == ['600519']
+
+
+def test_below_triggers_at_and_under_target():
+    alerts = [alert('000001', 'below', t) for t in (10.5, 11.0, 9.8)]
+    index = AlertIndex(alerts)
+    assert index.check(quotes(**{'000001': 11.01})) == []
+    assert hit_targets(index.check(quotes(**{'000001': 10.5}))) == [
+        ('000001', 'below', 10.5), ('000001', 'below', 11.0)]
+    assert hit_targets(index.check(quotes(**{'000001': 9.0}))) == [('000001', 'below', 9.8)]
+    assert index.codes() == []
+
+
+def test_price_between_targets_triggers_nothing():
+    index = AlertIndex([alert('600036', 'above', 40), alert('600036', 'below', 30)])
+    assert index.check(quotes(**{'600036': 35})) == []
+    assert index.codes() == ['600036']
+
+
+def test_equal_targets_all_trigger():
+    alerts = [alert('600036', 'above', 40), alert('600036', 'above', 40)]
+    index = AlertIndex(alerts)
+    hits = index.check(quotes(**{'600036': 40}))
+    assert [a for a, _ in hits] == alerts
+
+
+def test_triggered_alert_does_not_repeat_same_day():
+    a = alert('600519', 'above', 1700)
+    index = AlertIndex([a])
+    assert len(index.check(quotes(**{'600519': 1710}))) == 1
+    assert a['triggered'] is True
+    for price in (1720, 1690, 1705):
+        assert index.check(quotes(**{'600519': price})) == []
+    # 重新加载配置（已触发的仍标记着）也不会再次触发
+    index.rebuild([a])
+    assert index.check(quotes(**{'600519': 1730})) == []
+
+
+def test_removed_alert_no_longer_triggers():
+    keep = alert('600519', 'above', 1700)
+    drop = alert('600519', 'below', 1600)
+    other = alert('000001', 'above', 12)
+    alerts = [keep, drop, other]
+    index = AlertIndex(alerts)
+    # 预警对话框删除后按新列表重建索引
+    alerts.remove(drop)
+    alerts.remove(other)
+    index.rebuild(alerts)
+    assert index.codes() == ['600519']
+    assert index.check(quotes(**{'600519': 1500, '000001': 13})) == []
+    assert index.check(quotes(**{'600519': 1700})) == [(keep, 1700)]
+
+
+def test_codes_without_quotes_are_skipped():
+    index = AlertIndex([alert('600519', 'above', 1700), alert('000001', 'below', 10)])
+    assert hit_targets(index.check(quotes(**{'000001': 9.5, '600036': 50}))) == [
+        ('000001', 'below', 10)]
+    assert index.codes() == ['600519']
+
+
+# ================================================================
+#  AlertNotifier
+# ================================================================
+
+class FakeTray:
+    def __init__(self):
+        self.messages = []
+
+    def showMessage(self, title, text, icon, msecs):
+        self.messages.append(text)
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def notifier(app, monkeypatch):
+    monkeypatch.setattr(QSystemTrayIcon, 'supportsMessages', staticmethod(lambda: True))
+    monkeypatch.setattr(alert_engine.QApplication, 'beep', staticmethod(lambda: None))
+    n = AlertNotifier(FakeTray())
+    yield n
+    n._timer.stop()
+
+
+def expire(notifier):
+    """当前提示到时"""
+    notifier._timer.stop()
+    notifier._show_next()
+
+
+def test_notifier_shows_one_at_a_time(notifier):
+    a, b = alert('600519', 'above', 1700), alert('000001', 'below', 10)
+    notifier.push(a, 1701)
+    notifier.push(b, 9.9)
+    assert len(notifier.tray_icon.messages) == 1
+    assert '1701.00' in notifier.tray_icon.messages[0]
+    expire(notifier)
+    assert len(notifier.tray_icon.messages) == 2
+    assert '低于目标价: 10.00' in notifier.tray_icon.messages[1]
+
+
+def test_notifier_dedupes_same_alert(notifier):
+    a = alert('600519', 'above', 1700)
+    notifier.push(a, 1701)
+    notifier.push(dict(a), 1702)   # 正在提示时同一预警再来一次
+    b = alert('000001', 'below', 10)
+    notifier.push(b, 9.9)
+    notifier.push(dict(b), 9.8)    # 排队中再来一次
+    expire(notifier)
+    expire(notifier)
+    assert len(notifier.tray_icon.messages) == 2
+    # 提示结束后同一预警可以再次提示
+    notifier.push(a, 1703)
+    assert len(notifier.tray_icon.messages) == 3
+    assert '1703.00' in notifier.tray_icon.messages[2]
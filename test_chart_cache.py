@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+图表数据缓存测试
+注入单调时钟和当前时间，核对按字节预算的LRU淘汰顺序、盘中/休市有效期和不跨过下次开盘
+运行: python -m pytest -q test_chart_cache.py
+"""
+
+import datetime
+
+import numpy as np
+import pytest
+
+from chart_cache import ChartCache, sizeof
+
+KB = 1024
+
+
+class Clock:
+    """可手动推进的单调时钟和墙上时间"""
+
+    def __init__(self, now):
+        self.t = 1000.0
+        self.wall = now
+
+    def monotonic(self):
+        return self.t
+
+    def now(self):
+        return self.wall
+
+    def advance(self, seconds):
+        self.t += seconds
+        self.wall += datetime.timedelta(seconds=seconds)
+
+
+def at(text):
+    return datetime.datetime.strptime(text, '%Y-%m-%d %H:%M')
+
+
+def make_cache(now='2025-10-10 10:00', **kw):
+    clock = Clock(at(now))
+    return ChartCache(clock=clock.monotonic, now=clock.now, **kw), clock
+
+
+def block(kb=1):
+    return np.zeros(kb * KB, dtype=np.uint8)
+
+
+# ================================================================
+#  按字节预算的LRU淘汰
+# ================================================================
+
+def test_evicts_least_recently_used():
+    cache, _ = make_cache(max_bytes=3 * KB)
+    for key in 'abc':
+        cache.put(key, block())
+    assert cache.get('a') is not None   # a 变为最近使用
+    cache.put('d', block())
+    assert 'b' not in cache
+    assert all(k in cache for k in 'acd')
+    cache.put('e', block())
+    assert 'c' not in cache
+    assert cache.stats()['evictions'] == 2
+    assert cache.stats()['bytes'] == 3 * KB
+
+
+def test_large_entry_evicts_several():
+    cache, _ = make_cache(max_bytes=4 * KB)
+    for key in 'abcd':
+        cache.put(key, block())
+    cache.put('big', block(3))
+    assert [k for k in 'abcd' if k in cache] == ['d']
+    assert cache.stats()['bytes'] == 4 * KB
+
+
+def test_oversized_entry_not_cached():
+    cache, _ = make_cache(max_bytes=2 * KB)
+    cache.put('a', block())
+    cache.put('a', block(3))   # 替换为超出预算的值：旧值也移除
+    assert 'a' not in cache
+    assert cache.stats()['bytes'] == 0
+
+
+def test_replace_updates_bytes():
+    cache, _ = make_cache(max_bytes=8 * KB)
+    cache.put('a', block(2))
+    cache.put('a', block(1))
+    assert len(cache) == 1
+    assert cache.stats()['bytes'] == KB
+
+
+def test_contains_does_not_touch_order_or_counts():
+    cache, _ = make_cache(max_bytes=2 * KB)
+    cache.put('a', block())
+    cache.put('b', block())
+    assert 'a' in cache
+    cache.put('c', block())
+    assert 'a' not in cache and 'b' in cache
+    assert cache.stats()['hits'] == cache.stats()['misses'] == 0
+
+
+def test_sizeof_counts_base_of_views():
+    base = block(4)
+    assert sizeof(base[:10]) == 4 * KB
+    assert sizeof((base[:10], base[10:20])) >= 8 * KB
+
+
+# ================================================================
+#  有效期
+# ================================================================
+
+def test_live_ttl_during_trading():
+    cache, clock = make_cache('2025-10-10 10:00', live_ttl=300, closed_ttl=3600)
+    cache.put('a', 1)
+    clock.advance(299)
+    assert cache.get('a') == 1
+    clock.advance(1)
+    assert cache.get('a') is None
+    assert len(cache) == 0
+    assert cache.stats()['hits'] == cache.stats()['misses'] == 1
+
+
+def test_closed_ttl_after_close():
+    cache, clock = make_cache('2025-10-10 20:00', live_ttl=300, closed_ttl=3600)
+    cache.put('a', 1)
+    clock.advance(3599)
+    assert 'a' in cache
+    clock.advance(1)
+    assert 'a' not in cache
+
+
+@pytest.mark.parametrize('now, ttl', [
+    ('2025-10-10 09:05', 600),     # 盘前：到 9:15 开盘
+    ('2025-10-10 08:30', 2700),
+    ('2025-10-10 07:00', 3600),    # 离开盘还远，取 closed_ttl
+    ('2025-10-12 09:10', 3600),    # 周日，下次开盘在周一
+    ('2025-10-08 09:10', 3600),    # 假期最后一天
+    ('2025-10-09 09:10', 300),     # 节后第一天盘前
+    ('2025-10-10 09:20', 50),      # 集合竞价按盘中
+    ('2025-10-10 12:00', 50),      # 午休按盘中
+])
+def test_ttl_by_phase_and_next_open(now, ttl):
+    cache, _ = make_cache(now, live_ttl=50, closed_ttl=3600)
+    assert cache.ttl() == ttl
+
+
+def test_entry_written_before_open_expires_at_open():
+    cache, clock = make_cache('2025-10-10 09:05', live_ttl=300, closed_ttl=3600)
+    cache.put('a', 1)
+    clock.advance(599)
+    assert 'a' in cache
+    clock.advance(1)
+    assert 'a' not in cache
+
+
+def test_per_entry_ttl():
+    cache, clock = make_cache('2025-10-10 10:00', live_ttl=300)
+    cache.put('fs', 1, live_ttl=120)
+    cache.put('kline', 2)
+    clock.advance(120)
+    assert 'fs' not in cache and 'kline' in cache
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+indicators 模块与原K线窗口逐条循环实现的一致性测试
+参考实现照搬自改写前的 KLineDialog._ma/_ema/_calc_boll/_calc_macd/_calc_kdj/_calc_rsi，
+运行: python -m pytest -q test_indicators.py
+"""
+
+import numpy as np
+import pytest
+
+import indicators
+
+# MA/BOLL 用累加和计算，与逐窗口 np.mean 在末位有舍入差异
+ATOL = 1e-9
+
+
+# ================================================================
+#  参考实现（原逐条循环版本）
+# ================================================================
+
+def ref_ma(data, period):
+    out = []
+    for i in range(len(data)):
+        if i < period - 1:
+            out.append(np.nan)
+        else:
+            out.append(np.mean(data[i - period + 1:i + 1]))
+    return out
+
+
+def ref_ema(data, period):
+    out = [data[0]]
+    k = 2 / (period + 1)
+    for i in range(1, len(data)):
+        out.append(data[i] * k + out[-1] * (1 - k))
+    return out
+
+
+def ref_boll(closes, period=20, nbdev=2):
+    mid = ref_ma(closes, period)
+    upper, lower = [], []
+    for i in range(len(closes)):
+        if i < period - 1:
+            upper.append(np.nan); lower.append(np.nan)
+        else:
+            std = np.std(closes[i - period + 1:i + 1])
+            upper.append(mid[i] + nbdev * std)
+            lower.append(mid[i] - nbdev * std)
+    return upper, mid, lower
+
+
+def ref_macd(closes):
+    if len(closes) < 26:
+        return [], [], []
+    dif = [a - b for a, b in zip(ref_ema(closes, 12), ref_ema(closes, 26))]
+    dea = ref_ema(dif, 9)
+    macd = [a - b for a, b in zip(dif, dea)]
+    return dif, dea, macd
+
+
+def ref_kdj(highs, lows, closes, n=9, m1=3, m2=3):
+    k_list, d_list, j_list = [], [], []
+    for i in range(len(closes)):
+        if i < n - 1:
+            rsv = 50
+        else:
+            hh = max(highs[i - n + 1:i + 1])
+            ll = min(lows[i - n + 1:i + 1])
+            rsv = (closes[i] - ll) / (hh - ll) * 100 if hh != ll else 50
+        k = (rsv + (m1 - 1) * (k_list[-1] if k_list else 50)) / m1
+        d = (k + (m2 - 1) * (d_list[-1] if d_list else 50)) / m2
+        j = 3 * k - 2 * d
+        k_list.append(k); d_list.append(d); j_list.append(j)
+    return k_list, d_list, j_list
+
+
+def ref_rsi(closes, period=6):
+    if len(closes) < period + 1:
+        return []
+    gains, losses = [], []
+    for i in range(1, len(closes)):
+        chg = closes[i] - closes[i - 1]
+        gains.append(max(chg, 0)); losses.append(max(-chg, 0))
+    ag = sum(gains[:period]) / period
+    al = sum(losses[:period]) / period
+    out = [100 if al == 0 else 100 - 100 / (1 + ag / al)]
+    for i in range(period, len(gains)):
+        ag = (ag * (period - 1) + gains[i]) / period
+        al = (al * (period - 1) + losses[i]) / period
+        out.append(100 if al == 0 else 100 - 100 / (1 + ag / al))
+    return out
+
+
+# ================================================================
+#  测试数据
+# ================================================================
+
+def make_bars(n, seed=0):
+    """随机游走K线 (高, 低, 收)，中间插入一段一字平盘（高=低=收）"""
+    rng = np.random.default_rng(seed)
+    closes = 100 + np.cumsum(rng.normal(0, 1, n))
+    opens = closes + rng.normal(0, 0.5, n)
+    highs = np.maximum(opens, closes) + rng.random(n)
+    lows = np.minimum(opens, closes) - rng.random(n)
+    flat = slice(n // 2, n // 2 + 12)
+    closes[flat] = highs[flat] = lows[flat] = closes[n // 2]
+    return highs.tolist(), lows.tolist(), closes.tolist()
+
+
+def flat_bars(n, price=10.0):
+    return [price] * n, [price] * n, [price] * n
+
+
+CASES = {
+    'single': make_bars(1),
+    'short': make_bars(5),
+    'below_macd': make_bars(25),
+    'medium': make_bars(250, seed=1),
+    'flat': flat_bars(60),
+    'long': make_bars(10000, seed=2),
+}
+
+
+@pytest.fixture(params=sorted(CASES))
+def bars(request):
+    return CASES[request.param]
+
+
+def assert_same(actual, expected, atol=0.0):
+    actual = np.asarray(actual, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=atol, equal_nan=True)
+
+
+# ================================================================
+#  批量计算与参考实现一致
+# ================================================================
+
+@pytest.mark.parametrize('period', [5, 10, 20, 60])
+def test_ma(bars, period):
+    closes = bars[2]
+    assert_same(indicators.ma(closes, period), ref_ma(closes, period), ATOL)
+
+
+@pytest.mark.parametrize('n', [1, 2, 9, 60])
+def test_rolling_max_min(bars, n):
+    highs, lows, _ = bars
+    expected_max = [np.nan if i < n - 1 else max(highs[i - n + 1:i + 1]) for i in range(len(highs))]
+    expected_min = [np.nan if i < n - 1 else min(lows[i - n + 1:i + 1]) for i in range(len(lows))]
+    assert_same(indicators.rolling_max(highs, n), expected_max)
+    assert_same(indicators.rolling_min(lows, n), expected_min)
+
+
+@pytest.mark.parametrize('period', [9, 12, 26])
+def test_ema(bars, period):
+    closes = bars[2]
+    assert_same(indicators.ema(closes, period), ref_ema(closes, period))
+
+
+def test_boll(bars):
+    closes = bars[2]
+    for actual, expected in zip(indicators.boll(closes), ref_boll(closes)):
+        assert_same(actual, expected, ATOL)
+
+
+def test_macd(bars):
+    closes = bars[2]
+    for actual, expected in zip(indicators.macd(closes), ref_macd(closes)):
+        assert_same(actual, expected)
+
+
+def test_kdj(bars):
+    for actual, expected in zip(indicators.kdj(*bars), ref_kdj(*bars)):
+        assert_same(actual, expected)
+
+
+@pytest.mark.parametrize('period', [6, 12, 24])
+def test_rsi(bars, period):
+    closes = bars[2]
+    assert_same(indicators.rsi(closes, period), ref_rsi(closes, period))
+
+
+# ================================================================
+#  流式计算与批量计算一致
+# ================================================================
+
+def replay(stream, bars, ticks=3, seed=0):
+    """逐根回放：每根先用一个偏离的价格 append，再 update_last 几次，最后改成真实值，
+    模拟盘中最后一根K线不断变化；返回每根最终的输出"""
+    rng = np.random.default_rng(seed)
+    out = []
+    for row in zip(*bars):
+        value = stream.append(*(v + rng.normal() for v in row))
+        for _ in range(ticks - 1):
+            value = stream.update_last(*(v + rng.normal() for v in row))
+        out.append(stream.update_last(*row))
+    return out
+
+
+def test_streaming_ma(bars):
+    closes = bars[2]
+    for period in (5, 60):
+        out = replay(indicators.StreamingMA(period), (closes,))
+        assert_same(out, indicators.ma(closes, period), ATOL)
+
+
+def test_streaming_boll(bars):
+    closes = bars[2]
+    out = np.array(replay(indicators.StreamingBoll(), (closes,))).reshape(-1, 3)
+    for actual, expected in zip(out.T, indicators.boll(closes)):
+        assert_same(actual, expected, ATOL)
+
+
+def test_streaming_macd(bars):
+    closes = bars[2]
+    expected = indicators.macd(closes)
+    if not len(expected[0]):
+        return
+    out = np.array(replay(indicators.StreamingMACD(), (closes,))).reshape(-1, 3)
+    for actual, exp in zip(out.T, expected):
+        assert_same(actual, exp, ATOL)
+
+
+def test_streaming_kdj(bars):
+    out = np.array(replay(indicators.StreamingKDJ(), bars)).reshape(-1, 3)
+    for actual, expected in zip(out.T, indicators.kdj(*bars)):
+        assert_same(actual, expected, ATOL)
+
+
+def test_streaming_rsi(bars):
+    closes = bars[2]
+    period = 6
+    out = replay(indicators.StreamingRSI(period), (closes,))
+    # 批量结果从第 period+1 根开始，流式前 period 根为 nan
+    assert np.all(np.isnan(out[:period]))
+    assert_same(out[period:], indicators.rsi(closes, period), ATOL)
+
+
+def test_streaming_sums_stay_exact_over_long_session():
+    """盘中最后一根被改写上千次后，滚动和/平方和的累积误差仍在容差内，平盘时标准差为 0"""
+    rng = np.random.default_rng(3)
+    closes = (1700 + np.cumsum(rng.normal(0, 2, 3000))).tolist()
+    ma, bl = indicators.StreamingMA(20), indicators.StreamingBoll()
+    for c in closes:
+        ma.append(c)
+        bl.append(c)
+    for _ in range(5000):
+        p = closes[-1] + rng.normal()
+        ma.update_last(p)
+        bl.update_last(p)
+    assert_same(ma.update_last(closes[-1]), indicators.ma(closes, 20)[-1], 1e-9)
+    assert_same(bl.update_last(closes[-1]), [b[-1] for b in indicators.boll(closes)], 1e-9)
+    flat = indicators.StreamingBoll()
+    for _ in range(45):
+        flat.append(10.0)
+    assert flat.update_last(10.0) == (10.0, 10.0, 10.0)
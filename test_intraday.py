@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+分时数据解析与缓存测试
+用构造的分时接口返回内容，核对 numpy 解析结果与原逐条循环实现一致、
+缓存命中时还原出的数组与重新解析一致，以及实时行情追加后与整段解析一致。
+运行: python -m pytest -q test_intraday.py
+"""
+
+import json
+import datetime
+
+import numpy as np
+import pytest
+
+import chart_data
+import http_client
+import intraday
+from chart_cache import ChartCache
+
+CODE = 'sh600519'
+DAY = datetime.date(2025, 10, 10)
+PREV_CLOSE = 1679.5
+
+
+def minute_labels():
+    """一个交易日的分时点 0930、0931..1130、1301..1500"""
+    labels = ['0930']
+    for start, end in ((9 * 60 + 31, 11 * 60 + 30), (13 * 60 + 1, 15 * 60)):
+        labels += [f'{m // 60:02d}{m % 60:02d}' for m in range(start, end + 1)]
+    return labels
+
+
+def make_items(n=None, seed=0):
+    """接口格式的分钟数据 ['HHMM 价格 累计量 累计额']，含成交量为 0 的分钟"""
+    rng = np.random.default_rng(seed)
+    labels = minute_labels()[:n]
+    prices = np.round(1680 + np.cumsum(rng.normal(0, 0.8, len(labels))), 2)
+    vols = rng.integers(0, 500, len(labels))
+    vols[5:8] = 0
+    cum_vol = np.cumsum(vols)
+    cum_amount = np.cumsum(prices * vols * 100)
+    return [f'{t} {p:.2f} {v} {a:.2f}' for t, p, v, a in zip(labels, prices, cum_vol, cum_amount)]
+
+
+def payload(items):
+    body = {'code': 0, 'data': {CODE: {'data': {'data': items, 'date': DAY.strftime('%Y%m%d')}}}}
+    return 'min_data=' + json.dumps(body)
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, text):
+        self.text = text
+        self.content = text.encode('gbk')
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """让 http_client.get 返回给定的分时内容，行情接口返回昨收"""
+    def install(items):
+        def get(url, **kw):
+            if url.startswith(chart_data.QUOTE_URL.format('')):
+                return _Response(f'v_{CODE}="1~贵州茅台~600519~1680.00~{PREV_CLOSE}~1681.00";')
+            return _Response(payload(items))
+        monkeypatch.setattr(http_client, 'get', get)
+    return install
+
+
+def reference(items):
+    """原K线窗口的逐条解析：第3项为累计量，差分得单分钟量，逐分钟累计均价"""
+    times, prices, cum = [], [], []
+    for item in items:
+        parts = item.split()
+        h, m = int(parts[0][:2]), int(parts[0][2:4])
+        times.append(datetime.datetime.combine(DAY, datetime.time(h, m)))
+        prices.append(float(parts[1]))
+        cum.append(float(parts[2]))
+    vols = [cum[0]] + [cum[i] - cum[i - 1] for i in range(1, len(cum))]
+    avgs, total_amount, total_vol = [], 0.0, 0.0
+    for p, v in zip(prices, vols):
+        total_amount += p * v
+        total_vol += v
+        avgs.append(total_amount / total_vol if total_vol > 0 else p)
+    return np.array(times, dtype='datetime64[m]'), np.array(prices), np.array(avgs), np.array(vols)
+
+
+def assert_series(actual, expected):
+    times, prices, avgs, vols = actual
+    assert np.array_equal(times, expected[0])
+    assert np.array_equal(prices, expected[1])
+    np.testing.assert_allclose(avgs, expected[2], rtol=1e-12)
+    assert np.array_equal(vols, expected[3])
+
+
+def test_parse_matches_reference():
+    items = make_items()
+    times, prices, vols = intraday.parse_minutes(items, DAY)
+    series = intraday.MinuteSeries(DAY, 1680.0, times, prices, vols)
+    assert len(series) == 241
+    assert_series(series.view(), reference(items))
+
+
+def test_parse_uneven_fields():
+    """字段数不一致时逐条取前三项"""
+    items = make_items(10)
+    items[3] += ' extra'
+    times, prices, vols = intraday.parse_minutes(items, DAY)
+    ref = reference(items)
+    assert np.array_equal(times, ref[0])
+    assert np.array_equal(vols, ref[3])
+
+
+def test_cache_hit_matches_fresh_parse(serve):
+    items = make_items()
+    serve(items)
+    cache = ChartCache()
+    result = chart_data.load_chart(CODE, chart_data.TYPE_INTRADAY, 0)
+    assert result[0] == 'minutes'
+    loaded = chart_data.cache_result(CODE, chart_data.TYPE_INTRADAY, result, cache)
+
+    snap = cache.get(chart_data.cache_key(CODE, chart_data.TYPE_INTRADAY))
+    cached = intraday.MinuteSeries.from_snapshot(snap)
+    assert cached.day == DAY
+    assert cached.prev_close == loaded.prev_close == PREV_CLOSE
+    assert_series(cached.view(), reference(items))
+    assert_series(cached.view(), loaded.view())
+
+
+def test_cache_unaffected_by_live_push(serve):
+    items = make_items(100)
+    serve(items)
+    cache = ChartCache()
+    series = chart_data.cache_result(
+        CODE, chart_data.TYPE_INTRADAY, chart_data.load_chart(CODE, chart_data.TYPE_INTRADAY, 0), cache)
+    key = chart_data.cache_key(CODE, chart_data.TYPE_INTRADAY)
+    before = [a.copy() for a in intraday.MinuteSeries.from_snapshot(cache.get(key)).view()]
+    last_cum = float(items[-1].split()[2])
+    series.push(datetime.datetime.combine(DAY, datetime.time(11, 10, 30)), 1700.0, last_cum + 50)
+    # 从缓存还原的序列自有缓冲区，追加不影响缓存
+    restored = intraday.MinuteSeries.from_snapshot(cache.get(key))
+    restored.push(datetime.datetime.combine(DAY, datetime.time(11, 11, 30)), 1701.0, last_cum + 80)
+    after = intraday.MinuteSeries.from_snapshot(cache.get(key)).view()
+    assert len(series) == 101
+    assert all(np.array_equal(a, b) for a, b in zip(before, after))
+
+
+def test_live_push_matches_full_parse():
+    """前半天来自接口，之后每分钟推两次行情，结果与整段解析一致"""
+    items = make_items()
+    k = 60
+    times, prices, vols = intraday.parse_minutes(items[:k], DAY)
+    series = intraday.MinuteSeries(DAY, 1680.0, times, prices, vols)
+    for item in items[k:]:
+        label, price, cum_vol = item.split()[:3]
+        end = datetime.datetime.combine(DAY, datetime.time(int(label[:2]), int(label[2:])))
+        # 分钟线按结束时刻标记，行情时间落在前一分钟内
+        for sec, p in ((10, float(price) + 1), (50, float(price))):
+            t = end - datetime.timedelta(minutes=1) + datetime.timedelta(seconds=sec)
+            series.push(intraday.minute_of(t), p, float(cum_vol))
+    assert_series(series.view(), reference(items))
@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+K线本地存储测试
+用内存里的假服务器代替 fetch_kline，在临时目录里核对增量合并、往前补取历史、
+周K/月K合成和上市首日判断
+运行: python -m pytest -q test_kline_store.py
+"""
+
+import os
+import datetime
+
+import numpy as np
+import pytest
+
+import kline_store
+import market_clock
+from kline_store import KLineStore
+
+
+def make_daily(first='2010-01-04', last='2025-10-10', seed=0):
+    """工作日的随机游走日K (日期, 开, 高, 低, 收, 量)"""
+    days = np.arange(np.datetime64(first), np.datetime64(last) + 1)
+    days = days[np.is_busday(days)]
+    rng = np.random.default_rng(seed)
+    n = len(days)
+    closes = np.round(50 + np.cumsum(rng.normal(0, 0.5, n)), 2)
+    opens = np.round(closes + rng.normal(0, 0.3, n), 2)
+    highs = np.maximum(opens, closes) + 0.5
+    lows = np.minimum(opens, closes) - 0.5
+    volumes = rng.integers(1000, 100000, n).astype(np.int64)
+    return days, opens, highs, lows, closes, volumes
+
+
+class FakeServer:
+    """按 fetch_kline 的参数从内存数据返回K线：[start, end] 范围内最近的 count 条；
+    day_cap 模拟服务器对日K返回条数的限制；calls 记录每次请求，sent 累计返回的K线数"""
+
+    def __init__(self, daily, day_cap=None):
+        self.day_cap = day_cap
+        self.calls = []
+        self.sent = 0
+        self.set_daily(daily)
+
+    def set_daily(self, daily):
+        self.bars = {'day': daily,
+                     'week': kline_store.aggregate(daily, 'week'),
+                     'month': kline_store.aggregate(daily, 'month')}
+
+    def fetch(self, code, period, count, start='', end=''):
+        self.calls.append((period, count, start, end))
+        if period == 'day' and self.day_cap:
+            count = min(count, self.day_cap)
+        dates = self.bars[period][0]
+        lo = np.searchsorted(dates, np.datetime64(start)) if start else 0
+        hi = np.searchsorted(dates, np.datetime64(end), 'right') if end else len(dates)
+        lo = max(lo, hi - count)
+        if hi <= lo:
+            return None
+        self.sent += hi - lo
+        return tuple(np.array(col[lo:hi]) for col in self.bars[period])
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """安装假服务器，默认处于连续竞价时段（每次 load 都向服务器补取增量）"""
+    monkeypatch.setattr(market_clock, 'market_phase', lambda now=None: market_clock.PHASE_TRADING)
+
+    def install(daily, day_cap=None):
+        fake = FakeServer(daily, day_cap)
+        monkeypatch.setattr(kline_store, 'fetch_kline', fake.fetch)
+        return fake
+    return install
+
+
+@pytest.fixture
+def store(tmp_path):
+    return KLineStore(str(tmp_path))
+
+
+def assert_bars(actual, expected):
+    assert len(actual) == len(expected) == 6
+    for a, e in zip(actual, expected):
+        assert np.array_equal(np.asarray(a), np.asarray(e))
+
+
+def tail(bars, n):
+    return tuple(col[-n:] for col in bars)
+
+
+# ================================================================
+#  加深历史只补取更早的部分
+# ================================================================
+
+def test_depth_increase_fetches_only_older_range(server, store):
+    daily = make_daily()
+    fake = server(daily)
+    assert_bars(store.load('sh600519', 'day', 250), tail(daily, 250))
+    assert fake.calls == [('day', 250, '', '')]
+
+    fake.calls.clear()
+    fake.sent = 0
+    assert_bars(store.load('sh600519', 'day', 1250), tail(daily, 1250))
+    first = str(daily[0][-250])
+    # 一次取截至本地最早一根的 1001 条，一次从倒数第 OVERLAP 根起的增量
+    assert fake.calls[0] == ('day', 1001, '', first)
+    assert fake.calls[1][0] == 'day' and fake.calls[1][2] == str(daily[0][-kline_store.OVERLAP])
+    assert len(fake.calls) == 2
+    assert fake.sent == 1001 + kline_store.OVERLAP
+    assert store.read('sh600519', 'day')[1]['depth'] == 1250
+
+
+def test_depth_increase_after_adjustment_refetches(server, store):
+    """往前补取时重叠的那根价格变了（除权，前复权价整体调整），整体重新获取"""
+    daily = make_daily()
+    fake = server(daily)
+    store.load('sh600519', 'day', 250)
+    adjusted = (daily[0], *(np.round(col * 0.9, 2) for col in daily[1:5]), daily[5])
+    fake.set_daily(adjusted)
+    fake.calls.clear()
+    assert_bars(store.load('sh600519', 'day', 1250), tail(adjusted, 1250))
+    assert fake.calls[-1] == ('day', 1250, '', '')
+
+
+def test_depth_increase_at_listing_keeps_history(server, store):
+    """服务器没有更早的数据时保留本地数据，只补增量"""
+    daily = make_daily(first='2025-01-06')
+    fake = server(daily)
+    store.load('sh600519', 'day', 250)
+    fake.calls.clear()
+    assert_bars(store.load('sh600519', 'day', 1250), daily)
+    assert fake.calls[0] == ('day', 1250 - len(daily[0]) + 1, '', str(daily[0][0]))
+    assert ('day', 1250, '', '') not in fake.calls
+
+
+def test_all_periods_fetch_at_most_max_daily(server, store):
+    daily = make_daily()
+    fake = server(daily)
+    loaded = store.load_periods('sh600519', ('day', 'week', 'month'), 250)
+    assert max(count for period, count, _, _ in fake.calls if period == 'day') <= kline_store.MAX_DAILY
+    assert_bars(loaded['day'], tail(daily, 250))
+    assert_bars(loaded['week'], tail(fake.bars['week'], 250))
+    assert_bars(loaded['month'], tail(fake.bars['month'], 250))
+
+
+# ================================================================
+#  日K合成周K/月K
+# ================================================================
+
+def bars_on(dates):
+    """指定日期的日K，第 i 根的开/高/低/收/量各不相同便于核对"""
+    d = np.array(dates, dtype='datetime64[D]')
+    i = np.arange(len(d), dtype=np.float64)
+    return d, 10 + i, 20 + i, 5 - i, 15 + i, (100 * (i + 1)).astype(np.int64)
+
+
+def expected_group(bars, rows):
+    """rows 这几根日K合成的一根：首日开、最高、最低、末日收、量合计，日期取末日"""
+    d, o, h, l, c, v = (col[rows] for col in bars)
+    return d[-1], o[0], h.max(), l.min(), c[-1], v.sum()
+
+
+def assert_groups(bars, period, groups):
+    out = kline_store.aggregate(bars, period)
+    assert len(out[0]) == len(groups)
+    for k, rows in enumerate(groups):
+        assert tuple(col[k] for col in out) == expected_group(bars, rows)
+
+
+def test_aggregate_week_across_holiday():
+    # 国庆假期：9-29/9-30 一周，10-1 至 10-8 休市，10-9/10-10 在下一周
+    bars = bars_on(['2025-09-26', '2025-09-29', '2025-09-30', '2025-10-09', '2025-10-10'])
+    assert_groups(bars, 'week', [[0], [1, 2], [3, 4]])
+
+
+def test_aggregate_week_across_year_end():
+    # 2024-12-30（周一）、12-31 与 2025-01-02 同一周
+    bars = bars_on(['2024-12-27', '2024-12-30', '2024-12-31', '2025-01-02', '2025-01-06'])
+    assert_groups(bars, 'week', [[0], [1, 2, 3], [4]])
+    assert_groups(bars, 'month', [[0, 1, 2], [3, 4]])
+
+
+def test_aggregate_month_boundaries_and_partial_last():
+    # 3-31（周一）与 4-1 同一周不同月；最后一组只有 4-1 一天
+    bars = bars_on(['2025-02-27', '2025-02-28', '2025-03-03', '2025-03-31', '2025-04-01'])
+    assert_groups(bars, 'month', [[0, 1], [2, 3], [4]])
+    assert_groups(bars, 'week', [[0, 1], [2], [3, 4]])
+
+
+def test_aggregate_groups_by_calendar():
+    """多年日K按 ISO 周、自然月分组的组数和成交量合计与逐日分组一致"""
+    daily = make_daily(first='2020-01-02')
+    days = [d.item() for d in daily[0]]
+    for period, key in (('week', lambda d: d.isocalendar()[:2]), ('month', lambda d: (d.year, d.month))):
+        out = kline_store.aggregate(daily, period)
+        groups = {}
+        for d, v in zip(days, daily[5].tolist()):
+            groups[key(d)] = groups.get(key(d), 0) + v
+        assert out[5].tolist() == list(groups.values())
+        assert out[0][-1] == daily[0][-1]
+
+
+# ================================================================
+#  新股与服务器限制日K条数的区分
+# ================================================================
+
+def test_young_stock_marks_listing_day(server, store):
+    daily = make_daily(first='2023-03-01')
+    fake = server(daily)
+    bars = store.load_period('sh688001', 'month', 250)
+    assert_bars(bars, kline_store.aggregate(daily, 'month'))
+    assert store.read('sh688001', 'day')[1]['listed'] == str(daily[0][0])
+    # 确认过上市首日后不再向服务器取月K
+    fake.calls.clear()
+    assert_bars(store.load_period('sh688001', 'month', 250), kline_store.aggregate(daily, 'month'))
+    assert [c for c in fake.calls if c[0] == 'month'] == []
+
+
+def test_capped_daily_uses_server_history(server, store):
+    daily = make_daily()
+    fake = server(daily, day_cap=640)
+    assert_bars(store.load_period('sh600519', 'month', 250), tail(fake.bars['month'], 250))
+    assert 'listed' not in store.read('sh600519', 'day')[1]
+    # 之后切换月K：更早的部分用本地存的服务器月K，最近的由日K合成，不再请求月K
+    fake.calls.clear()
+    assert_bars(store.load_period('sh600519', 'month', 250), tail(fake.bars['month'], 250))
+    assert [c for c in fake.calls if c[0] == 'month'] == []
+
+
+def test_capped_daily_after_adjustment_refetches_period(server, store):
+    daily = make_daily()
+    fake = server(daily, day_cap=640)
+    store.load_period('sh600519', 'month', 250)
+    adjusted = (daily[0], *(np.round(col * 0.9, 2) for col in daily[1:5]), daily[5])
+    fake.set_daily(adjusted)
+    fake.calls.clear()
+    bars = store.load_period('sh600519', 'month', 250)
+    assert [c for c in fake.calls if c[0] == 'month']
+    assert_bars(bars, tail(fake.bars['month'], 250))
+
+
+def test_mature_stock_week_is_local(server, store):
+    daily = make_daily()
+    fake = server(daily)
+    bars = store.load_period('sh600519', 'week', 200)
+    assert_bars(bars, tail(fake.bars['week'], 200))
+    assert [c for c in fake.calls if c[0] == 'week'] == []
+
+
+# ================================================================
+#  增量合并、本地数据是否够新、损坏的缓存
+# ================================================================
+
+def test_delta_rewrites_overlapping_bars(server, store):
+    """增量从倒数第 OVERLAP 根起，最后一根盘中的K线被服务器的收盘值改写"""
+    daily = make_daily()
+    stale = tuple(np.array(col[:-3]) for col in daily)
+    stale[4][-1] += 1.5  # 盘中取到的最后一根，之后收盘价变了
+    fake = server(stale)
+    store.load('sh600519', 'day', 250)
+    fake.set_daily(daily)
+    fake.calls.clear()
+    bars = store.load('sh600519', 'day', 250)
+    assert_bars(bars, tail(daily, 250))
+    assert fake.calls == [('day', 250, str(daily[0][-3 - kline_store.OVERLAP]), '')]
+    assert len(store.read('sh600519', 'day')[0][0]) == 250 + 3
+
+
+def test_merge_overlap():
+    store = KLineStore('unused')
+    daily = make_daily(first='2025-01-02')
+    n = len(daily[0])
+    stored = tail(tuple(col[:n - 5] for col in daily), 100)
+    delta = tuple(col[n - 5 - kline_store.OVERLAP:] for col in daily)
+    assert_bars(store._merge(stored, delta), tail(daily, 105))
+    # 增量不是从倒数第 OVERLAP 根开始（中间有缺口）
+    gap = tuple(col[n - 3:] for col in daily)
+    assert store._merge(stored, gap) is None
+    # 已收盘的重叠K线价格变了（除权）
+    adjusted = (delta[0], delta[1] * 0.9, *delta[2:])
+    assert store._merge(stored, adjusted) is None
+    assert store._merge(stored, tuple(col[:0] for col in delta)) is None
+
+
+def test_gap_larger_than_overlap_refetches(server, store, monkeypatch):
+    """服务器返回的增量与本地接不上时整体重新获取"""
+    daily = make_daily()
+    fake = server(tuple(np.array(col[:-20]) for col in daily))
+    store.load('sh600519', 'day', 250)
+    fake.set_daily(daily)
+    real_fetch = fake.fetch
+
+    def skip_overlap(code, period, count, start='', end=''):
+        # 模拟增量缺了开头几根
+        if start:
+            start = str(daily[0][-10])
+        return real_fetch(code, period, count, start, end)
+    monkeypatch.setattr(kline_store, 'fetch_kline', skip_overlap)
+    fake.calls.clear()
+    assert_bars(store.load('sh600519', 'day', 250), tail(daily, 250))
+    assert fake.calls[-1] == ('day', 250, '', '')
+    assert len(store.read('sh600519', 'day')[0][0]) == 250
+
+
+def test_network_failure_falls_back_to_store(server, store, monkeypatch):
+    daily = make_daily()
+    server(daily)
+    store.load('sh600519', 'day', 250)
+    monkeypatch.setattr(kline_store, 'fetch_kline', lambda *a, **kw: None)
+    assert_bars(store.load('sh600519', 'day', 120), tail(daily, 120))
+
+
+@pytest.mark.parametrize('phase, synced, depth, fresh', [
+    (market_clock.PHASE_CLOSED, 'after_close', 250, True),
+    (market_clock.PHASE_CLOSED, 'after_close', 120, False),    # 深度不够
+    (market_clock.PHASE_CLOSED, 'before_close', 250, False),   # 上次同步后又收盘了一次
+    (market_clock.PHASE_TRADING, 'after_close', 250, False),   # 开市期间总是补增量
+    (market_clock.PHASE_BREAK, 'after_close', 250, False),
+    (market_clock.PHASE_AUCTION, 'after_close', 250, False),
+])
+def test_is_fresh(monkeypatch, phase, synced, depth, fresh):
+    close = datetime.datetime(2025, 10, 10, 15, 0)
+    monkeypatch.setattr(market_clock, 'market_phase', lambda now=None: phase)
+    monkeypatch.setattr(market_clock, 'last_close', lambda now=None: close)
+    offset = 60 if synced == 'after_close' else -60
+    meta = {'depth': depth, 'updated': close.timestamp() + offset}
+    assert KLineStore('unused')._is_fresh(meta, 250) is fresh
+
+
+def test_fresh_store_makes_no_request(server, store, monkeypatch):
+    daily = make_daily()
+    fake = server(daily)
+    store.load('sh600519', 'day', 250)
+    monkeypatch.setattr(market_clock, 'market_phase', lambda now=None: market_clock.PHASE_CLOSED)
+    monkeypatch.setattr(market_clock, 'last_close', lambda now=None: datetime.datetime(2000, 1, 3, 15))
+    fake.calls.clear()
+    assert_bars(store.load('sh600519', 'day', 60), tail(daily, 60))
+    assert fake.calls == []
+
+
+@pytest.mark.parametrize('damage', ['meta', 'column', 'length', 'missing'])
+def test_corrupted_store_refetches(server, store, damage):
+    daily = make_daily()
+    fake = server(daily)
+    store.load('sh600519', 'day', 250)
+    path = store._dir('sh600519', 'day')
+    if damage == 'meta':
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            f.write('{"depth": 25')
+    elif damage == 'column':
+        with open(os.path.join(path, 'closes.npy'), 'wb') as f:
+            f.write(b'not a npy file')
+    elif damage == 'length':
+        # 写入中途中断：一列比其他列短
+        np.save(os.path.join(path, 'volumes.npy'), daily[5][-100:])
+    else:
+        os.remove(os.path.join(path, 'highs.npy'))
+    assert store.read('sh600519', 'day') == (None, None)
+    fake.calls.clear()
+    assert_bars(store.load('sh600519', 'day', 250), tail(daily, 250))
+    assert fake.calls == [('day', 250, '', '')]
+    assert store.read('sh600519', 'day')[0] is not None
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+交易时段与交易日历测试
+用固定时间核对各时段切换点、周末与节假日、下次开盘/最近收盘，以及刷新调度的间隔
+运行: python -m pytest -q test_market_clock.py
+"""
+
+import datetime
+
+import pytest
+from PyQt5.QtCore import QCoreApplication
+
+import market_clock
+from market_clock import (PHASE_AUCTION, PHASE_BREAK, PHASE_CLOSED, PHASE_TRADING,
+                          RefreshScheduler)
+
+
+def at(text):
+    return datetime.datetime.strptime(text, '%Y-%m-%d %H:%M:%S')
+
+
+# 2025-10-10 周五，国庆假期（10-01 至 10-08）后的第二个交易日
+@pytest.mark.parametrize('now, phase', [
+    ('2025-10-10 09:14:59', PHASE_CLOSED),
+    ('2025-10-10 09:15:00', PHASE_AUCTION),
+    ('2025-10-10 09:24:59', PHASE_AUCTION),
+    ('2025-10-10 09:25:00', PHASE_BREAK),
+    ('2025-10-10 09:29:59', PHASE_BREAK),
+    ('2025-10-10 09:30:00', PHASE_TRADING),
+    ('2025-10-10 11:29:59', PHASE_TRADING),
+    ('2025-10-10 11:30:00', PHASE_BREAK),
+    ('2025-10-10 12:59:59', PHASE_BREAK),
+    ('2025-10-10 13:00:00', PHASE_TRADING),
+    ('2025-10-10 14:56:59', PHASE_TRADING),
+    ('2025-10-10 14:57:00', PHASE_AUCTION),
+    ('2025-10-10 14:59:59', PHASE_AUCTION),
+    ('2025-10-10 15:00:00', PHASE_CLOSED),
+    ('2025-10-10 20:00:00', PHASE_CLOSED),
+    ('2025-10-11 10:00:00', PHASE_CLOSED),   # 周六
+    ('2025-10-12 10:00:00', PHASE_CLOSED),   # 周日
+    ('2025-10-01 10:00:00', PHASE_CLOSED),   # 国庆
+    ('2025-10-08 10:00:00', PHASE_CLOSED),   # 假期最后一天（周三）
+    ('2025-10-09 10:00:00', PHASE_TRADING),  # 节后第一天
+    ('2026-02-23 10:00:00', PHASE_CLOSED),   # 春节假期最后一天（周一）
+    ('2026-02-24 10:00:00', PHASE_TRADING),
+])
+def test_market_phase(now, phase):
+    assert market_clock.market_phase(at(now)) == phase
+
+
+@pytest.mark.parametrize('day, trading', [
+    ('2025-01-01', False),
+    ('2025-01-02', True),
+    ('2025-02-04', False),
+    ('2025-02-05', True),
+    ('2025-10-08', False),
+    ('2025-10-09', True),
+    ('2025-10-11', False),
+])
+def test_is_trading_day(day, trading):
+    assert market_clock.is_trading_day(datetime.date.fromisoformat(day)) is trading
+
+
+@pytest.mark.parametrize('now, expected', [
+    ('2025-10-10 08:00:00', '2025-10-10 09:15:00'),   # 当天盘前
+    ('2025-10-10 09:14:59', '2025-10-10 09:15:00'),
+    ('2025-10-10 09:15:00', '2025-10-13 09:15:00'),   # 已开盘，下一次在周一
+    ('2025-10-10 15:30:00', '2025-10-13 09:15:00'),
+    ('2025-10-11 12:00:00', '2025-10-13 09:15:00'),   # 周六
+    ('2025-09-30 15:30:00', '2025-10-09 09:15:00'),   # 节前最后一天收盘后，跨过国庆
+    ('2025-10-05 12:00:00', '2025-10-09 09:15:00'),
+    ('2025-12-31 16:00:00', '2026-01-05 09:15:00'),   # 元旦连周末
+])
+def test_next_open(now, expected):
+    assert market_clock.next_open(at(now)) == at(expected)
+
+
+@pytest.mark.parametrize('now, expected', [
+    ('2025-10-10 15:00:00', '2025-10-10 15:00:00'),   # 刚收盘
+    ('2025-10-10 20:00:00', '2025-10-10 15:00:00'),
+    ('2025-10-10 14:59:59', '2025-10-09 15:00:00'),   # 未收盘取上一个交易日
+    ('2025-10-10 09:00:00', '2025-10-09 15:00:00'),
+    ('2025-10-09 09:00:00', '2025-09-30 15:00:00'),   # 节后第一天盘前，跨过国庆
+    ('2025-10-12 12:00:00', '2025-10-10 15:00:00'),   # 周日
+    ('2025-10-13 09:00:00', '2025-10-10 15:00:00'),   # 周一盘前
+])
+def test_last_close(now, expected):
+    assert market_clock.last_close(at(now)) == at(expected)
+
+
+@pytest.mark.parametrize('now, seconds', [
+    ('2025-10-10 09:00:00', 15 * 60),
+    ('2025-10-10 09:15:00', 10 * 60),
+    ('2025-10-10 11:29:30', 30),
+    ('2025-10-10 14:56:00', 60),
+    ('2025-10-10 14:59:00', 60),
+    ('2025-10-10 15:00:00', None),
+])
+def test_seconds_to_next_boundary(now, seconds):
+    assert market_clock.seconds_to_next_boundary(at(now)) == seconds
+
+
+# ================================================================
+#  刷新调度
+# ================================================================
+
+@pytest.fixture(scope='module')
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def scheduler(app, monkeypatch):
+    """固定当前时段、距下个切换点 10 分钟、距下次开盘 2 小时的调度器"""
+    state = {'phase': PHASE_TRADING, 'boundary': 600}
+    monkeypatch.setattr(market_clock, 'market_phase', lambda now=None: state['phase'])
+    monkeypatch.setattr(market_clock, 'seconds_to_next_boundary', lambda now=None: state['boundary'])
+    monkeypatch.setattr(market_clock, 'next_open',
+                        lambda now=None: (now or datetime.datetime.now()) + datetime.timedelta(hours=2))
+    s = RefreshScheduler()
+    s.state = state
+    s.ticks = 0
+
+    def count():
+        s.ticks += 1
+    s.tick.connect(count)
+    yield s
+    s.stop()
+
+
+@pytest.mark.parametrize('phase, interval', [
+    (PHASE_TRADING, 5000),
+    (PHASE_AUCTION, 10000),
+    (PHASE_BREAK, 60000),
+    (PHASE_CLOSED, RefreshScheduler.MAX_SLEEP * 1000),
+])
+def test_scheduler_interval(scheduler, phase, interval):
+    scheduler.state['phase'] = phase
+    scheduler.start()
+    assert scheduler._timer.interval() == interval
+
+
+def test_scheduler_does_not_cross_boundary(scheduler):
+    """午休还剩 20 秒时不按 60 秒睡，到点切回连续竞价的频率"""
+    scheduler.state.update(phase=PHASE_BREAK, boundary=20)
+    scheduler.start()
+    assert scheduler._timer.interval() == 20500
+
+
+def test_scheduler_all_day(scheduler):
+    scheduler.market_hours_only = False
+    scheduler.state['phase'] = PHASE_CLOSED
+    scheduler.start()
+    assert scheduler._timer.interval() == 5000
+    scheduler._on_timeout()
+    assert scheduler.ticks == 1
+
+
+def test_scheduler_ticks_once_after_close(scheduler):
+    """开市期间每次触发都刷新，收盘后补刷一次，之后休市不再刷新"""
+    scheduler.start()
+    scheduler._on_timeout()
+    assert scheduler.ticks == 1
+    scheduler.state['phase'] = PHASE_CLOSED
+    scheduler._on_timeout()
+    assert scheduler.ticks == 2
+    scheduler._on_timeout()
+    assert scheduler.ticks == 2
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+后台行情引擎测试
+用可控的假 fetch_quotes 核对：一轮进行中不并发请求，记下的最新请求在本轮结束后
+代码有变化时补发，代码相同时不重复请求
+运行: python -m pytest -q test_quote_api.py
+"""
+
+import threading
+import time
+
+import pytest
+from PyQt5.QtCore import QCoreApplication
+
+import quote_api
+from quote_api import QuoteEngine, StockInfoWidget
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def engine(app, monkeypatch):
+    """每轮请求都阻塞到测试放行；calls 记录每轮的代码，snapshots 记录送回的快照"""
+    calls, release = [], threading.Semaphore(0)
+
+    def fetch(codes, batch_size=60):
+        calls.append(list(codes))
+        release.acquire()
+        return {c: StockInfoWidget(c, c, 1.0, 0.0, 0.0, 1.0) for c in codes}
+    monkeypatch.setattr(quote_api, 'fetch_quotes', fetch)
+    e = QuoteEngine()
+    e.calls, e.release, e.snapshots = calls, release, []
+    e.snapshot_ready.connect(lambda q: e.snapshots.append(sorted(q)))
+    yield e
+    for _ in range(5):
+        release.release()
+    e._pool.waitForDone(2000)
+
+
+def wait_until(cond, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not cond():
+        QCoreApplication.processEvents()
+        assert time.monotonic() < end
+        time.sleep(0.001)
+
+
+def test_request_while_busy_reissued_with_new_code(engine):
+    assert engine.request(['600519', '000001'])
+    wait_until(lambda: len(engine.calls) == 1)
+    # 本轮进行中加入一只股票：不并发请求
+    assert not engine.request(['600519', '000001', '300750'])
+    assert not engine.request(['600519', '000001', '300750', '600036'])
+    assert len(engine.calls) == 1
+    engine.release.release()
+    wait_until(lambda: len(engine.calls) == 2)
+    # 补发的是最新一次请求
+    assert engine.calls[1] == ['600519', '000001', '300750', '600036']
+    assert engine.snapshots == [['000001', '600519']]
+    engine.release.release()
+    wait_until(lambda: len(engine.snapshots) == 2)
+    assert not engine.is_busy()
+
+
+def test_same_codes_not_reissued(engine):
+    assert engine.request(['600519', '000001'])
+    wait_until(lambda: len(engine.calls) == 1)
+    assert not engine.request(['000001', '600519'])
+    engine.release.release()
+    wait_until(lambda: len(engine.snapshots) == 1)
+    QCoreApplication.processEvents()
+    assert len(engine.calls) == 1
+    assert not engine.is_busy()
+
+
+def test_empty_request_ignored(engine):
+    assert not engine.request([])
+    assert engine.calls == [] and not engine.is_busy()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+本地证券代码索引测试
+核对拼音首字母推导、前缀搜索（代码/带前缀代码/拼音/名称）、合并时的拼音保留和文件读写
+运行: python -m pytest -q test_symbol_index.py
+"""
+
+import pytest
+
+from symbol_index import SymbolIndex, pinyin_initials
+
+RECORDS = [
+    ('sh600519', '贵州茅台', 'gzmt'),
+    ('sh600036', '招商银行', 'zsyh'),
+    ('sh600000', '浦发银行', 'pfyh'),
+    ('sh600009', '上海机场', 'shjc'),
+    ('sh000001', '上证指数', 'szzs'),
+    ('sz000001', '平安银行', 'payh'),
+    ('sz000002', '万科A', 'wka'),
+    ('sz600000', '测试重复代码', 'cscfdm'),
+    ('sz300750', '宁德时代', 'ndsd'),
+    ('sh601939', '建设银行', 'jsyh'),
+]
+
+
+@pytest.mark.parametrize('name, initials', [
+    ('贵州茅台', 'gzmt'),
+    ('重庆啤酒', 'cqpj'),     # 多音字按惯用读音
+    ('招商银行', 'zsyh'),
+    ('西藏药业', 'xzyy'),
+    ('长江电力', 'cjdl'),
+    ('中国平安', 'zgpa'),
+    ('宁德时代', 'ndsd'),
+    ('万科A', 'wka'),         # 字母数字原样保留（小写）
+    ('TCL科技', 'tclkj'),
+    ('*ST海润', 'sthr'),      # 符号跳过
+    ('沪深300', 'hs300'),
+    ('华夏上证50ETF', 'hxsz50etf'),
+    ('鑫科材料', 'kcl'),      # GB2312 二级汉字不在拼音排序区，跳过
+    ('', ''),
+])
+def test_pinyin_initials(name, initials):
+    assert pinyin_initials(name) == initials
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = SymbolIndex(str(tmp_path / 'symbols.tsv'))
+    idx.merge(RECORDS)
+    return idx
+
+
+def codes(results):
+    return [r['code'] for r in results]
+
+
+def test_search_by_code_prefix(index):
+    assert codes(index.search('6000')) == ['600000', 'sz600000', '600009', '600036']
+    assert codes(index.search('000001')) == ['sh000001', '000001']
+    assert codes(index.search('6000', limit=1)) == ['600000']
+    assert index.search('999') == []
+
+
+def test_search_prefixed_code_ranks_same_market_first(index):
+    assert codes(index.search('sh0000')) == ['sh000001', '000001', '000002']
+    assert codes(index.search('sz0000')) == ['000001', '000002', 'sh000001']
+    assert codes(index.search('SZ6000')) == ['sz600000', '600000', '600009', '600036']
+    assert codes(index.search('sh6000', limit=2)) == ['600000', '600009']
+
+
+def test_search_by_pinyin_and_name(index):
+    assert codes(index.search('zs')) == ['600036']
+    assert codes(index.search('GZ')) == ['600519']
+    assert codes(index.search('sh')) == ['600009']          # 不带数字的 sh 按拼音
+    assert codes(index.search('平安')) == ['000001']
+    assert codes(index.search('万科a')) == ['000002']
+    assert codes(index.search('  宁德 ')) == ['300750']
+    assert index.search('') == [] and index.search('   ') == []
+
+
+def test_search_result_fields(index):
+    assert index.search('gzmt') == [{'code': '600519', 'name': '贵州茅台', 'pinyin': 'gzmt'}]
+
+
+def test_merge_keeps_pinyin(index):
+    # 联想接口没给拼音：保留已有的
+    assert not index.merge([('sh600519', '贵州茅台', '')])
+    # 全表推出的拼音（keep_pinyin）不覆盖已有的
+    assert not index.merge([('sz000002', '万科A', 'wkA')], keep_pinyin=True)
+    assert index.search('wka')[0]['pinyin'] == 'wka'
+    # 联想接口给的拼音覆盖已有的
+    assert index.merge([('sh600036', '招商银行', 'zhsyh')])
+    assert codes(index.search('zhs')) == ['600036']
+    assert index.search('zsyh') == []
+    # 没有旧记录时 keep_pinyin 也写入新拼音
+    assert index.merge([('sh688981', '中芯国际', 'zxgj')], keep_pinyin=True)
+    assert codes(index.search('zxgj')) == ['688981']
+
+
+def test_merge_rename_updates_keys(index):
+    assert index.merge([('sz000002', '万科B', 'wkb')])
+    assert index.search('万科a') == []
+    assert codes(index.search('万科b')) == ['000002']
+    assert codes(index.search('wkb')) == ['000002']
+    assert len(index) == len(RECORDS)
+
+
+def test_save_and_load(index):
+    index.list_updated = 1760000000.0
+    index.save()
+    loaded = SymbolIndex(index.path)
+    loaded.load()
+    assert len(loaded) == len(RECORDS)
+    assert loaded.list_updated == 1760000000.0
+    for kw in ('6000', 'sh0000', 'zs', '平安'):
+        assert loaded.search(kw) == index.search(kw)
+
+
+def test_load_missing_file(tmp_path):
+    idx = SymbolIndex(str(tmp_path / 'missing.tsv'))
+    idx.load()
+    assert len(idx) == 0
+    assert idx.needs_list()